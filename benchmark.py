@@ -0,0 +1,364 @@
+"""
+Benchmark de rendimiento
+Repite la carga del dataset y el entrenamiento y test de cada algoritmo sobre
+los mismos folds (y sobre datasets sintéticos de tamaño escalado), guarda la
+mediana y el rango intercuartílico de cada fase en un histórico y marca las
+regresiones respecto a una ejecución de referencia
+
+Uso:
+    python benchmark.py
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import platform
+import contextlib
+from datetime import datetime
+import numpy as np
+import surprise
+import config
+import ratings_cache
+import resources
+from id_mapping import IdMapping
+from folds import FoldManager
+from recommender import MovieLensRecommender
+
+
+# Fases que se miden en cada algoritmo (claves de evaluate_fold)
+PHASES = ('fit', 'test', 'ranking')
+
+# Por debajo de este tiempo (s) las diferencias son ruido y no se comparan
+MIN_COMPARABLE_TIME = 0.01
+
+
+def summarize(values):
+    """
+    Mediana y rango intercuartílico de una lista de tiempos
+
+    Returns:
+        dict: 'median', 'iqr' y los valores medidos
+    """
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    return {'median': float(median), 'iqr': float(q3 - q1), 'values': [float(v) for v in values]}
+
+
+def rating_arrays(recommender):
+    """Ratings del dataset cargado como arrays columnares 'user', 'item' y 'rating'"""
+    columns = recommender.data.columns
+    return {key: np.asarray(columns[key]) for key in ('user', 'item', 'rating')}
+
+
+def scaled_ratings(arrays, scale, seed):
+    """
+    Dataset sintético con scale veces los usuarios (y los ratings) del
+    original: los usuarios se replican con identificadores nuevos y, si
+    scale no es entero, se elige al azar la fracción que sobra. Las
+    películas y la distribución de ratings por usuario son las del original
+
+    Args:
+        arrays: dict con los arrays 'user', 'item' y 'rating'
+        scale: Factor de escala (0.5 = la mitad de usuarios, 2 = el doble)
+        seed: Semilla de la selección de usuarios
+
+    Returns:
+        dict: Arrays 'user', 'item' y 'rating' del dataset escalado
+    """
+    _, user_codes = np.unique(arrays['user'], return_inverse=True)
+    n_users = int(user_codes.max()) + 1
+    n_copies = int(np.ceil(scale))
+
+    # Usuario replicado i -> copia i // n_users del usuario original i % n_users
+    n_kept = max(1, int(round(scale * n_users)))
+    kept = np.random.RandomState(seed).permutation(n_copies * n_users)[:n_kept]
+    keep = np.zeros(n_copies * n_users, dtype=bool)
+    keep[kept] = True
+
+    users, items, ratings = [], [], []
+    for copy in range(n_copies):
+        new_codes = user_codes.astype(np.int64) + copy * n_users
+        mask = keep[new_codes]
+        users.append(new_codes[mask])
+        items.append(arrays['item'][mask])
+        ratings.append(arrays['rating'][mask])
+    return {
+        'user': np.concatenate(users),
+        'item': np.concatenate(items),
+        'rating': np.concatenate(ratings),
+    }
+
+
+class Benchmark:
+    """
+    Mide las fases de carga, entrenamiento, test y ranking con repeticiones
+    y las compara con el histórico de OUTPUT_DIR/BENCHMARK_HISTORY_FILE
+    """
+
+    def __init__(self, algorithms=None, repeats=None, n_folds=None, scales=None):
+        """
+        Args:
+            algorithms: Algoritmos a medir (por defecto, config.BENCHMARK_ALGORITHMS
+                o los de la evaluación)
+            repeats: Repeticiones de cada medida
+            n_folds: Folds medidos en cada repetición (siempre los primeros)
+            scales: Factores de escala de los datasets sintéticos
+        """
+        self.recommender = MovieLensRecommender()
+        self.algorithms = algorithms or config.BENCHMARK_ALGORITHMS or self.recommender.get_algorithms_to_run()
+        self.repeats = repeats or config.BENCHMARK_REPEATS
+        self.n_folds = n_folds or config.BENCHMARK_FOLDS
+        self.scales = config.BENCHMARK_SYNTHETIC_SCALES if scales is None else scales
+        self.history_path = os.path.join(config.OUTPUT_DIR, config.BENCHMARK_HISTORY_FILE)
+
+    def measure_load(self):
+        """Tiempos de carga del dataset real (la primera carga deja lista la caché)"""
+        times = []
+        for repeat in range(self.repeats + 1):
+            recommender = MovieLensRecommender()
+            with contextlib.redirect_stdout(io.StringIO()):
+                recommender.load_data()
+            if repeat > 0:
+                times.append(recommender.load_stats['load_time'])
+        self.recommender = recommender
+        return summarize(times)
+
+    def measure_algorithms(self, recommender, label):
+        """
+        Repite el entrenamiento y el test de cada algoritmo sobre los mismos folds
+
+        Returns:
+            dict: Algoritmo -> {'params': ..., fase: resumen}
+        """
+        results = {}
+        n_folds = min(self.n_folds, len(recommender.folds))
+        for algo_name in self.algorithms:
+            times = {phase: [] for phase in PHASES}
+            try:
+                for _ in range(self.repeats):
+                    for fold_index in range(n_folds):
+                        fold_result = recommender.evaluate_fold(algo_name, fold_index)
+                        for phase in PHASES:
+                            if phase + '_time' in fold_result:
+                                times[phase].append(fold_result[phase + '_time'])
+            except Exception as e:
+                print(f"  ✗ {label} | {algo_name}: {str(e)}")
+                continue
+
+            results[algo_name] = {'params': config.ALGORITHM_PARAMS.get(algo_name, {})}
+            for phase, values in times.items():
+                if values:
+                    results[algo_name][phase] = summarize(values)
+            print(f"  ✓ {label} | {algo_name}: "
+                  f"fit={results[algo_name]['fit']['median']:.3f}s "
+                  f"test={results[algo_name]['test']['median']:.3f}s")
+        return results
+
+    def synthetic_recommender(self, arrays, scale):
+        """
+        Recomendador sobre un dataset sintético escalado, con sus propios folds
+
+        Returns:
+            tuple: (recomendador, tiempo de construcción del dataset)
+        """
+        recommender = MovieLensRecommender()
+        scaled = scaled_ratings(arrays, scale, config.RANDOM_SEED)
+        start_time = time.perf_counter()
+        recommender.id_mapping, codes = IdMapping.encode(scaled)
+        recommender.data = ratings_cache.build_dataset(codes, self.recommender.data.reader.rating_scale,
+                                                       recommender.id_mapping)
+        build_time = time.perf_counter() - start_time
+        recommender.folds = FoldManager(
+            recommender.data,
+            n_folds=config.CV_FOLDS,
+            seed=config.RANDOM_SEED,
+            name=f'{self.recommender.dataset_name}_x{scale}',
+            keep_trainsets=resources.keep_trainsets(len(codes['rating']), config.CV_FOLDS)
+        )
+        recommender.folds.split()
+        return recommender, build_time
+
+    def run(self):
+        """
+        Ejecuta el benchmark completo
+
+        Returns:
+            dict: Ejecución con un resumen por conjunto de datos, algoritmo y fase
+        """
+        dataset_name = self.recommender.dataset_name
+        print(f"Midiendo la carga de MovieLens {dataset_name} ({self.repeats} repeticiones)...")
+        load = self.measure_load()
+        print(f"  ✓ Carga: {load['median']:.3f}s (IQR {load['iqr']:.3f}s)")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.recommender.prepare_folds()
+        variants = {dataset_name: {'load': load, 'n_ratings': self.recommender.data.n_ratings}}
+        variants[dataset_name]['algorithms'] = self.measure_algorithms(self.recommender, dataset_name)
+
+        arrays = rating_arrays(self.recommender) if self.scales else None
+        for scale in self.scales:
+            label = f'{dataset_name}_x{scale}'
+            build_times = []
+            for _ in range(self.repeats):
+                recommender, build_time = self.synthetic_recommender(arrays, scale)
+                build_times.append(build_time)
+            print(f"  ✓ {label}: {recommender.data.n_ratings} ratings sintéticos")
+            variants[label] = {
+                'load': summarize(build_times),
+                'n_ratings': recommender.data.n_ratings,
+                'algorithms': self.measure_algorithms(recommender, label),
+            }
+
+        return {
+            'run_id': datetime.now().strftime('%Y%m%d-%H%M%S'),
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'dataset': dataset_name,
+            'settings': {
+                'repeats': self.repeats,
+                'folds': self.n_folds,
+                'cv_folds': config.CV_FOLDS,
+                'seed': config.RANDOM_SEED,
+                'split': config.SPLIT_STRATEGY,
+                'metrics': config.METRICS,
+                'n_jobs': 1,
+            },
+            'machine': {
+                'platform': platform.platform(),
+                'python': platform.python_version(),
+                'cpus': os.cpu_count(),
+                'numpy': np.__version__,
+                'surprise': surprise.__version__,
+            },
+            'variants': variants,
+        }
+
+    def load_history(self):
+        """Ejecuciones anteriores guardadas en el histórico (de la más antigua a la más reciente)"""
+        if not os.path.exists(self.history_path):
+            return []
+        runs = []
+        with open(self.history_path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        runs.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        return runs
+
+    def save_run(self, run):
+        """Añade una ejecución al histórico"""
+        os.makedirs(config.OUTPUT_DIR, exist_ok=True)
+        with open(self.history_path, 'a') as f:
+            f.write(json.dumps(run, default=str) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def find_baseline(self, history, run):
+        """
+        Ejecución de referencia según config.BENCHMARK_BASELINE: 'last' es la
+        ejecución anterior más reciente del mismo dataset, cualquier otro
+        valor es el run_id de una ejecución concreta
+
+        Returns:
+            dict: Ejecución de referencia, o None si no hay ninguna
+        """
+        baseline = config.BENCHMARK_BASELINE
+        if baseline == 'last':
+            candidates = [past for past in history if past.get('dataset') == run['dataset']]
+            return candidates[-1] if candidates else None
+        for past in history:
+            if past.get('run_id') == baseline:
+                return past
+        print(f"⚠ No se encuentra la ejecución de referencia '{baseline}' en {self.history_path}")
+        return None
+
+
+def compare(run, baseline, threshold):
+    """
+    Compara las medianas de una ejecución con las de la referencia
+
+    Una fase es una regresión si su mediana supera la de referencia en más
+    de threshold (fracción) y la diferencia es mayor que el IQR de ambas
+    mediciones. Los algoritmos cuyos parámetros cambiaron no se comparan
+
+    Returns:
+        list: Filas (conjunto, algoritmo, fase, mediana, IQR, mediana de
+            referencia, cambio relativo o None, regresión)
+    """
+    rows = []
+    base_variants = baseline['variants'] if baseline is not None else {}
+    for label, variant in run['variants'].items():
+        base_variant = base_variants.get(label, {})
+        entries = [('Carga', 'load', variant['load'], base_variant.get('load'))]
+        for algo_name, phases in variant['algorithms'].items():
+            base_phases = base_variant.get('algorithms', {}).get(algo_name, {})
+            comparable = base_phases.get('params') == phases['params']
+            for phase in PHASES:
+                if phase in phases:
+                    base = base_phases.get(phase) if comparable else None
+                    entries.append((algo_name, phase, phases[phase], base))
+
+        for algo_name, phase, current, base in entries:
+            change, regression = None, False
+            if base is not None and max(current['median'], base['median']) >= MIN_COMPARABLE_TIME:
+                change = current['median'] / max(base['median'], 1e-9) - 1
+                noise = max(current['iqr'], base['iqr'])
+                regression = (change > threshold and
+                              current['median'] - base['median'] > noise)
+            rows.append((label, algo_name, phase, current['median'], current['iqr'],
+                         base['median'] if base is not None else None, change, regression))
+    return rows
+
+
+def display_comparison(rows, baseline):
+    """Muestra la tabla de tiempos con la comparación frente a la referencia"""
+    reference = f"ref. {baseline['run_id']}" if baseline is not None else "sin referencia"
+    print(f"\n{'Conjunto':<16} {'Algoritmo':<16} {'Fase':<8} {'Mediana (s)':<12} {'IQR (s)':<10} "
+          f"{reference:<22} {'Cambio':<9}")
+    print("-" * 100)
+    for label, algo_name, phase, median, iqr, base_median, change, regression in rows:
+        base_str = f"{base_median:.4f}" if base_median is not None else "-"
+        change_str = f"{change:+.1%}" if change is not None else "-"
+        flag = "  ⚠ REGRESIÓN" if regression else ""
+        print(f"{label:<16} {algo_name:<16} {phase:<8} {median:<12.4f} {iqr:<10.4f} "
+              f"{base_str:<22} {change_str:<9}{flag}")
+
+
+def main():
+    """
+    Función principal. Devuelve 1 si hay regresiones, para poder usarlo
+    en scripts de integración continua
+    """
+    print("\n" + "="*60)
+    print(" BENCHMARK DE RENDIMIENTO - MovieLens")
+    print("="*60)
+
+    benchmark = Benchmark()
+    print(f"Algoritmos: {', '.join(benchmark.algorithms)}")
+    print(f"Repeticiones: {benchmark.repeats} | Folds por repetición: {benchmark.n_folds} | "
+          f"Escalas sintéticas: {benchmark.scales or 'ninguna'}\n")
+
+    history = benchmark.load_history()
+    run = benchmark.run()
+    baseline = benchmark.find_baseline(history, run)
+
+    rows = compare(run, baseline, config.BENCHMARK_REGRESSION_THRESHOLD)
+    display_comparison(rows, baseline)
+    benchmark.save_run(run)
+    print(f"\n✓ Ejecución {run['run_id']} guardada en: {benchmark.history_path}")
+
+    regressions = [row for row in rows if row[-1]]
+    if regressions:
+        print(f"⚠ {len(regressions)} fases más lentas que la referencia "
+              f"(umbral {config.BENCHMARK_REGRESSION_THRESHOLD:.0%})")
+        return 1
+    if baseline is not None:
+        print("✓ Sin regresiones respecto a la referencia")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Checkpoint de la evaluación
+Guarda en un fichero JSON Lines cada fold y cada algoritmo en cuanto terminan,
+para que una ejecución interrumpida pueda retomarse sin repetir lo ya hecho
+"""
+
+import os
+import json
+import threading
+
+
+def make_key(dataset, algo_name, params, cv_folds, seed, metrics):
+    """
+    Clave que identifica una evaluación: dos evaluaciones con la misma clave
+    producen los mismos folds, el mismo algoritmo y las mismas métricas
+
+    Returns:
+        str: Clave serializada de forma estable
+    """
+    return json.dumps({
+        'dataset': dataset,
+        'algorithm': algo_name,
+        'params': params,
+        'cv_folds': cv_folds,
+        'seed': seed,
+        'metrics': metrics,
+    }, sort_keys=True, default=str)
+
+
+class Checkpoint:
+    """
+    Registro durable (append-only) de folds y resultados terminados
+    """
+
+    def __init__(self, file_path):
+        """
+        Args:
+            file_path: Ruta del fichero .jsonl del checkpoint
+        """
+        self.file_path = file_path
+        self.results = {}  # clave -> fila de resultados
+        self.folds = {}  # clave -> {fold_index: métricas del fold}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        """
+        Lee el checkpoint existente. Si la última línea quedó incompleta por
+        una interrupción durante la escritura, se descarta y se recorta del
+        fichero para que las nuevas entradas empiecen en una línea limpia
+        """
+        if not os.path.exists(self.file_path):
+            return
+
+        valid_size = 0
+        with open(self.file_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                valid_size += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+
+                if entry['type'] == 'fold':
+                    self.folds.setdefault(entry['key'], {})[entry['fold']] = entry['metrics']
+                elif entry['type'] == 'result':
+                    self.results[entry['key']] = entry['result']
+
+        if valid_size < os.path.getsize(self.file_path):
+            with open(self.file_path, 'r+b') as f:
+                f.truncate(valid_size)
+
+    def _append(self, entry):
+        """Añade una entrada al fichero y la fuerza a disco"""
+        with self._lock:
+            directory = os.path.dirname(self.file_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.file_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, default=float) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+    def get_result(self, key):
+        """Fila de resultados ya terminada para una clave, o None"""
+        return self.results.get(key)
+
+    def get_folds(self, key):
+        """Métricas de los folds ya terminados para una clave (dict fold -> métricas)"""
+        return dict(self.folds.get(key, {}))
+
+    def record_fold(self, key, fold_index, metrics):
+        """Registra un fold terminado (los valores None, como la memoria pico sin medir, se guardan tal cual)"""
+        metrics = {name: None if value is None else float(value) for name, value in metrics.items()}
+        self.folds.setdefault(key, {})[fold_index] = metrics
+        self._append({'type': 'fold', 'key': key, 'fold': fold_index, 'metrics': metrics})
+
+    def record_result(self, key, result):
+        """Registra la fila de resultados de un algoritmo terminado"""
+        self.results[key] = result
+        self._append({'type': 'result', 'key': key, 'result': result})
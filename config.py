@@ -4,7 +4,7 @@ Permite seleccionar el dataset a utilizar y otros parámetros
 """
 
 # ===== CONFIGURACIÓN DEL DATASET =====
-# Opciones: '100k' o '32m'
+# Opciones: '100k', '32m' o 'synthetic' (generado con synthetic.py)
 DATASET = '100k'  # Cambiar a '32m' para usar el dataset más grande
 
 # ===== RUTAS DE LOS DATASETS =====
@@ -13,18 +13,209 @@ DATASET_PATHS = {
         'base': 'ml-100k/u1.base',
         'test': 'ml-100k/u1.test',
         'full': 'ml-100k/u.data',  # Archivo con todos los datos
+        'zip': 'ml-100k.zip',  # Si no se extrajo, u.data se lee del zip
     },
     '32m': {
         'ratings': 'ml-32m/ratings.csv',
+        'zip': 'ml-32m.zip',  # Si no se extrajo, ratings.csv se lee del zip
+    },
+    'synthetic': {
+        'ratings': 'ml-synthetic/ratings.csv',  # Formato de ml-32m
+        'full': 'ml-synthetic/u.data',  # Formato de ml-100k
     }
 }
 
+# ===== DATASET SINTÉTICO (DATASET = 'synthetic' o python synthetic.py) =====
+# Ratings a generar (se escriben por bloques de CSV_CHUNK_SIZE,
+# con memoria constante)
+SYNTHETIC_N_RATINGS = 1_000_000
+
+# Usuarios y películas. None = los usuarios crecen con los ratings (mismos
+# ratings por usuario que la referencia) y las películas con su raíz cuadrada
+SYNTHETIC_N_USERS = None
+SYNTHETIC_N_ITEMS = None
+
+# Dataset cuya popularidad de usuarios y películas y distribución de ratings
+# se imita ('100k' o '32m'; si no está descargado, un perfil de ml-100k)
+SYNTHETIC_REFERENCE = '100k'
+
+# Formato del fichero generado: '32m' (ratings.csv) o '100k' (u.data)
+SYNTHETIC_FORMAT = '32m'
+
+SYNTHETIC_SEED = 42
+
+# ===== CACHÉ BINARIA DE RATINGS =====
+# Si True, la primera carga guarda los ratings parseados en formato binario
+# (.npy) y las siguientes los leen con mmap sin volver a parsear el texto
+USE_RATINGS_CACHE = True
+
+# Directorio donde se guarda la caché
+CACHE_DIR = 'cache'
+
+# Si True, los resultados se guardan en CACHE_DIR/results indexados por un hash
+# del fichero del dataset, el algoritmo, sus parámetros, los folds, la semilla
+# y la versión de Surprise, y una evaluación idéntica se devuelve al instante
+USE_RESULT_CACHE = True
+
+# Número máximo de resultados en la caché (se expulsan los menos usados)
+RESULT_CACHE_MAX_ENTRIES = 500
+
+# Filas por bloque al leer ratings.csv de ml-32m (acota la memoria de la carga)
+CSV_CHUNK_SIZE = 1_000_000
+
 # ===== CONFIGURACIÓN DE LA EVALUACIÓN =====
 # Número de folds para validación cruzada
 CV_FOLDS = 5
 
+# Semilla con la que se generan las particiones de la validación cruzada.
+# Todos los algoritmos se evalúan sobre los mismos folds
+RANDOM_SEED = 42
+
+# Partición train/test de la evaluación:
+# - 'kfold': validación cruzada con CV_FOLDS particiones aleatorias
+# - 'temporal': un único corte global por fecha; los ratings posteriores al
+#   corte van al test (no se entrena con ratings del futuro)
+# - 'leave_last_n': los LEAVE_LAST_N ratings más recientes de cada usuario
+#   van al test
+SPLIT_STRATEGY = 'kfold'
+
+# Fracción de los ratings más recientes que forman el test con 'temporal'
+TEMPORAL_TEST_FRACTION = 0.2
+
+# Fecha de corte de 'temporal' ('AAAA-MM-DD' o timestamp). Si se indica,
+# sustituye a TEMPORAL_TEST_FRACTION
+TEMPORAL_CUTOFF = None
+
+# Ratings por usuario que van al test con 'leave_last_n' (solo usuarios con
+# más de LEAVE_LAST_N ratings)
+LEAVE_LAST_N = 1
+
+# Si True, los trainsets de cada fold se construyen una vez y se reutilizan
+# para todos los algoritmos (más rápido, pero ocupa unos 290 bytes por rating
+# de entrenamiento y fold: unos 35 GB con 5 folds de ml-32m). Si False, solo
+# está en memoria el trainset del fold en uso. 'auto' = True si los trainsets
+# de todos los folds caben en la cuarta parte del presupuesto de memoria
+KEEP_TRAINSETS_IN_MEMORY = 'auto'
+
+# Si True, las predicciones del testset de los modelos de factores, sesgos,
+# CoClustering, SlopeOne, NormalPredictor y KNN dispersos se calculan con
+# operaciones de NumPy en lugar de con una llamada a predict() por rating
+# (mismas métricas)
+VECTORIZED_TESTING = True
+
 # Métricas a calcular
-METRICS = ['RMSE', 'MAE']
+# - De error: 'RMSE', 'MAE', 'MSE', 'FCP' (RMSE y MAE se calculan siempre)
+# - De ranking top-K: 'Precision@K', 'Recall@K', 'NDCG@K', 'MAP@K'. Solo para
+#   los algoritmos que se pueden puntuar por bloques (todos salvo los KNN de
+#   Surprise cuando USE_SPARSE_KNN = False)
+METRICS = ['RMSE', 'MAE', 'Precision@K', 'Recall@K', 'NDCG@K', 'MAP@K']
+
+# Longitud de la lista de recomendaciones en las métricas de ranking
+RANKING_K = 10
+
+# Rating mínimo para que una película de test cuente como relevante
+RELEVANCE_THRESHOLD = 4.0
+
+# Usuarios puntuados a la vez al calcular las métricas de ranking. Cada bloque
+# ocupa RANKING_BATCH_SIZE x número de películas valores float32
+RANKING_BATCH_SIZE = 256
+
+# ===== MOTOR KNN DISPERSO =====
+# Si True, KNNBasic, KNNWithMeans, KNNWithZScore y KNNBaseline calculan las
+# similitudes por bloques sobre una matriz dispersa y guardan solo los vecinos
+# más similares de cada usuario (o película). Si False, se usan los de
+# Surprise, que necesitan una matriz de similitud densa n x n
+USE_SPARSE_KNN = True
+
+# Vecinos guardados por usuario (o película). Las predicciones usan los k más
+# similares de entre estos que hayan valorado la película; con un valor mayor
+# o igual al número de usuarios (o películas) el resultado es el mismo que en
+# Surprise (salvo similitudes que solo empatan al redondearlas a float32). Ocupa
+# n_usuarios x KNN_MAX_NEIGHBORS x 8 bytes (unos 1,6 GB en 32M)
+KNN_MAX_NEIGHBORS = 1000
+
+# Memoria aproximada de los bloques de similitud en cálculo (MB)
+KNN_BLOCK_MEMORY_MB = 512
+
+# Hilos que calculan bloques en paralelo (None = núcleos / N_JOBS)
+KNN_N_THREADS = None
+
+# ===== SLOPEONE DISPERSO =====
+# Si True, 'SlopeOne' usa la versión de slope_one.py, que calcula las
+# desviaciones entre películas por bloques y solo guarda los pares valorados
+# a la vez por algún usuario. Admite en ALGORITHM_PARAMS min_support (mínimo
+# de usuarios en común de un par) y max_pairs (pares guardados por película,
+# None = todos), que acotan la memoria del modelo a unos
+# n_películas x max_pairs x 8 bytes. Si False, se usa SlopeOne de Surprise,
+# con matrices densas n_películas x n_películas (unos 60 GB en 32M)
+USE_SPARSE_SLOPE_ONE = True
+
+# Memoria aproximada de los bloques de desviaciones en cálculo (MB)
+SLOPE_ONE_BLOCK_MEMORY_MB = 512
+
+# Hilos que calculan bloques en paralelo (None = núcleos / N_JOBS)
+SLOPE_ONE_N_THREADS = None
+
+# ===== MOTOR DE FACTORIZACIÓN =====
+# ALS (mínimos cuadrados alternos por bloques) y ParallelSGD (SGD por minilotes
+# en varios hilos, sin bloqueos) entrenan el mismo modelo que SVD sin recorrer
+# los ratings de uno en uno. Sus parámetros están en ALGORITHM_PARAMS
+# Hilos de entrenamiento (None = núcleos / N_JOBS). No se ha medido que
+# aceleren con varios núcleos: ParallelSGD mantiene el GIL casi todo el
+# tiempo y su RMSE cambia con el número de hilos
+FACTORIZATION_N_THREADS = None
+
+# Si True, 'SVDpp' usa la versión de factorization.py, que guarda la suma de
+# la retroalimentación implícita de cada usuario y la actualiza en O(k) por
+# rating en lugar de recalcularla (mismos parámetros y resultados
+# equivalentes). Si False, se usa SVDpp de Surprise, cuyo coste por época
+# crece con el cuadrado de los ratings de cada usuario
+USE_FAST_SVDPP = True
+
+# ===== PARADA TEMPRANA =====
+# Si True, los algoritmos que se entrenan época a época (ALS, ParallelSGD y
+# SVDpp de factorization.py, y SVD, NMF y BaselineOnly con USE_EPOCH_MODELS)
+# reservan EARLY_STOPPING_VALIDATION_FRACTION de los ratings de
+# entrenamiento de cada fold para validación, miden su RMSE tras cada época
+# y dejan de entrenar cuando lleva EARLY_STOPPING_PATIENCE épocas sin
+# mejorar (n_epochs pasa a ser el máximo). El modelo final es el de la mejor
+# época. CoClustering y los SVD, NMF y BaselineOnly de Surprise entrenan
+# todas sus épocas en una sola llamada y no la admiten
+EARLY_STOPPING = False
+EARLY_STOPPING_VALIDATION_FRACTION = 0.1
+EARLY_STOPPING_PATIENCE = 2
+
+# Mejora mínima del RMSE de validación para que una época cuente como mejor
+EARLY_STOPPING_MIN_DELTA = 1e-4
+
+# Si True, tras encontrar la mejor época el modelo se reentrena con todo el
+# trainset del fold durante ese número de épocas (más lento). Si False, el
+# modelo evaluado no ha visto los ratings de validación
+EARLY_STOPPING_REFIT = False
+
+# Si True, SVD, NMF y BaselineOnly se entrenan con las versiones época a
+# época de factorization.py (mismos parámetros, admiten parada temprana) en
+# lugar de con las de Surprise, que son más rápidas con un núcleo
+USE_EPOCH_MODELS = False
+
+# ===== CONFIGURACIÓN DEL PARALELISMO =====
+# Número de procesos que evalúan algoritmos (y cada uno de sus folds) en paralelo
+# 1 = ejecución secuencial, None = usar todos los núcleos disponibles
+N_JOBS = 1
+
+# ===== PRESUPUESTO DE MEMORIA =====
+# Antes de empezar se estima la memoria de cada algoritmo a partir del número
+# de usuarios, películas y ratings. Si la memoria actual del proceso más la
+# estimación (por cada proceso en paralelo) supera el presupuesto:
+# - 'skip': el algoritmo no se evalúa y aparece en el CSV con el motivo
+# - 'last': se evalúa después de todos los demás, que ya quedan guardados
+# - 'warn': solo se avisa
+MEMORY_BUDGET_ACTION = 'skip'
+
+# Presupuesto en MB. None = MEMORY_BUDGET_FRACTION de la memoria de la
+# máquina (o del límite del contenedor, si es menor)
+MEMORY_BUDGET_MB = None
+MEMORY_BUDGET_FRACTION = 0.9
 
 # ===== CONFIGURACIÓN DE LOS ALGORITMOS =====
 # Si True, se ejecutan todos los algoritmos
@@ -45,9 +236,27 @@ OUTPUT_DIR = 'resultados'
 # Nombre del archivo de resultados
 RESULTS_FILE = f'resultados_{DATASET}.csv'
 
+# Si True, cada fold y cada algoritmo terminado se guardan en
+# OUTPUT_DIR/checkpoint_{DATASET}.jsonl. Al volver a ejecutar con la misma
+# configuración se omite todo lo que ya terminó
+USE_CHECKPOINT = True
+
+# Subdirectorio de OUTPUT_DIR donde se guardan los modelos entrenados
+# (python model_store.py entrena con todos los datos y guarda cada algoritmo)
+MODELS_SUBDIR = 'modelos'
+
 # Mostrar detalles durante la ejecución
 VERBOSE = True
 
+# ===== TELEMETRÍA =====
+# Si True, cada fase de la ejecución (carga, codificación de ids, partición,
+# fit, predicción, métricas, guardado...) se registra como un tramo con su
+# duración, tiempo de CPU y variación de memoria en
+# OUTPUT_DIR/telemetria_{DATASET}.jsonl (una línea JSON por tramo), y al
+# terminar se muestra en qué fases se fue el tiempo de cada algoritmo
+# (también con: python telemetry.py). Desactivada no mide nada
+TELEMETRY = False
+
 # ===== PARÁMETROS DE LOS ALGORITMOS =====
 # Aquí se pueden ajustar los hiperparámetros de cada algoritmo
 ALGORITHM_PARAMS = {
@@ -99,6 +308,18 @@ ALGORITHM_PARAMS = {
         'n_factors': 15,
         'n_epochs': 50
     },
+    'ALS': {
+        'n_factors': 50,
+        'n_epochs': 10,
+        'reg': 0.15
+    },
+    'ParallelSGD': {
+        'n_factors': 100,
+        'n_epochs': 20,
+        'lr_all': 0.005,
+        'reg_all': 0.02,
+        'batch_size': 4096
+    },
     'SlopeOne': {},
     'CoClustering': {
         'n_cltr_u': 3,
@@ -113,3 +334,98 @@ ALGORITHM_PARAMS = {
     },
     'NormalPredictor': {}
 }
+
+# ===== SERVICIO DE RECOMENDACIONES TOP-N (python serving.py) =====
+# Algoritmo cuyos factores se exportan (SVD, SVDpp, NMF o BaselineOnly)
+SERVING_ALGORITHM = 'SVD'
+
+# Número de películas recomendadas por usuario
+SERVING_TOP_N = 10
+
+# Usuarios por lote en las consultas por lotes
+SERVING_BATCH_SIZE = 256
+
+# ===== ACTUALIZACIÓN INCREMENTAL (python incremental.py) =====
+# Modelo guardado (SVD o NMF, con python model_store.py) que se actualiza
+INCREMENTAL_ALGORITHM = 'SVD'
+
+# Fichero con los ratings nuevos (mismo formato que ratings.csv de ml-32m:
+# userId,movieId,rating,timestamp)
+INCREMENTAL_DELTA_FILE = 'nuevos_ratings.csv'
+
+# Épocas que actualizan los usuarios y películas afectados. Más épocas
+# sobreajustan un modelo ya entrenado
+INCREMENTAL_EPOCHS = 3
+
+# Ratings por minilote en las épocas de SGD
+INCREMENTAL_BATCH_SIZE = 1024
+
+# Fracciones de los ratings más recientes que el benchmark
+# (python incremental.py benchmark) usa como ratings nuevos y como test
+INCREMENTAL_BENCHMARK_DELTA = 0.05
+INCREMENTAL_BENCHMARK_TEST = 0.05
+
+# ===== BENCHMARK DE RENDIMIENTO (python benchmark.py) =====
+# Algoritmos medidos (None = los mismos que en la evaluación)
+BENCHMARK_ALGORITHMS = None
+
+# Repeticiones de cada medida (se guardan la mediana y el rango intercuartílico)
+BENCHMARK_REPEATS = 5
+
+# Folds medidos en cada repetición (siempre los primeros de la partición)
+BENCHMARK_FOLDS = 1
+
+# Datasets sintéticos: múltiplos del número de usuarios (y de ratings) del
+# dataset cargado, creados replicando usuarios. [] = solo el dataset real
+BENCHMARK_SYNTHETIC_SCALES = [0.5, 2]
+
+# Histórico de ejecuciones (en OUTPUT_DIR, una línea JSON por ejecución)
+BENCHMARK_HISTORY_FILE = 'benchmark_history.jsonl'
+
+# Ejecución de referencia: 'last' (la anterior del mismo dataset) o un run_id
+BENCHMARK_BASELINE = 'last'
+
+# Una fase es una regresión si su mediana supera la de la referencia en más
+# de esta fracción (y en más que la variabilidad medida)
+BENCHMARK_REGRESSION_THRESHOLD = 0.10
+
+# ===== BÚSQUEDA DE HIPERPARÁMETROS (python tuning.py) =====
+# Algoritmos a ajustar (deben tener un espacio de búsqueda en SEARCH_SPACES)
+TUNING_ALGORITHMS = ['SVD']
+
+# 'grid' prueba todas las combinaciones, 'random' muestrea TUNING_N_CANDIDATES
+TUNING_METHOD = 'grid'
+TUNING_N_CANDIDATES = 20
+
+# Successive halving: en cada ronda solo sobrevive 1/TUNING_HALVING_FACTOR de
+# los candidatos, que pasan a evaluarse en más folds
+TUNING_HALVING_FACTOR = 3
+
+# Valores a probar para cada parámetro. Los parámetros no incluidos se toman
+# de ALGORITHM_PARAMS
+SEARCH_SPACES = {
+    'SVD': {
+        'n_factors': [50, 100, 150],
+        'n_epochs': [20, 30],
+        'lr_all': [0.005, 0.01],
+        'reg_all': [0.02, 0.05, 0.1]
+    },
+    'SVDpp': {
+        'n_factors': [10, 20, 50],
+        'lr_all': [0.005, 0.007],
+        'reg_all': [0.02, 0.05]
+    },
+    'NMF': {
+        'n_factors': [10, 15, 30],
+        'n_epochs': [50, 100]
+    },
+    'ALS': {
+        'n_factors': [20, 50, 100],
+        'n_epochs': [5, 10, 15],
+        'reg': [0.05, 0.1, 0.15, 0.2]
+    },
+    'KNNBaseline': {
+        'k': [20, 40, 80],
+        'min_k': [1, 5]
+    }
+}
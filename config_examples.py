@@ -73,7 +73,13 @@ EXAMPLE_5_QUICK_32M = {
         'SlopeOne'
     ],
     'CV_FOLDS': 3,
-    'VERBOSE': False
+    'VERBOSE': False,
+    'ALGORITHM_PARAMS': {
+        'SlopeOne': {
+            'min_support': 5,      # Descarta pares con pocos usuarios en común
+            'max_pairs': 2000      # Pares por película (unos 1,4 GB en 32M)
+        }
+    }
 }
 
 # ============================================================================
@@ -168,6 +174,30 @@ EXAMPLE_10_PRODUCTION_READY = {
     }
 }
 
+# ============================================================================
+# EJEMPLO 11: BÚSQUEDA AUTOMÁTICA DE HIPERPARÁMETROS DE SVD
+# Tiempo estimado: proporcional a candidatos / núcleos
+# Se ejecuta con: python tuning.py
+# ============================================================================
+EXAMPLE_11_SVD_SEARCH = {
+    'DATASET': '100k',
+    'RUN_ALL_ALGORITHMS': False,
+    'SELECTED_ALGORITHMS': ['SVD'],
+    'CV_FOLDS': 3,
+    'N_JOBS': None,               # Todos los núcleos
+    'TUNING_ALGORITHMS': ['SVD'],
+    'TUNING_METHOD': 'grid',
+    'TUNING_HALVING_FACTOR': 3,
+    'SEARCH_SPACES': {
+        'SVD': {
+            'n_factors': [50, 100, 150],
+            'n_epochs': [20, 30],
+            'lr_all': [0.005, 0.01],
+            'reg_all': [0.02, 0.05, 0.1]
+        }
+    }
+}
+
 
 # ============================================================================
 # INSTRUCCIONES DE USO
@@ -205,6 +235,7 @@ def print_examples():
         ("ITEM-BASED VS USER-BASED", EXAMPLE_8_ITEM_VS_USER, "~8 min"),
         ("BASELINE COMPARISON", EXAMPLE_9_BASELINE, "~2 min"),
         ("ALGORITMOS PRODUCCIÓN", EXAMPLE_10_PRODUCTION_READY, "~5 min"),
+        ("BÚSQUEDA SVD (tuning.py)", EXAMPLE_11_SVD_SEARCH, "~candidatos/núcleos"),
     ]
     
     print("\n" + "="*80)
@@ -1,93 +1,424 @@
 #!/usr/bin/env python3
 """
 Script para descargar y descomprimir los datasets de MovieLens
-Descarga automáticamente ml-100k y ml-32m desde los servidores de GroupLens
+Descarga automáticamente ml-100k y ml-32m desde los servidores de GroupLens,
+por piezas en paralelo (peticiones HTTP Range), reanudando las descargas
+interrumpidas y verificando el checksum mientras se descarga
+
+Uso:
+    python download_datasets.py                # Solo ml-100k
+    python download_datasets.py 100k 32m       # Ambos datasets
+    python download_datasets.py 32m --keep-zip --connections 8
 """
 
 import os
+import re
+import sys
+import json
+import time
+import queue
+import hashlib
+import argparse
+import threading
 import urllib.request
 import zipfile
-import sys
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 
-# URLs de descarga de los datasets
+# URLs de descarga de los datasets. GroupLens publica el MD5 de cada zip
+# en un fichero .md5 junto al zip
 DATASETS = {
     '100k': {
         'url': 'https://files.grouplens.org/datasets/movielens/ml-100k.zip',
+        'checksum_url': 'https://files.grouplens.org/datasets/movielens/ml-100k.zip.md5',
         'zip_file': 'ml-100k.zip',
         'extract_dir': 'ml-100k',
         'size': '~5 MB'
     },
     '32m': {
         'url': 'https://files.grouplens.org/datasets/movielens/ml-32m.zip',
+        'checksum_url': 'https://files.grouplens.org/datasets/movielens/ml-32m.zip.md5',
         'zip_file': 'ml-32m.zip',
         'extract_dir': 'ml-32m',
         'size': '~800 MB'
     }
 }
 
+# Tamaño de las piezas que se piden con cada petición Range
+PIECE_SIZE = 8 * 1024 * 1024
+
+# Conexiones simultáneas por defecto
+N_CONNECTIONS = 4
+
+# Bytes leídos de la respuesta en cada lectura
+READ_SIZE = 256 * 1024
+
+# Segundos de espera de cada petición y reintentos por pieza
+TIMEOUT = 30
+RETRIES = 3
+
+USER_AGENT = 'MovieLens-100k-downloader'
+
+
+class DownloadError(Exception):
+    """Error de una descarga que no se puede completar"""
+
+
+def _request(url, start=None, end=None):
+    """Abre una petición GET, opcionalmente solo del rango de bytes [start, end]"""
+    headers = {'User-Agent': USER_AGENT}
+    if start is not None:
+        headers['Range'] = f'bytes={start}-{"" if end is None else end}'
+    return urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=TIMEOUT)
+
 
-def download_file(url, destination, description):
+def probe(url):
+    """
+    Consulta el tamaño del fichero y si el servidor acepta peticiones Range,
+    pidiendo solo el primer byte
+
+    Returns:
+        dict: 'size' (None si no se conoce), 'ranges' (bool) y 'etag'
+    """
+    with _request(url, 0, 0) as response:
+        etag = response.headers.get('ETag')
+        content_range = response.headers.get('Content-Range', '')
+        match = re.match(r'bytes\s+\d+-\d+/(\d+)', content_range)
+        if response.status == 206 and match:
+            return {'size': int(match.group(1)), 'ranges': True, 'etag': etag}
+        length = response.headers.get('Content-Length')
+        return {'size': int(length) if length else None, 'ranges': False, 'etag': etag}
+
+
+def fetch_checksum(checksum_url):
+    """
+    Descarga el MD5 publicado ('MD5 (fichero) = hex' o 'hex  fichero')
+
+    Returns:
+        str: MD5 en hexadecimal, o None si no se puede obtener
+    """
+    try:
+        with _request(checksum_url) as response:
+            text = response.read(4096).decode('utf-8', errors='replace')
+    except Exception:
+        return None
+    match = re.search(r'\b([0-9a-fA-F]{32})\b', text)
+    return match.group(1).lower() if match else None
+
+
+class StreamingHasher:
+    """
+    Calcula el hash del fichero en orden mientras las piezas llegan
+    desordenadas de varias conexiones: los bloques que llegan antes de su
+    turno esperan en memoria, y las conexiones que van demasiado adelantadas
+    respecto al hash se detienen hasta que este las alcanza, de modo que la
+    memoria queda acotada y el fichero nunca se vuelve a leer entero
+    """
+
+    def __init__(self, algorithm='md5', window=None):
+        """
+        Args:
+            algorithm: Algoritmo de hashlib
+            window: Bytes que una conexión puede adelantarse al hash
+        """
+        self.hash = hashlib.new(algorithm)
+        self.offset = 0
+        self.window = window
+        self.pending = {}
+        self.aborted = False
+        self._condition = threading.Condition()
+
+    def update(self, offset, data):
+        """Añade los bytes que empiezan en offset (en cualquier orden)"""
+        with self._condition:
+            if offset != self.offset:
+                self.pending[offset] = data
+                return
+            self.hash.update(data)
+            self.offset += len(data)
+            while self.offset in self.pending:
+                data = self.pending.pop(self.offset)
+                self.hash.update(data)
+                self.offset += len(data)
+            self._condition.notify_all()
+
+    def wait_turn(self, offset):
+        """Espera a que offset esté dentro de la ventana permitida"""
+        if self.window is None:
+            return
+        with self._condition:
+            while offset - self.offset > self.window and not self.aborted:
+                self._condition.wait(timeout=1.0)
+
+    def abort(self):
+        """Libera a las conexiones que esperan (tras un error)"""
+        with self._condition:
+            self.aborted = True
+            self._condition.notify_all()
+
+    def hexdigest(self):
+        return self.hash.hexdigest()
+
+
+class ResumableDownload:
+    """
+    Descarga un fichero por piezas en paralelo sobre destination.part. Las
+    piezas terminadas se anotan en destination.part.json, de modo que una
+    descarga interrumpida continúa donde se quedó
+    """
+
+    def __init__(self, url, destination, expected_md5=None, n_connections=N_CONNECTIONS,
+                 piece_size=PIECE_SIZE):
+        """
+        Args:
+            url: URL del fichero
+            destination: Ruta final del fichero descargado
+            expected_md5: MD5 esperado (None = solo se calcula y se muestra)
+            n_connections: Conexiones simultáneas
+            piece_size: Bytes por pieza
+        """
+        self.url = url
+        self.destination = destination
+        self.part_path = destination + '.part'
+        self.state_path = destination + '.part.json'
+        self.expected_md5 = expected_md5
+        self.n_connections = max(1, n_connections)
+        self.piece_size = piece_size
+        self.downloaded = 0
+        self._lock = threading.Lock()
+
+    def _load_state(self, info):
+        """Piezas ya descargadas, si el fichero remoto no ha cambiado"""
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return set()
+        same_file = (state.get('url') == self.url and state.get('size') == info['size'] and
+                     state.get('etag') == info['etag'] and state.get('piece_size') == self.piece_size)
+        if not same_file or not os.path.exists(self.part_path) or \
+                os.path.getsize(self.part_path) != info['size']:
+            return set()
+        return set(state.get('done', []))
+
+    def _save_state(self, info, done):
+        """Guarda las piezas terminadas (escritura atómica)"""
+        state = {'url': self.url, 'size': info['size'], 'etag': info['etag'],
+                 'piece_size': self.piece_size, 'done': sorted(done)}
+        with open(self.state_path + '.tmp', 'w') as f:
+            json.dump(state, f)
+        os.replace(self.state_path + '.tmp', self.state_path)
+
+    def _clear(self):
+        """Elimina el fichero parcial y su estado"""
+        for path in (self.part_path, self.state_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _fetch_piece(self, hasher, start, end):
+        """
+        Descarga el rango [start, end] en el fichero parcial, reintentando
+        desde el último byte recibido si la conexión se corta
+        """
+        position = start
+        for attempt in range(RETRIES + 1):
+            try:
+                with _request(self.url, position, end) as response, open(self.part_path, 'r+b') as f:
+                    if response.status != 206:
+                        raise DownloadError(f"El servidor no respetó el rango {position}-{end}")
+                    f.seek(position)
+                    while position <= end:
+                        if hasher.aborted:
+                            raise DownloadError("Descarga cancelada")
+                        data = response.read(min(READ_SIZE, end + 1 - position))
+                        if not data:
+                            raise DownloadError(f"Conexión cerrada en el byte {position}")
+                        f.write(data)
+                        hasher.update(position, data)
+                        position += len(data)
+                        with self._lock:
+                            self.downloaded += len(data)
+                return
+            except Exception:
+                if attempt == RETRIES or hasher.aborted:
+                    raise
+                time.sleep(2 ** attempt)
+
+    def _hash_local_piece(self, hasher, start, end):
+        """Pasa por el hash una pieza descargada en una ejecución anterior"""
+        with open(self.part_path, 'rb') as f:
+            f.seek(start)
+            position = start
+            while position <= end:
+                data = f.read(min(READ_SIZE, end + 1 - position))
+                hasher.update(position, data)
+                position += len(data)
+
+    def _download_pieces(self, info, report_progress):
+        """Descarga todas las piezas pendientes con n_connections hilos"""
+        size = info['size']
+        n_pieces = (size + self.piece_size - 1) // self.piece_size
+        done = self._load_state(info)
+        if not done:
+            self._clear()
+            with open(self.part_path, 'wb') as f:
+                f.truncate(size)
+        self.downloaded = sum(min(self.piece_size, size - i * self.piece_size) for i in done)
+        resumed = self.downloaded
+
+        hasher = StreamingHasher('md5', window=2 * self.n_connections * self.piece_size)
+        pieces = queue.Queue()
+        for index in range(n_pieces):
+            pieces.put(index)
+
+        def worker():
+            while not hasher.aborted:
+                try:
+                    index = pieces.get_nowait()
+                except queue.Empty:
+                    return
+                start = index * self.piece_size
+                end = min(start + self.piece_size, size) - 1
+                hasher.wait_turn(start)
+                if index in done:
+                    self._hash_local_piece(hasher, start, end)
+                    continue
+                self._fetch_piece(hasher, start, end)
+                with self._lock:
+                    done.add(index)
+                    self._save_state(info, done)
+
+        with ThreadPoolExecutor(max_workers=self.n_connections) as executor:
+            futures = [executor.submit(worker) for _ in range(self.n_connections)]
+            try:
+                while not all(future.done() for future in futures):
+                    time.sleep(0.2)
+                    report_progress(self.downloaded, size)
+                    if any(future.done() and future.exception() for future in futures):
+                        hasher.abort()
+                for future in futures:
+                    future.result()
+            except BaseException:
+                hasher.abort()
+                raise
+        report_progress(self.downloaded, size)
+        return hasher.hexdigest(), resumed
+
+    def _download_stream(self, info, report_progress):
+        """Descarga en una sola conexión (servidores sin peticiones Range)"""
+        self._clear()
+        hasher = StreamingHasher('md5')
+        with _request(self.url) as response, open(self.part_path, 'wb') as f:
+            while True:
+                data = response.read(READ_SIZE)
+                if not data:
+                    break
+                f.write(data)
+                hasher.update(self.downloaded, data)
+                self.downloaded += len(data)
+                report_progress(self.downloaded, info['size'])
+        if info['size'] is not None and self.downloaded != info['size']:
+            raise DownloadError(f"Descarga incompleta: {self.downloaded} de {info['size']} bytes")
+        return hasher.hexdigest(), 0
+
+    def run(self, report_progress=lambda downloaded, total: None):
+        """
+        Descarga el fichero, verifica su MD5 y lo mueve a destination
+
+        Returns:
+            dict: 'md5', 'size' y 'resumed' (bytes que ya estaban descargados)
+
+        Raises:
+            DownloadError: Si la descarga falla o el MD5 no coincide
+        """
+        info = probe(self.url)
+        if info['ranges'] and info['size']:
+            digest, resumed = self._download_pieces(info, report_progress)
+        else:
+            digest, resumed = self._download_stream(info, report_progress)
+
+        if self.expected_md5 is not None and digest != self.expected_md5.lower():
+            self._clear()
+            raise DownloadError(f"MD5 incorrecto: {digest} (esperado {self.expected_md5})")
+
+        os.replace(self.part_path, self.destination)
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+        return {'md5': digest, 'size': self.downloaded, 'resumed': resumed}
+
+
+def download_file(url, destination, description, checksum_url=None, n_connections=N_CONNECTIONS):
     """
     Descarga un archivo con barra de progreso
-    
+
     Args:
         url: URL del archivo a descargar
         destination: Ruta donde guardar el archivo
         description: Descripción del archivo
+        checksum_url: URL del fichero .md5 publicado (None = sin verificar)
+        n_connections: Conexiones simultáneas
     """
     print(f"\nDescargando {description}...")
     print(f"URL: {url}")
     print(f"Destino: {destination}")
-    
-    def report_progress(block_num, block_size, total_size):
-        downloaded = block_num * block_size
-        if total_size > 0:
+
+    expected_md5 = fetch_checksum(checksum_url) if checksum_url else None
+    if checksum_url and expected_md5 is None:
+        print("⚠ No se pudo obtener el MD5 publicado; la descarga no se verificará")
+
+    def report_progress(downloaded, total_size):
+        downloaded_mb = downloaded / (1024 * 1024)
+        if total_size:
             percent = min(downloaded * 100 / total_size, 100)
-            downloaded_mb = downloaded / (1024 * 1024)
             total_mb = total_size / (1024 * 1024)
             bar_length = 50
             filled = int(bar_length * percent / 100)
             bar = '█' * filled + '░' * (bar_length - filled)
             print(f'\r[{bar}] {percent:.1f}% ({downloaded_mb:.1f}/{total_mb:.1f} MB)', end='')
         else:
-            downloaded_mb = downloaded / (1024 * 1024)
             print(f'\rDescargado: {downloaded_mb:.1f} MB', end='')
-    
+
     try:
-        urllib.request.urlretrieve(url, destination, reporthook=report_progress)
+        download = ResumableDownload(url, destination, expected_md5, n_connections)
+        stats = download.run(report_progress)
         print('\n✓ Descarga completada')
+        if stats['resumed']:
+            print(f"  - Reanudada: {stats['resumed'] / (1024 * 1024):.1f} MB ya estaban descargados")
+        if expected_md5 is not None:
+            print(f"✓ MD5 verificado: {stats['md5']}")
+        else:
+            print(f"  - MD5: {stats['md5']}")
         return True
     except Exception as e:
         print(f'\n✗ Error en la descarga: {e}')
+        print("  Vuelve a ejecutar el script para reanudarla")
         return False
 
 
 def extract_zip(zip_path, extract_to='.'):
     """
     Extrae un archivo ZIP
-    
+
     Args:
         zip_path: Ruta del archivo ZIP
         extract_to: Directorio donde extraer
     """
     print(f"Extrayendo {zip_path}...")
-    
+
     try:
         with zipfile.ZipFile(zip_path, 'r') as zip_ref:
             # Obtener lista de archivos
             file_list = zip_ref.namelist()
             total_files = len(file_list)
-            
+
             print(f"Extrayendo {total_files} archivos...")
-            
+
             for i, file in enumerate(file_list, 1):
                 zip_ref.extract(file, extract_to)
                 if i % 10 == 0 or i == total_files:
                     percent = (i * 100) / total_files
                     print(f'\rProgreso: {percent:.1f}% ({i}/{total_files} archivos)', end='')
-            
+
             print('\n✓ Extracción completada')
             return True
     except Exception as e:
@@ -95,44 +426,61 @@ def extract_zip(zip_path, extract_to='.'):
         return False
 
 
-def download_dataset(dataset_key, keep_zip=False):
+def download_dataset(dataset_key, keep_zip=False, force=False, n_connections=N_CONNECTIONS,
+                     extract=True):
     """
     Descarga y extrae un dataset específico
-    
+
     Args:
         dataset_key: Clave del dataset ('100k' o '32m')
         keep_zip: Si True, conserva el archivo ZIP después de extraer
+        force: Si True, vuelve a descargar aunque el dataset ya exista
+        n_connections: Conexiones simultáneas de la descarga
+        extract: Si False, solo se descarga el ZIP, del que el recomendador
+            lee los ratings directamente
     """
     dataset = DATASETS[dataset_key]
-    
+
     print(f"\n{'='*70}")
     print(f"Dataset: MovieLens {dataset_key.upper()}")
     print(f"Tamaño aproximado: {dataset['size']}")
     print(f"{'='*70}")
-    
+
     zip_file = dataset['zip_file']
     extract_dir = dataset['extract_dir']
-    
+
+    if not extract:
+        if os.path.exists(zip_file) and not force:
+            print(f"\n✓ El archivo {zip_file} ya existe, omitiendo descarga "
+                  f"(usa --force para descargarlo de nuevo)")
+            return True
+        if not download_file(dataset['url'], zip_file, f"MovieLens {dataset_key}",
+                             checksum_url=dataset.get('checksum_url'), n_connections=n_connections):
+            return False
+        print(f"✓ Dataset {dataset_key} listo en {zip_file} (sin extraer)")
+        return True
+
     # Verificar si ya existe el directorio extraído
     if os.path.exists(extract_dir):
-        print(f"\n⚠ El directorio {extract_dir}/ ya existe")
-        response = input("¿Deseas descargarlo de nuevo? (s/N): ").strip().lower()
-        if response not in ['s', 'si', 'sí', 'yes', 'y']:
-            print("✓ Omitiendo descarga")
+        if not force:
+            print(f"\n✓ El directorio {extract_dir}/ ya existe, omitiendo descarga "
+                  f"(usa --force para descargarlo de nuevo)")
             return True
-        else:
-            print(f"Eliminando directorio existente...")
-            import shutil
-            shutil.rmtree(extract_dir)
-    
-    # Descargar el archivo ZIP
-    if not download_file(dataset['url'], zip_file, f"MovieLens {dataset_key}"):
+        print(f"Eliminando directorio existente...")
+        import shutil
+        shutil.rmtree(extract_dir)
+
+    # Descargar el archivo ZIP (si se conservó de una descarga anterior, se reutiliza)
+    if os.path.exists(zip_file) and not force:
+        print(f"✓ Usando el archivo {zip_file} ya descargado")
+    elif not download_file(dataset['url'], zip_file, f"MovieLens {dataset_key}",
+                           checksum_url=dataset.get('checksum_url'), n_connections=n_connections):
         return False
-    
+
     # Extraer el archivo ZIP
     if not extract_zip(zip_file):
         return False
-    
+
     # Eliminar el archivo ZIP después de extraer (si no se desea conservar)
     if not keep_zip:
         try:
@@ -142,7 +490,7 @@ def download_dataset(dataset_key, keep_zip=False):
             print(f"⚠ No se pudo eliminar {zip_file}: {e}")
     else:
         print(f"✓ Archivo {zip_file} conservado")
-    
+
     print(f"✓ Dataset {dataset_key} listo en {extract_dir}/")
     return True
 
@@ -150,13 +498,13 @@ def download_dataset(dataset_key, keep_zip=False):
 def verify_dataset(dataset_key):
     """
     Verifica que el dataset esté correctamente descargado
-    
+
     Args:
         dataset_key: Clave del dataset ('100k' o '32m')
     """
     dataset = DATASETS[dataset_key]
     extract_dir = dataset['extract_dir']
-    
+
     if dataset_key == '100k':
         # Verificar archivos principales de ml-100k
         required_files = [
@@ -170,80 +518,81 @@ def verify_dataset(dataset_key):
             os.path.join(extract_dir, 'ratings.csv'),
             os.path.join(extract_dir, 'movies.csv'),
         ]
-    
-    missing = [f for f in required_files if not os.path.exists(f)]
-    
+
+    if not os.path.exists(extract_dir) and os.path.exists(dataset['zip_file']):
+        # Dataset sin extraer: los ficheros deben estar dentro del ZIP
+        with zipfile.ZipFile(dataset['zip_file']) as zip_ref:
+            members = set(zip_ref.namelist())
+        missing = [f for f in required_files if f.replace(os.sep, '/') not in members]
+    else:
+        missing = [f for f in required_files if not os.path.exists(f)]
+
     if missing:
         print(f"\n⚠ Archivos faltantes en {dataset_key}:")
         for f in missing:
             print(f"  - {f}")
         return False
-    
+
     print(f"✓ Dataset {dataset_key} verificado correctamente")
     return True
 
 
-def main():
+def parse_args(argv=None):
+    """Argumentos de la línea de comandos"""
+    parser = argparse.ArgumentParser(description="Descarga los datasets de MovieLens")
+    parser.add_argument('datasets', nargs='*', metavar='dataset',
+                        help=f"Datasets a descargar: {', '.join(DATASETS)} (por defecto, solo 100k)")
+    parser.add_argument('--keep-zip', action='store_true',
+                        help="Conservar los archivos ZIP después de extraerlos")
+    parser.add_argument('--no-extract', action='store_true',
+                        help="Conservar solo el ZIP sin extraerlo (los ratings se leen del ZIP)")
+    parser.add_argument('--force', action='store_true',
+                        help="Descargar de nuevo aunque el dataset ya exista")
+    parser.add_argument('--connections', type=int, default=N_CONNECTIONS,
+                        help=f"Conexiones simultáneas por descarga (por defecto, {N_CONNECTIONS})")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.datasets if name not in DATASETS]
+    if unknown:
+        parser.error(f"datasets no reconocidos: {', '.join(unknown)} (use {' o '.join(DATASETS)})")
+    args.datasets = args.datasets or ['100k']
+    return args
+
+
+def main(argv=None):
     """
     Función principal
+
+    Returns:
+        int: 0 si todos los datasets quedaron listos, 1 si no
     """
+    args = parse_args(argv)
+    datasets_to_download = list(dict.fromkeys(args.datasets))
+
     print("\n" + "="*70)
     print(" DESCARGADOR DE DATASETS MOVIELENS")
     print(" Sistema de Recomendación de Películas")
     print("="*70)
-    
-    print("\nEste script descargará los datasets de MovieLens necesarios:")
-    print("  1. MovieLens 100k  (~5 MB)")
-    print("  2. MovieLens 32M   (~800 MB)")
-    
-    print("\n⚠ ADVERTENCIA: El dataset 32M es muy grande y puede tardar varios minutos")
-    print("   en descargarse dependiendo de tu conexión a Internet.")
-    
-    print("\n¿Qué datasets deseas descargar?")
-    print("  1. Solo MovieLens 100k (recomendado para empezar)")
-    print("  2. Solo MovieLens 32M")
-    print("  3. Ambos datasets")
-    print("  4. Salir")
-    
-    choice = input("\nSelecciona una opción (1-4): ").strip()
-    
-    datasets_to_download = []
-    
-    if choice == '1':
-        datasets_to_download = ['100k']
-    elif choice == '2':
-        datasets_to_download = ['32m']
-    elif choice == '3':
-        datasets_to_download = ['100k', '32m']
-    elif choice == '4':
-        print("\n✓ Saliendo...")
-        return
-    else:
-        print("\n✗ Opción inválida")
-        return
-    
-    # Preguntar si desea conservar los archivos ZIP
-    print("\n¿Deseas conservar los archivos ZIP después de extraerlos?")
-    keep_response = input("Conservar ZIPs (s/N): ").strip().lower()
-    keep_zip = keep_response in ['s', 'si', 'sí', 'yes', 'y']
-    
-    if keep_zip:
-        print("✓ Los archivos ZIP se conservarán")
-    else:
-        print("✓ Los archivos ZIP se eliminarán después de extraer")
-    
+
+    print(f"\nDatasets: {', '.join(datasets_to_download)} | "
+          f"Conexiones: {args.connections} | "
+          f"ZIPs: {'sin extraer' if args.no_extract else 'se conservan' if args.keep_zip else 'se eliminan después de extraer'}")
+    if '32m' in datasets_to_download:
+        print("\n⚠ ADVERTENCIA: El dataset 32M es muy grande y puede tardar varios minutos")
+        print("   en descargarse dependiendo de tu conexión a Internet.")
+
     # Descargar los datasets seleccionados
     success_count = 0
     for dataset_key in datasets_to_download:
-        if download_dataset(dataset_key, keep_zip):
+        if download_dataset(dataset_key, args.keep_zip, args.force, args.connections,
+                            extract=not args.no_extract):
             if verify_dataset(dataset_key):
                 success_count += 1
-    
+
     # Resumen final
     print("\n" + "="*70)
     print(" RESUMEN")
     print("="*70)
-    
+
     if success_count == len(datasets_to_download):
         print(f"\n✓ ¡Todos los datasets descargados exitosamente! ({success_count}/{len(datasets_to_download)})")
         print("\nAhora puedes ejecutar:")
@@ -252,15 +601,16 @@ def main():
     else:
         print(f"\n⚠ Se descargaron {success_count} de {len(datasets_to_download)} datasets")
         print("  Algunos datasets no se descargaron correctamente")
-    
+
     print("\n" + "="*70 + "\n")
+    return 0 if success_count == len(datasets_to_download) else 1
 
 
 if __name__ == "__main__":
     try:
-        main()
+        sys.exit(main())
     except KeyboardInterrupt:
-        print("\n\n✗ Descarga interrumpida por el usuario")
+        print("\n\n✗ Descarga interrumpida por el usuario (se reanudará en la próxima ejecución)")
         sys.exit(1)
     except Exception as e:
         print(f"\n✗ Error inesperado: {e}")
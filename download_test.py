@@ -0,0 +1,257 @@
+"""
+Prueba local de la descarga reanudable
+Sirve un fichero aleatorio con un servidor HTTP local (http.server) que
+admite peticiones Range y puede cortar conexiones, fallar a partir de un
+byte o no admitir rangos, y comprueba que ResumableDownload de
+download_datasets.py descarga el fichero correcto en cada caso:
+
+- Descarga completa con el MD5 correcto
+- Conexiones cortadas a mitad de pieza (se reanuda desde el último byte)
+- Descarga interrumpida que se reanuda en la siguiente ejecución
+- Fichero remoto que cambia entre ejecuciones (se descarta lo descargado)
+- MD5 incorrecto (se descarta la descarga)
+- Servidor sin peticiones Range (una sola conexión)
+
+No necesita conexión a Internet
+
+Uso:
+    python download_test.py
+"""
+
+import os
+import re
+import sys
+import random
+import socket
+import hashlib
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import download_datasets
+from download_datasets import ResumableDownload, DownloadError
+
+
+# Piezas pequeñas para que el fichero de prueba tenga muchas
+PIECE_SIZE = 256 * 1024
+
+# Tamaño del fichero servido (no múltiplo de PIECE_SIZE)
+FILE_SIZE = 10 * PIECE_SIZE + 12345
+
+
+class FaultyServer(ThreadingHTTPServer):
+    """
+    Servidor HTTP local de un único fichero en memoria con fallos
+    configurables
+
+    Atributos:
+        payload: Contenido del fichero
+        ranges: Si False, ignora las cabeceras Range y responde 200 con todo
+        drop_pieces: Si True, corta la primera respuesta de cada pieza a la mitad
+        fail_from: Byte a partir del cual las peticiones responden 503 (None = nunca)
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        ThreadingHTTPServer.__init__(self, ('127.0.0.1', 0), _Handler)
+        self.ranges = True
+        self.drop_pieces = False
+        self.fail_from = None
+        self.dropped = set()
+        self.lock = threading.Lock()
+        self.set_payload(random.Random(0).randbytes(FILE_SIZE))
+
+    def set_payload(self, payload):
+        """Cambia el fichero servido (y su ETag)"""
+        self.payload = payload
+        self.md5 = hashlib.md5(payload).hexdigest()
+        self.etag = f'"{self.md5[:16]}"'
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/ml-test.zip'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        payload = server.payload
+        match = re.match(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        if not server.ranges or match is None:
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(payload)))
+            self.send_header('ETag', server.etag)
+            self.end_headers()
+            try:
+                self.wfile.write(payload)
+            except ConnectionError:
+                pass  # probe() cierra la conexión tras leer las cabeceras
+            return
+
+        start = int(match.group(1))
+        end = min(int(match.group(2)) if match.group(2) else len(payload) - 1, len(payload) - 1)
+        if server.fail_from is not None and end > start and start >= server.fail_from:
+            self.send_error(503)
+            return
+
+        body = payload[start:end + 1]
+        self.send_response(206)
+        self.send_header('Content-Range', f'bytes {start}-{end}/{len(payload)}')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', server.etag)
+        self.end_headers()
+
+        # Corte a mitad de respuesta, una vez por pieza (los reintentos piden
+        # el rango desde el último byte recibido, que ya no empieza en una pieza)
+        with server.lock:
+            drop = (server.drop_pieces and len(body) > 1 and start % PIECE_SIZE == 0
+                    and start not in server.dropped)
+            if drop:
+                server.dropped.add(start)
+        if drop:
+            self.wfile.write(body[:len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            self.connection.shutdown(socket.SHUT_RDWR)
+            return
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def check_complete(server, directory):
+    """Descarga completa con el MD5 correcto"""
+    destination = os.path.join(directory, 'complete.zip')
+    stats = ResumableDownload(server.url, destination, server.md5, n_connections=4,
+                              piece_size=PIECE_SIZE).run()
+    assert _read(destination) == server.payload, "el fichero descargado no coincide"
+    assert stats['md5'] == server.md5 and stats['resumed'] == 0
+    assert not os.path.exists(destination + '.part.json'), "queda el estado de la descarga"
+
+
+def check_dropped_connections(server, directory):
+    """Conexiones cortadas a mitad de pieza"""
+    destination = os.path.join(directory, 'dropped.zip')
+    server.drop_pieces = True
+    try:
+        ResumableDownload(server.url, destination, server.md5, n_connections=4,
+                          piece_size=PIECE_SIZE).run()
+    finally:
+        server.drop_pieces = False
+    assert len(server.dropped) == (FILE_SIZE + PIECE_SIZE - 1) // PIECE_SIZE, "no se cortaron todas las piezas"
+    assert _read(destination) == server.payload, "el fichero descargado no coincide"
+
+
+def _interrupt(server, destination, n_pieces):
+    """Descarga que falla tras n_pieces piezas, sin reintentos"""
+    retries = download_datasets.RETRIES
+    download_datasets.RETRIES = 0
+    server.fail_from = n_pieces * PIECE_SIZE
+    try:
+        ResumableDownload(server.url, destination, server.md5, n_connections=1,
+                          piece_size=PIECE_SIZE).run()
+    except Exception:
+        pass
+    else:
+        raise AssertionError("la descarga interrumpida no falló")
+    finally:
+        server.fail_from = None
+        download_datasets.RETRIES = retries
+    assert os.path.exists(destination + '.part.json'), "no se guardó el estado de la descarga"
+    assert not os.path.exists(destination)
+
+
+def check_resume(server, directory):
+    """Descarga interrumpida que se reanuda en la siguiente ejecución"""
+    destination = os.path.join(directory, 'resume.zip')
+    _interrupt(server, destination, 3)
+    stats = ResumableDownload(server.url, destination, server.md5, n_connections=4,
+                              piece_size=PIECE_SIZE).run()
+    assert stats['resumed'] == 3 * PIECE_SIZE, f"se reanudaron {stats['resumed']} bytes"
+    assert _read(destination) == server.payload, "el fichero descargado no coincide"
+
+
+def check_remote_change(server, directory):
+    """Fichero remoto que cambia entre ejecuciones"""
+    destination = os.path.join(directory, 'changed.zip')
+    original = server.payload
+    _interrupt(server, destination, 3)
+    server.set_payload(random.Random(1).randbytes(FILE_SIZE))
+    try:
+        stats = ResumableDownload(server.url, destination, server.md5, n_connections=4,
+                                  piece_size=PIECE_SIZE).run()
+        assert stats['resumed'] == 0, "se reutilizaron piezas del fichero anterior"
+        assert _read(destination) == server.payload, "el fichero descargado no coincide"
+    finally:
+        server.set_payload(original)
+
+
+def check_wrong_md5(server, directory):
+    """MD5 incorrecto: la descarga se descarta"""
+    destination = os.path.join(directory, 'wrong_md5.zip')
+    try:
+        ResumableDownload(server.url, destination, '0' * 32, n_connections=4,
+                          piece_size=PIECE_SIZE).run()
+    except DownloadError as e:
+        assert 'MD5 incorrecto' in str(e), f"error inesperado: {e}"
+    else:
+        raise AssertionError("se aceptó un MD5 incorrecto")
+    for path in (destination, destination + '.part', destination + '.part.json'):
+        assert not os.path.exists(path), f"queda {os.path.basename(path)}"
+
+
+def check_without_ranges(server, directory):
+    """Servidor sin peticiones Range"""
+    destination = os.path.join(directory, 'stream.zip')
+    server.ranges = False
+    try:
+        ResumableDownload(server.url, destination, server.md5, n_connections=4,
+                          piece_size=PIECE_SIZE).run()
+    finally:
+        server.ranges = True
+    assert _read(destination) == server.payload, "el fichero descargado no coincide"
+
+
+CHECKS = [check_complete, check_dropped_connections, check_resume, check_remote_change,
+          check_wrong_md5, check_without_ranges]
+
+
+def main():
+    print("\n" + "="*60)
+    print(" PRUEBA DE LA DESCARGA REANUDABLE")
+    print(f" Servidor local | {FILE_SIZE / 1024 ** 2:.1f} MB | piezas de {PIECE_SIZE // 1024} KB")
+    print("="*60)
+
+    server = FaultyServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    failures = 0
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for check in CHECKS:
+                try:
+                    check(server, directory)
+                    print(f"✓ {check.__doc__}")
+                except Exception as e:
+                    failures += 1
+                    print(f"✗ {check.__doc__}: {type(e).__name__}: {e}")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    if failures:
+        print(f"\n✗ {failures} de {len(CHECKS)} comprobaciones fallaron")
+        return 1
+    print(f"\n✓ Las {len(CHECKS)} comprobaciones pasaron")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+Parada temprana con validación
+Los algoritmos que se entrenan época a época (los que tienen fit_epochs:
+ALS, ParallelSGD, SVD, NMF, BaselineOnly y SVDpp de factorization.py)
+pueden reservar una parte del trainset de cada fold para validación: tras
+cada época se mide el RMSE de validación y el entrenamiento se detiene
+cuando lleva `patience` épocas sin mejorar. El modelo se queda con los
+parámetros de la mejor época (entrenados sin los ratings de validación) o,
+con refit, se reentrena con todo el trainset durante ese número de épocas
+"""
+
+import time
+import numpy as np
+from surprise import Trainset
+from id_mapping import group_ratings
+from scoring import BatchScorer, trainset_csr
+
+
+def supports_early_stopping(algo):
+    """Indica si un algoritmo se puede entrenar época a época"""
+    return hasattr(algo, 'fit_epochs')
+
+
+def holdout(trainset, fraction, seed=None):
+    """
+    Separa al azar una fracción de los ratings de un trainset para validación
+
+    Cada usuario y cada película conservan al menos un rating (el primero
+    en el orden del trainset). El trainset reducido mantiene los ids
+    internos y su traducción, así que el testset del fold se puntúa igual
+
+    Args:
+        trainset: Trainset del fold
+        fraction: Fracción de los ratings reservada para validación
+        seed: Semilla de la selección
+
+    Returns:
+        tuple: (trainset reducido, usuarios, ítems y ratings de validación)
+    """
+    indptr, items, ratings = trainset_csr(trainset)
+    counts = np.diff(indptr)
+    users = np.repeat(np.arange(trainset.n_users), counts)
+    items = items.astype(np.int64)
+    ratings = ratings.astype(np.float64)
+
+    candidates = np.ones(len(ratings), dtype=bool)
+    candidates[indptr[:-1][counts > 0]] = False
+    candidates[np.unique(items, return_index=True)[1]] = False
+    candidates = np.flatnonzero(candidates)
+    n_validation = min(int(round(len(ratings) * fraction)), len(candidates))
+    validation = np.random.RandomState(seed).choice(candidates, n_validation, replace=False)
+
+    keep = np.ones(len(ratings), dtype=bool)
+    keep[validation] = False
+    reduced = Trainset(
+        group_ratings(users[keep], items[keep], ratings[keep], trainset.n_users),
+        group_ratings(items[keep], users[keep], ratings[keep], trainset.n_items),
+        trainset.n_users,
+        trainset.n_items,
+        int(keep.sum()),
+        trainset.rating_scale,
+        trainset._raw2inner_id_users,
+        trainset._raw2inner_id_items,
+    )
+    for name in ('user_inner_of_code', 'item_inner_of_code'):
+        if hasattr(trainset, name):
+            setattr(reduced, name, getattr(trainset, name))
+
+    validation = np.sort(validation)
+    return reduced, users[validation], items[validation], ratings[validation]
+
+
+def _parameters(algo):
+    """Copia de los arrays del modelo (factores, sesgos...)"""
+    return {name: value.copy() for name, value in vars(algo).items() if isinstance(value, np.ndarray)}
+
+
+def fit_with_early_stopping(algo, trainset, fraction=0.1, patience=2, min_delta=0.0, seed=None,
+                            refit=False, verbose=False):
+    """
+    Entrena un algoritmo con fit_epochs hasta que el RMSE de validación deja
+    de mejorar (en más de min_delta) durante patience épocas seguidas, o
+    hasta agotar sus n_epochs
+
+    El modelo se entrena con el trainset reducido (ver holdout) y termina
+    con los parámetros de la mejor época, sin usar los ratings de
+    validación. Con refit, se vuelve a entrenar con el trainset completo del
+    fold durante best_epoch épocas
+
+    Args:
+        algo: Algoritmo sin entrenar (con fit_epochs)
+        trainset: Trainset del fold
+        fraction: Fracción de los ratings reservada para validación
+        patience: Épocas sin mejora antes de detenerse
+        min_delta: Mejora mínima del RMSE para considerarla
+        seed: Semilla de la selección de validación
+        refit: Si True, reentrena con todo el trainset durante best_epoch épocas
+        verbose: Si True, muestra el RMSE de validación de cada época
+
+    Returns:
+        dict: epochs_used (épocas entrenadas), best_epoch (épocas del modelo
+        final), val_rmse (su RMSE de validación), epoch_time (tiempo medio de
+        entrenamiento por época, sin contar la validación) y fixed_time
+        (tiempo estimado de entrenar las n_epochs con el trainset completo,
+        extrapolado de los tiempos medidos por época)
+    """
+    reduced, users, items, ratings = holdout(trainset, fraction, seed)
+
+    best_rmse, best_epoch, best_parameters = np.inf, 0, None
+    epochs_used, epoch_times = 0, []
+    scorer = None
+    epochs = algo.fit_epochs(reduced)
+    start_time = time.time()
+    for epoch in epochs:
+        # La primera época incluye la preparación del entrenamiento
+        epoch_times.append(time.time() - start_time)
+        epochs_used = epoch + 1
+
+        # El scorer (con la CSR del trainset) se construye una sola vez
+        if scorer is None:
+            scorer = BatchScorer(algo)
+        else:
+            scorer.refresh(algo)
+        estimates = scorer.predict_pairs(users, items)
+        rmse = float(np.sqrt(np.mean((estimates - ratings) ** 2)))
+        if verbose:
+            print(f"  Época {epochs_used}: RMSE de validación {rmse:.4f}")
+
+        if rmse < best_rmse - min_delta:
+            best_rmse, best_epoch, best_parameters = rmse, epochs_used, _parameters(algo)
+        elif epochs_used - best_epoch >= patience:
+            epochs.close()
+            break
+        start_time = time.time()
+
+    if refit and best_epoch > 0:
+        epochs = algo.fit_epochs(trainset)
+        for epoch in epochs:
+            if epoch + 1 >= best_epoch:
+                epochs.close()
+                break
+    elif best_parameters is not None:
+        for name, value in best_parameters.items():
+            setattr(algo, name, value)
+
+    epoch_times = epoch_times or [0.0]
+    epoch_time = float(np.mean(epoch_times[1:])) if len(epoch_times) > 1 else epoch_times[0]
+    scale = trainset.n_ratings / max(reduced.n_ratings, 1)
+    return {
+        'epochs_used': epochs_used,
+        'best_epoch': best_epoch,
+        'val_rmse': best_rmse,
+        'epoch_time': epoch_time,
+        'fixed_time': (epoch_times[0] + epoch_time * (algo.n_epochs - 1)) * scale,
+    }
@@ -0,0 +1,676 @@
+"""
+Motor de factorización de matrices
+Alternativas a SVD de Surprise (mismo modelo: mu + bu + bi + pu · qi) que no
+recorren los ratings de uno en uno:
+
+- ALS: mínimos cuadrados alternos. Cada época resuelve a la vez, por bloques
+  de filas de las matrices CSR y CSC de ratings, los sistemas regularizados de
+  todos los usuarios y después los de todas las películas
+- ParallelSGD: SGD por minilotes en varios hilos que actualizan los mismos
+  arrays de parámetros sin bloqueos (estilo Hogwild)
+
+Incluye también versiones época a época de SVD, NMF, BaselineOnly y SVDpp
+con los parámetros y atributos de las de Surprise, que admiten parada
+temprana (ver early_stopping.py)
+
+Los bloques y los minilotes se reparten entre config.FACTORIZATION_N_THREADS
+hilos. Solo ganan algo los pasos en los que NumPy libera el GIL (productos
+de matrices y resoluciones de ALS); el indexado y las sumas por grupos de
+ParallelSGD lo mantienen, así que sus hilos se turnan. Con ParallelSGD el
+resultado depende además del número de hilos (cada uno recorre su parte de
+los ratings)
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from scipy import sparse
+from surprise import AlgoBase, PredictionImpossible
+from surprise.utils import get_rng
+import config
+import resources
+from scoring import trainset_csr
+
+
+# Valores float32 (filas x columnas) de las matrices de un bloque de ALS
+MAX_BLOCK_CELLS = 4_000_000
+
+
+def _aggregator(ids):
+    """
+    Matriz dispersa (ids distintos x posiciones) que suma las filas de un
+    minilote por id, y los ids distintos a los que corresponde cada suma
+    """
+    rows, inverse = np.unique(ids, return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(ids), dtype=np.float32), (inverse, np.arange(len(ids)))),
+        shape=(len(rows), len(ids))
+    )
+    return matrix, rows
+
+
+def _user_steps(indptr, items, ratings, batch_size):
+    """
+    Minilotes del SGD por pasos: en el paso t, cada usuario con más de t
+    ratings procesa su t-ésimo rating (en el orden de trainset.ur), por
+    minilotes de batch_size usuarios distintos. Los usuarios se ordenan por
+    número de ratings (de más a menos), así que los que siguen activos en el
+    paso t son siempre los n_active[t] primeros
+
+    Returns:
+        tuple: (minilotes de cada paso, como listas de tuplas (usuarios,
+        ítems, ratings, agregador por ítem, ítems distintos), orden de los
+        usuarios y n_active)
+    """
+    counts = np.diff(indptr)
+    order = np.argsort(-counts, kind='stable')
+    n_active = len(counts) - np.cumsum(np.bincount(counts))
+    steps = []
+    for t in range(len(n_active) - 1):
+        active = order[:n_active[t]]
+        batches = []
+        for start in range(0, len(active), batch_size):
+            u = active[start:start + batch_size]
+            positions = indptr[u] + t
+            batches.append((u, items[positions], ratings[positions]) + _aggregator(items[positions]))
+        steps.append(batches)
+    return steps, order, n_active
+
+
+def _n_threads(n_threads):
+    """Hilos de entrenamiento: n_threads o, si es None, config.FACTORIZATION_N_THREADS"""
+    return resources.threads_per_job(n_threads if n_threads is not None else config.FACTORIZATION_N_THREADS)
+
+
+class MatrixFactorization(AlgoBase):
+    """
+    Base de ALS, ParallelSGD, SVD y NMF: fit() consume fit_epochs y la
+    predicción usa los atributos pu, qi, bu y bi de SVD, de modo que
+    scoring, serving y model_store los tratan igual que a SVD. ALS y
+    ParallelSGD inicializan los factores como SVD de Surprise
+    """
+
+    def __init__(self, n_factors=100, n_epochs=20, biased=True, init_mean=0, init_std_dev=0.1,
+                 n_threads=None, random_state=None, verbose=False):
+        AlgoBase.__init__(self)
+        self.n_factors = n_factors
+        self.n_epochs = n_epochs
+        self.biased = biased
+        self.init_mean = init_mean
+        self.init_std_dev = init_std_dev
+        self.n_threads = n_threads
+        self.random_state = random_state
+        self.verbose = verbose
+
+    def fit(self, trainset):
+        for _ in self.fit_epochs(trainset):
+            pass
+        return self
+
+    def fit_epochs(self, trainset):
+        """
+        Entrena época a época: el generador devuelve el número de época (desde
+        0) al terminar cada una, con el modelo listo para predecir. Si se deja
+        de consumir, el entrenamiento termina ahí (ver early_stopping.py)
+        """
+        AlgoBase.fit(self, trainset)
+
+        indptr, items, ratings = trainset_csr(trainset)
+        users = np.repeat(np.arange(trainset.n_users, dtype=np.int32), np.diff(indptr))
+
+        rng = get_rng(self.random_state)
+        shape = (self.n_factors,)
+        self.pu = rng.normal(self.init_mean, self.init_std_dev, (trainset.n_users,) + shape).astype(np.float32)
+        self.qi = rng.normal(self.init_mean, self.init_std_dev, (trainset.n_items,) + shape).astype(np.float32)
+        self.bu = np.zeros(trainset.n_users, dtype=np.float32)
+        self.bi = np.zeros(trainset.n_items, dtype=np.float32)
+
+        n_threads = _n_threads(self.n_threads)
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            yield from self._train(users, items, ratings, rng, executor, n_threads)
+
+    def _train(self, users, items, ratings, rng, executor, n_threads):
+        """
+        Ajusta pu, qi, bu y bi a los ratings (arrays alineados de ids
+        internos). Es un generador que devuelve el número de cada época terminada
+        """
+        raise NotImplementedError
+
+    def estimate(self, u, i):
+        known_user = self.trainset.knows_user(u)
+        known_item = self.trainset.knows_item(i)
+
+        if self.biased:
+            est = self.trainset.global_mean
+            if known_user:
+                est += self.bu[u]
+            if known_item:
+                est += self.bi[i]
+            if known_user and known_item:
+                est += np.dot(self.qi[i], self.pu[u])
+        elif known_user and known_item:
+            est = np.dot(self.qi[i], self.pu[u])
+        else:
+            raise PredictionImpossible('User and item are unknown.')
+        return float(est)
+
+
+class ALS(MatrixFactorization):
+    """
+    Factorización por mínimos cuadrados alternos con regularización
+    proporcional al número de ratings de cada fila (ALS-WR)
+
+    Con biased=True el sesgo se resuelve junto a los factores, como una
+    columna más de valor 1 en la matriz fija
+    """
+
+    def __init__(self, n_factors=50, n_epochs=10, biased=True, reg=0.15, init_mean=0, init_std_dev=0.1,
+                 n_threads=None, random_state=None, verbose=False):
+        MatrixFactorization.__init__(self, n_factors, n_epochs, biased, init_mean, init_std_dev,
+                                     n_threads, random_state, verbose)
+        self.reg = reg
+
+    def _train(self, users, items, ratings, rng, executor, n_threads):
+        mu = np.float32(self.trainset.global_mean if self.biased else 0.0)
+        user_csr = self._csr(users, items, ratings, self.trainset.n_users)
+        item_csr = self._csr(items, users, ratings, self.trainset.n_items)
+
+        for current_epoch in range(self.n_epochs):
+            if self.verbose:
+                print(f"Processing epoch {current_epoch}")
+            self.pu, self.bu = self._solve(user_csr, self.qi, self.bi, mu, executor)
+            self.qi, self.bi = self._solve(item_csr, self.pu, self.bu, mu, executor)
+            yield current_epoch
+
+    @staticmethod
+    def _csr(rows, cols, values, n_rows):
+        """Arrays CSR (punteros, columnas, valores) de unos ratings"""
+        order = np.argsort(rows, kind='stable')
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=n_rows))])
+        return indptr, cols[order], values[order]
+
+    def _solve(self, csr, fixed_factors, fixed_bias, mu, executor):
+        """
+        Factores (y sesgos) de todas las filas de una matriz CSR con los de
+        las columnas fijos: para cada fila, (XᵀX + reg·n·I) w = Xᵀ(r - mu - b)
+
+        Las filas se ordenan por número de ratings y se agrupan en bloques de
+        longitud parecida, que se rellenan hasta la fila más larga y se
+        resuelven con una sola llamada a np.linalg.solve
+
+        Returns:
+            tuple: (factores, sesgos) de las filas
+        """
+        indptr, cols, values = csr
+        if self.biased:
+            fixed = np.hstack([fixed_factors, np.ones((len(fixed_factors), 1), dtype=np.float32)])
+            targets = values - mu - fixed_bias[cols]
+        else:
+            fixed = fixed_factors
+            targets = values
+        dim = fixed.shape[1]
+        counts = np.diff(indptr)
+        n_rows = len(counts)
+
+        order = np.argsort(-counts, kind='stable')
+        blocks = []
+        start = 0
+        while start < n_rows:
+            longest = max(int(counts[order[start]]), 1)
+            size = max(1, MAX_BLOCK_CELLS // (dim * max(longest, dim)))
+            blocks.append(order[start:start + size])
+            start += size
+
+        solution = np.zeros((n_rows, dim), dtype=np.float32)
+        identity = np.eye(dim, dtype=np.float32)
+
+        def solve_block(rows):
+            lengths = counts[rows]
+            width = int(lengths.max())
+            mask = np.arange(width) < lengths[:, None]
+            positions = np.where(mask, indptr[rows][:, None] + np.arange(width), 0)
+            x = fixed[cols[positions]] * mask[:, :, None]
+            y = np.where(mask, targets[positions], 0)
+            xt = x.transpose(0, 2, 1)
+            a = np.matmul(xt, x) + (self.reg * np.maximum(lengths, 1))[:, None, None] * identity
+            b = np.matmul(xt, y[:, :, None])
+            solution[rows] = np.linalg.solve(a, b)[:, :, 0]
+
+        list(executor.map(solve_block, blocks))
+
+        if self.biased:
+            return np.ascontiguousarray(solution[:, :-1]), np.ascontiguousarray(solution[:, -1])
+        return solution, np.zeros(n_rows, dtype=np.float32)
+
+
+class ParallelSGD(MatrixFactorization):
+    """
+    SGD de SVD por minilotes repartido entre varios hilos (Hogwild): cada
+    hilo recorre una parte de los ratings barajados y actualiza los arrays
+    compartidos sin bloqueos. Los ratings de un minilote se procesan a la vez
+    con los parámetros del inicio del minilote
+    """
+
+    def __init__(self, n_factors=100, n_epochs=20, biased=True, init_mean=0, init_std_dev=0.1,
+                 lr_all=0.005, reg_all=0.02, batch_size=4096, n_threads=None, random_state=None,
+                 verbose=False):
+        MatrixFactorization.__init__(self, n_factors, n_epochs, biased, init_mean, init_std_dev,
+                                     n_threads, random_state, verbose)
+        self.lr_all = lr_all
+        self.reg_all = reg_all
+        self.batch_size = batch_size
+
+    def _train(self, users, items, ratings, rng, executor, n_threads):
+        for current_epoch in range(self.n_epochs):
+            if self.verbose:
+                print(f"Processing epoch {current_epoch}")
+            shards = np.array_split(rng.permutation(len(ratings)), n_threads)
+            list(executor.map(lambda shard: self._sgd(users, items, ratings, shard), shards))
+            yield current_epoch
+
+    def _sgd(self, users, items, ratings, order):
+        """Minilotes de SGD sobre las posiciones order de los ratings"""
+        mu = np.float32(self.trainset.global_mean)
+        lr, reg = np.float32(self.lr_all), np.float32(self.reg_all)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            u, i, r = users[batch], items[batch], ratings[batch]
+            pu, qi = self.pu[u], self.qi[i]
+
+            est = np.einsum('ij,ij->i', pu, qi)
+            if self.biased:
+                bu, bi = self.bu[u], self.bi[i]
+                est += mu + bu + bi
+            err = r - est
+
+            # Suma de las actualizaciones de cada usuario y película del minilote
+            # (con productos dispersos, más rápidos que np.add.at por filas)
+            by_user, rows_u = _aggregator(u)
+            by_item, rows_i = _aggregator(i)
+            if self.biased:
+                self.bu[rows_u] += by_user @ (lr * (err - reg * bu))
+                self.bi[rows_i] += by_item @ (lr * (err - reg * bi))
+            self.pu[rows_u] += by_user @ (lr * (err[:, None] * qi - reg * pu))
+            self.qi[rows_i] += by_item @ (lr * (err[:, None] * pu - reg * qi))
+
+
+class SVD(MatrixFactorization):
+    """
+    SVD con los mismos parámetros, atributos (pu, qi, bu, bi) y
+    actualizaciones que SVD de Surprise, entrenado época a época para que
+    admita parada temprana (ver early_stopping.py)
+
+    Los ratings se recorren por pasos y minilotes de usuarios como en SVDpp:
+    en el paso t cada usuario procesa su t-ésimo rating. Los usuarios de un
+    minilote son distintos; las actualizaciones de una misma película dentro
+    del minilote se suman, así que los resultados coinciden con los de
+    Surprise salvo por el orden de las actualizaciones
+    """
+
+    def __init__(self, n_factors=100, n_epochs=20, biased=True, init_mean=0, init_std_dev=0.1,
+                 lr_all=0.005, reg_all=0.02, lr_bu=None, lr_bi=None, lr_pu=None, lr_qi=None,
+                 reg_bu=None, reg_bi=None, reg_pu=None, reg_qi=None, random_state=None,
+                 verbose=False, batch_size=4096):
+        MatrixFactorization.__init__(self, n_factors, n_epochs, biased, init_mean, init_std_dev,
+                                     None, random_state, verbose)
+        self.lr_bu = lr_bu if lr_bu is not None else lr_all
+        self.lr_bi = lr_bi if lr_bi is not None else lr_all
+        self.lr_pu = lr_pu if lr_pu is not None else lr_all
+        self.lr_qi = lr_qi if lr_qi is not None else lr_all
+        self.reg_bu = reg_bu if reg_bu is not None else reg_all
+        self.reg_bi = reg_bi if reg_bi is not None else reg_all
+        self.reg_pu = reg_pu if reg_pu is not None else reg_all
+        self.reg_qi = reg_qi if reg_qi is not None else reg_all
+        self.batch_size = batch_size
+
+    def fit_epochs(self, trainset):
+        """Entrena época a época, como MatrixFactorization.fit_epochs"""
+        AlgoBase.fit(self, trainset)
+
+        indptr, items, ratings = trainset_csr(trainset)
+        steps = _user_steps(indptr, items, ratings.astype(np.float64), self.batch_size)[0]
+
+        rng = get_rng(self.random_state)
+        self.bu = np.zeros(trainset.n_users)
+        self.bi = np.zeros(trainset.n_items)
+        self.pu = rng.normal(self.init_mean, self.init_std_dev, (trainset.n_users, self.n_factors))
+        self.qi = rng.normal(self.init_mean, self.init_std_dev, (trainset.n_items, self.n_factors))
+
+        for current_epoch in range(self.n_epochs):
+            if self.verbose:
+                print(f"Processing epoch {current_epoch}")
+            self._epoch(steps)
+            yield current_epoch
+
+    def _epoch(self, steps):
+        """Una época de SGD sobre todos los ratings, por pasos y minilotes de usuarios"""
+        mu = self.trainset.global_mean if self.biased else 0.0
+        for batches in steps:
+            for u, i, r, by_item, rows_i in batches:
+                pu, qi = self.pu[u], self.qi[i]
+                est = np.einsum('ij,ij->i', qi, pu)
+                if self.biased:
+                    bu, bi = self.bu[u], self.bi[i]
+                    est += mu + bu + bi
+                err = r - est
+
+                if self.biased:
+                    self.bu[u] += self.lr_bu * (err - self.reg_bu * bu)
+                    self.bi[rows_i] += by_item @ (self.lr_bi * (err - self.reg_bi * bi))
+                self.pu[u] += self.lr_pu * (err[:, None] * qi - self.reg_pu * pu)
+                self.qi[rows_i] += by_item @ (self.lr_qi * (err[:, None] * pu - self.reg_qi * qi))
+
+
+class NMF(MatrixFactorization):
+    """
+    NMF con los mismos parámetros, atributos (pu, qi, bu, bi) y
+    actualizaciones multiplicativas que NMF de Surprise, entrenado época a
+    época para que admita parada temprana
+
+    Cada época calcula la estimación de todos los ratings con los factores
+    del inicio de la época y los acumuladores de Surprise (Σ r·q_i, Σ est·q_i
+    por usuario y Σ r·p_u, Σ est·p_u por película) con productos de matrices
+    dispersas. Sin sesgos (biased=False, el valor por defecto) el resultado
+    es el de Surprise; con sesgos, estos se ajustan por SGD por pasos y
+    minilotes de usuarios, como en SVD
+    """
+
+    def __init__(self, n_factors=15, n_epochs=50, biased=False, reg_pu=0.06, reg_qi=0.06, reg_bu=0.02,
+                 reg_bi=0.02, lr_bu=0.005, lr_bi=0.005, init_low=0, init_high=1, random_state=None,
+                 verbose=False, batch_size=4096):
+        AlgoBase.__init__(self)
+        self.n_factors = n_factors
+        self.n_epochs = n_epochs
+        self.biased = biased
+        self.reg_pu = reg_pu
+        self.reg_qi = reg_qi
+        self.reg_bu = reg_bu
+        self.reg_bi = reg_bi
+        self.lr_bu = lr_bu
+        self.lr_bi = lr_bi
+        self.init_low = init_low
+        self.init_high = init_high
+        self.random_state = random_state
+        self.verbose = verbose
+        self.batch_size = batch_size
+
+    def fit_epochs(self, trainset):
+        """Entrena época a época, como MatrixFactorization.fit_epochs"""
+        if self.init_low < 0:
+            raise ValueError('init_low should be greater than zero')
+        AlgoBase.fit(self, trainset)
+
+        indptr, items, ratings = trainset_csr(trainset)
+        ratings = ratings.astype(np.float64)
+        shape = (trainset.n_users, trainset.n_items)
+        users = np.repeat(np.arange(trainset.n_users), np.diff(indptr))
+        rated = sparse.csr_matrix((ratings, items, indptr), shape=shape)
+        rated_t = rated.T.tocsr()
+        user_counts = np.diff(indptr)
+        item_counts = np.bincount(items, minlength=trainset.n_items)
+        steps = _user_steps(indptr, items, ratings, self.batch_size)[0] if self.biased else None
+
+        rng = get_rng(self.random_state)
+        self.pu = rng.uniform(self.init_low, self.init_high, (trainset.n_users, self.n_factors))
+        self.qi = rng.uniform(self.init_low, self.init_high, (trainset.n_items, self.n_factors))
+        self.bu = np.zeros(trainset.n_users)
+        self.bi = np.zeros(trainset.n_items)
+
+        for current_epoch in range(self.n_epochs):
+            if self.verbose:
+                print(f"Processing epoch {current_epoch}")
+            estimated = sparse.csr_matrix((self._estimates(steps, users, items, indptr), items, indptr),
+                                          shape=shape)
+            user_num, user_denom = rated @ self.qi, estimated @ self.qi
+            item_num, item_denom = rated_t @ self.pu, estimated.T @ self.pu
+            self.pu = self._multiplicative(self.pu, user_num, user_denom, user_counts, self.reg_pu)
+            self.qi = self._multiplicative(self.qi, item_num, item_denom, item_counts, self.reg_qi)
+            yield current_epoch
+
+    def _estimates(self, steps, users, items, indptr):
+        """
+        Estimación de cada rating (en el orden de trainset_csr) con los
+        factores del inicio de la época. Con biased, los sesgos se ajustan
+        por SGD a la vez que se calculan las estimaciones, como en Surprise
+        """
+        est = np.empty(len(items))
+        chunk = max(1, MAX_BLOCK_CELLS // self.n_factors)
+        for start in range(0, len(items), chunk):
+            block = slice(start, start + chunk)
+            est[block] = np.einsum('ij,ij->i', self.qi[items[block]], self.pu[users[block]])
+        if not self.biased:
+            return est
+
+        mu = self.trainset.global_mean
+        for t, batches in enumerate(steps):
+            for u, i, r, by_item, rows_i in batches:
+                positions = indptr[u] + t
+                bu, bi = self.bu[u], self.bi[i]
+                est[positions] += mu + bu + bi
+                err = r - est[positions]
+                self.bu[u] += self.lr_bu * (err - self.reg_bu * bu)
+                self.bi[rows_i] += by_item @ (self.lr_bi * (err - self.reg_bi * bi))
+        return est
+
+    @staticmethod
+    def _multiplicative(factors, num, denom, counts, reg):
+        """f ← f · num / (denom + n·reg·f) en las posiciones con f ≠ 0, que son las que actualiza Surprise"""
+        denom = denom + counts[:, None] * reg * factors
+        ratio = np.divide(num, denom, out=np.ones_like(factors), where=factors != 0)
+        return factors * ratio
+
+
+class BaselineOnly(AlgoBase):
+    """
+    BaselineOnly con los mismos parámetros (bsl_options), atributos (bu, bi)
+    y predicciones que el de Surprise, entrenado época a época para que
+    admita parada temprana:
+
+    - 'als': cada época calcula con sumas por grupos los sesgos de todas las
+      películas y después los de todos los usuarios (mismo resultado que
+      Surprise)
+    - 'sgd': SGD por pasos y minilotes de usuarios, como SVD
+    """
+
+    def __init__(self, bsl_options={}, verbose=True, batch_size=4096):
+        AlgoBase.__init__(self, bsl_options=bsl_options)
+        self.verbose = verbose
+        self.batch_size = batch_size
+
+    @property
+    def n_epochs(self):
+        """Épocas de entrenamiento de bsl_options (por defecto, las de Surprise)"""
+        return self.bsl_options.get('n_epochs', 10 if self.bsl_options.get('method', 'als') == 'als' else 20)
+
+    def fit(self, trainset):
+        for _ in self.fit_epochs(trainset):
+            pass
+        return self
+
+    def fit_epochs(self, trainset):
+        """Entrena época a época, como MatrixFactorization.fit_epochs"""
+        AlgoBase.fit(self, trainset)
+        method = self.bsl_options.get('method', 'als')
+        if method not in ('als', 'sgd'):
+            raise ValueError('Invalid method ' + method + ' for estimating baselines.')
+        if self.verbose:
+            print('Estimating biases using', method + '...')
+
+        indptr, items, ratings = trainset_csr(trainset)
+        ratings = ratings.astype(np.float64)
+        mu = trainset.global_mean
+        self.bu = np.zeros(trainset.n_users)
+        self.bi = np.zeros(trainset.n_items)
+
+        if method == 'als':
+            reg_u = self.bsl_options.get('reg_u', 15)
+            reg_i = self.bsl_options.get('reg_i', 10)
+            users = np.repeat(np.arange(trainset.n_users), np.diff(indptr))
+            user_counts = np.diff(indptr)
+            item_counts = np.bincount(items, minlength=trainset.n_items)
+            for current_epoch in range(self.n_epochs):
+                self.bi = np.bincount(items, weights=ratings - mu - self.bu[users],
+                                      minlength=trainset.n_items) / (reg_i + item_counts)
+                self.bu = np.bincount(users, weights=ratings - mu - self.bi[items],
+                                      minlength=trainset.n_users) / (reg_u + user_counts)
+                yield current_epoch
+            return
+
+        reg = self.bsl_options.get('reg', 0.02)
+        lr = self.bsl_options.get('learning_rate', 0.005)
+        steps = _user_steps(indptr, items, ratings, self.batch_size)[0]
+        for current_epoch in range(self.n_epochs):
+            for batches in steps:
+                for u, i, r, by_item, rows_i in batches:
+                    bu, bi = self.bu[u], self.bi[i]
+                    err = r - (mu + bu + bi)
+                    self.bu[u] += lr * (err - reg * bu)
+                    self.bi[rows_i] += by_item @ (lr * (err - reg * bi))
+            yield current_epoch
+
+    def estimate(self, u, i):
+        est = self.trainset.global_mean
+        if self.trainset.knows_user(u):
+            est += self.bu[u]
+        if self.trainset.knows_item(i):
+            est += self.bi[i]
+        return est
+
+
+class SVDpp(AlgoBase):
+    """
+    SVD++ con los mismos parámetros, atributos (pu, qi, yj, bu, bi) y
+    predicciones que SVDpp de Surprise, sin su coste cuadrático por usuario
+
+    Surprise recalcula en cada rating la suma de los y_j de los |N(u)| ítems
+    del usuario y actualiza todos esos y_j: O(Σ|N(u)|² · k) por época. Aquí:
+
+    - La retroalimentación implícita de cada usuario (Σ y_j / √|N(u)|) se
+      calcula al empezar la época y se actualiza en O(k) tras cada rating,
+      porque todos los y_j del usuario reciben la misma actualización
+    - Esa actualización es afín e igual para todos los y_j del usuario
+      (y_j ← a·y_j + c), así que se acumula en (a, c) y se aplica una sola
+      vez, cuando el usuario termina sus ratings
+    - Los ratings se recorren agrupados por usuario y en paralelo entre
+      usuarios: en el paso t cada usuario procesa su t-ésimo rating, por
+      minilotes de batch_size usuarios
+
+    Los usuarios de un mismo paso no ven las actualizaciones de y_j de los
+    demás hasta que terminan, por lo que los resultados coinciden con los de
+    Surprise salvo por el orden de las actualizaciones
+    """
+
+    def __init__(self, n_factors=20, n_epochs=20, init_mean=0, init_std_dev=0.1, lr_all=0.007,
+                 reg_all=0.02, lr_bu=None, lr_bi=None, lr_pu=None, lr_qi=None, lr_yj=None,
+                 reg_bu=None, reg_bi=None, reg_pu=None, reg_qi=None, reg_yj=None,
+                 random_state=None, verbose=False, cache_ratings=False, batch_size=4096):
+        AlgoBase.__init__(self)
+        self.n_factors = n_factors
+        self.n_epochs = n_epochs
+        self.init_mean = init_mean
+        self.init_std_dev = init_std_dev
+        self.lr_bu = lr_bu if lr_bu is not None else lr_all
+        self.lr_bi = lr_bi if lr_bi is not None else lr_all
+        self.lr_pu = lr_pu if lr_pu is not None else lr_all
+        self.lr_qi = lr_qi if lr_qi is not None else lr_all
+        self.lr_yj = lr_yj if lr_yj is not None else lr_all
+        self.reg_bu = reg_bu if reg_bu is not None else reg_all
+        self.reg_bi = reg_bi if reg_bi is not None else reg_all
+        self.reg_pu = reg_pu if reg_pu is not None else reg_all
+        self.reg_qi = reg_qi if reg_qi is not None else reg_all
+        self.reg_yj = reg_yj if reg_yj is not None else reg_all
+        self.random_state = random_state
+        self.verbose = verbose
+        self.batch_size = batch_size
+
+    def fit(self, trainset):
+        for _ in self.fit_epochs(trainset):
+            pass
+        return self
+
+    def fit_epochs(self, trainset):
+        """Entrena época a época, como MatrixFactorization.fit_epochs"""
+        AlgoBase.fit(self, trainset)
+
+        # Ratings agrupados por usuario, en el orden de trainset.ur
+        indptr, items, ratings = trainset_csr(trainset)
+        ratings = ratings.astype(np.float64)
+        counts = np.diff(indptr)
+        sqrt_counts = np.sqrt(counts)
+
+        rng = get_rng(self.random_state)
+        shape = (self.n_factors,)
+        self.bu = np.zeros(trainset.n_users)
+        self.bi = np.zeros(trainset.n_items)
+        self.pu = rng.normal(self.init_mean, self.init_std_dev, (trainset.n_users,) + shape)
+        self.qi = rng.normal(self.init_mean, self.init_std_dev, (trainset.n_items,) + shape)
+        self.yj = rng.normal(self.init_mean, self.init_std_dev, (trainset.n_items,) + shape)
+
+        # Los minilotes de cada paso son los mismos en todas las épocas
+        steps, order, n_active = _user_steps(indptr, items, ratings, self.batch_size)
+        steps = [(batches, self._finished_plan(order[n_active[t + 1]:n_active[t]], t + 1, indptr, items))
+                 for t, batches in enumerate(steps)]
+
+        for current_epoch in range(self.n_epochs):
+            if self.verbose:
+                print(f"Processing epoch {current_epoch}")
+            self._epoch(steps, indptr, items, sqrt_counts)
+            yield current_epoch
+
+    @staticmethod
+    def _finished_plan(users, n_ratings, indptr, items):
+        """Usuarios que terminan sus n_ratings ratings en un paso, con sus ítems agrupados"""
+        if not len(users):
+            return None
+        positions = (indptr[users][:, None] + np.arange(n_ratings)).ravel()
+        return (np.repeat(users, n_ratings),) + _aggregator(items[positions])
+
+    def _epoch(self, steps, indptr, items, sqrt_counts):
+        """Una época de SGD sobre todos los ratings, por pasos y minilotes de usuarios"""
+        mu = self.trainset.global_mean
+        yj_decay = 1 - self.lr_yj * self.reg_yj
+
+        implicit = np.add.reduceat(self.yj[items], indptr[:-1], axis=0) / sqrt_counts[:, None]
+        decay = np.ones(self.trainset.n_users)
+        shift = np.zeros_like(self.pu)
+
+        for batches, finished in steps:
+            for u, i, r, by_item, rows_i in batches:
+                bu, bi = self.bu[u], self.bi[i]
+                pu, qi, impl = self.pu[u], self.qi[i], implicit[u]
+
+                err = r - (mu + bu + bi + np.einsum('ij,ij->i', qi, pu + impl))
+
+                # Los usuarios del minilote son distintos; las películas se pueden repetir
+                self.bu[u] += self.lr_bu * (err - self.reg_bu * bu)
+                self.bi[rows_i] += by_item @ (self.lr_bi * (err - self.reg_bi * bi))
+                self.pu[u] += self.lr_pu * (err[:, None] * qi - self.reg_pu * pu)
+                self.qi[rows_i] += by_item @ (self.lr_qi * (err[:, None] * (pu + impl) - self.reg_qi * qi))
+
+                # y_j += lr_yj * (err * qi / √|N(u)| - reg_yj * y_j) para todo j en N(u)
+                step = self.lr_yj * err[:, None] * qi / sqrt_counts[u][:, None]
+                implicit[u] += self.lr_yj * (err[:, None] * qi - self.reg_yj * impl)
+                decay[u] *= yj_decay
+                shift[u] = shift[u] * yj_decay + step
+
+            if finished is not None:
+                # y_j ← a·y_j + c para los usuarios que terminan. Si varios
+                # comparten un ítem, los factores a se multiplican y los c se suman
+                owners, by_item, rows = finished
+                self.yj[rows] *= np.exp(by_item @ np.log(decay[owners]))[:, None]
+                self.yj[rows] += by_item @ shift[owners]
+
+    def estimate(self, u, i):
+        est = self.trainset.global_mean
+
+        if self.trainset.knows_user(u):
+            est += self.bu[u]
+
+        if self.trainset.knows_item(i):
+            est += self.bi[i]
+
+        if self.trainset.knows_user(u) and self.trainset.knows_item(i):
+            Iu = [j for j, _ in self.trainset.ur[u]]
+            u_impl = self.yj[Iu].sum(axis=0) / np.sqrt(len(Iu))
+            est += np.dot(self.qi[i], self.pu[u] + u_impl)
+
+        return est
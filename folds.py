@@ -0,0 +1,235 @@
+"""
+Gestor de folds para la validación cruzada
+Genera una sola vez las particiones train/test como arrays de índices sobre
+los ratings del dataset, las guarda en disco y entrega los mismos trainsets a todos
+los algoritmos, de forma que sus métricas son directamente comparables.
+También construye particiones temporales a partir de la fecha de los ratings
+"""
+
+import os
+from datetime import datetime, timezone
+import numpy as np
+
+
+class FoldManager:
+    """
+    Construye y reutiliza las K particiones de un dataset de Surprise
+    """
+
+    def __init__(self, data, n_folds, seed, name, cache_dir=None, keep_trainsets=True):
+        """
+        Args:
+            data: Dataset de Surprise (con raw_ratings)
+            n_folds: Número de folds
+            seed: Semilla con la que se barajan los ratings
+            name: Nombre del dataset, usado en el fichero de folds
+            cache_dir: Directorio donde guardar los índices (None = solo en memoria)
+            keep_trainsets: Si True, los trainsets construidos se conservan en
+                memoria y se reutilizan entre algoritmos
+        """
+        self.data = data
+        self.n_folds = n_folds
+        self.seed = seed
+        self.name = name
+        self.cache_dir = cache_dir
+        self.keep_trainsets = keep_trainsets
+
+        self.n_ratings = data.n_ratings if hasattr(data, 'n_ratings') else len(data.raw_ratings)
+        self.permutation = None
+        self.boundaries = None
+        self.loaded_from_disk = False
+        self._trainsets = {}
+
+    def __len__(self):
+        return self.n_folds
+
+    @property
+    def file_path(self):
+        """Fichero .npz donde se guardan los índices de los folds"""
+        if self.cache_dir is None:
+            return None
+        file_name = f'folds_{self.name}_{self.n_folds}f_seed{self.seed}_n{self.n_ratings}.npz'
+        return os.path.join(self.cache_dir, file_name)
+
+    def split(self):
+        """
+        Genera (o lee de disco) la permutación de los ratings y los límites
+        de cada fold, con el mismo reparto que surprise.model_selection.KFold
+        """
+        if self.permutation is not None:
+            return
+
+        if self.file_path is not None and os.path.exists(self.file_path):
+            with np.load(self.file_path) as stored:
+                self.permutation = stored['permutation']
+                self.boundaries = stored['boundaries']
+            self.loaded_from_disk = True
+            return
+
+        if self.n_folds < 2 or self.n_folds > self.n_ratings:
+            raise ValueError(f"Número de folds incorrecto: {self.n_folds}")
+
+        rng = np.random.RandomState(self.seed)
+        index_dtype = np.int32 if self.n_ratings < np.iinfo(np.int32).max else np.int64
+        self.permutation = rng.permutation(self.n_ratings).astype(index_dtype)
+
+        fold_sizes = np.full(self.n_folds, self.n_ratings // self.n_folds)
+        fold_sizes[:self.n_ratings % self.n_folds] += 1
+        self.boundaries = np.concatenate([[0], np.cumsum(fold_sizes)])
+
+        if self.file_path is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = self.file_path + '.tmp.npz'
+            np.savez(tmp_path, permutation=self.permutation, boundaries=self.boundaries)
+            os.replace(tmp_path, self.file_path)
+
+    def indices(self, fold_index):
+        """
+        Índices de entrenamiento y test de un fold
+
+        Returns:
+            tuple: (train_idx, test_idx) como arrays de enteros
+        """
+        self.split()
+        start, stop = self.boundaries[fold_index], self.boundaries[fold_index + 1]
+        test_idx = self.permutation[start:stop]
+        train_idx = np.concatenate([self.permutation[:start], self.permutation[stop:]])
+        return train_idx, test_idx
+
+    def train_size(self, fold_index):
+        """Número de ratings de entrenamiento de un fold"""
+        self.split()
+        return int(self.n_ratings - (self.boundaries[fold_index + 1] - self.boundaries[fold_index]))
+
+    def get(self, fold_index):
+        """
+        Trainset y testset de un fold, construidos una sola vez
+
+        Returns:
+            tuple: (Trainset, testset)
+        """
+        if fold_index in self._trainsets:
+            return self._trainsets[fold_index]
+
+        train_idx, test_idx = self.indices(fold_index)
+        if getattr(self.data, 'id_mapping', None) is not None:
+            # Ids codificados: el trainset se construye con operaciones de arrays
+            trainset = self.data.trainset_from_indices(train_idx)
+            testset = self.data.testset_from_indices(test_idx)
+        elif hasattr(self.data, 'ratings_at'):
+            # Solo las tuplas de este fold, sin construir raw_ratings completo
+            trainset = self.data.construct_trainset(self.data.ratings_at(train_idx))
+            testset = self.data.construct_testset(self.data.ratings_at(test_idx))
+        else:
+            raw_ratings = self.data.raw_ratings
+            trainset = self.data.construct_trainset([raw_ratings[i] for i in train_idx])
+            testset = self.data.construct_testset([raw_ratings[i] for i in test_idx])
+
+        if self.keep_trainsets:
+            self._trainsets[fold_index] = (trainset, testset)
+        return trainset, testset
+
+    def build_all(self):
+        """Construye por adelantado los trainsets de todos los folds"""
+        for fold_index in range(self.n_folds):
+            self.get(fold_index)
+
+
+class TemporalSplit(FoldManager):
+    """
+    Partición train/test única según la fecha de los ratings, para evaluar
+    sin que ratings futuros entren en el entrenamiento:
+
+    - 'temporal': corte global; los ratings a partir de la fecha de corte
+      (o del último test_fraction de los ratings) van al test
+    - 'leave_last_n': los last_n ratings más recientes de cada usuario con
+      más de last_n ratings van al test
+
+    Tiene la misma interfaz que FoldManager con un único fold
+    """
+
+    STRATEGIES = ('temporal', 'leave_last_n')
+
+    def __init__(self, data, timestamps, strategy, users=None, test_fraction=0.2, cutoff=None,
+                 last_n=1, name='', keep_trainsets=True):
+        """
+        Args:
+            data: Dataset de Surprise (con raw_ratings)
+            timestamps: Array de enteros con la fecha de cada rating del
+                dataset
+            strategy: 'temporal' o 'leave_last_n'
+            users: Array con el usuario de cada rating (necesario para
+                'leave_last_n')
+            test_fraction: Fracción de ratings más recientes que van al test
+                con 'temporal' si no se indica cutoff
+            cutoff: Fecha de corte (timestamp) de 'temporal'
+            last_n: Ratings por usuario que van al test con 'leave_last_n'
+            name: Nombre del dataset
+            keep_trainsets: Si True, el trainset construido se conserva en memoria
+        """
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Partición '{strategy}' no reconocida. Use una de: {', '.join(self.STRATEGIES)}")
+        if strategy == 'leave_last_n' and users is None:
+            raise ValueError("La partición 'leave_last_n' necesita el usuario de cada rating")
+
+        FoldManager.__init__(self, data, n_folds=1, seed=None, name=name, keep_trainsets=keep_trainsets)
+        self.timestamps = timestamps
+        self.strategy = strategy
+        self.users = users
+        self.test_fraction = test_fraction
+        self.cutoff = cutoff
+        self.last_n = last_n
+        self.train_idx = None
+        self.test_idx = None
+
+    def split(self):
+        """Calcula los índices de train y test con una ordenación, sin bucles por rating"""
+        if self.train_idx is not None:
+            return
+
+        timestamps = np.asarray(self.timestamps)
+        index_dtype = np.int32 if self.n_ratings < np.iinfo(np.int32).max else np.int64
+
+        if self.strategy == 'temporal':
+            if self.cutoff is None:
+                position = min(max(int(self.n_ratings * (1 - self.test_fraction)), 1), self.n_ratings - 1)
+                self.cutoff = int(np.partition(timestamps, position)[position])
+            test_mask = timestamps >= self.cutoff
+        else:
+            # Ratings agrupados por usuario y, dentro de cada usuario, por fecha
+            _, user_codes = np.unique(np.asarray(self.users), return_inverse=True)
+            order = np.lexsort((timestamps, user_codes))
+            counts = np.bincount(user_codes)
+            sorted_codes = user_codes[order]
+            from_end = np.cumsum(counts)[sorted_codes] - 1 - np.arange(self.n_ratings)
+            test_mask = np.zeros(self.n_ratings, dtype=bool)
+            test_mask[order] = (from_end < self.last_n) & (counts[sorted_codes] > self.last_n)
+
+        self.test_idx = np.flatnonzero(test_mask).astype(index_dtype)
+        self.train_idx = np.flatnonzero(~test_mask).astype(index_dtype)
+        if len(self.test_idx) == 0 or len(self.train_idx) == 0:
+            raise ValueError(f"La partición {self.describe()} deja el train o el test vacío")
+
+    def indices(self, fold_index):
+        """
+        Índices de entrenamiento y test (fold_index solo puede ser 0)
+
+        Returns:
+            tuple: (train_idx, test_idx) como arrays de enteros
+        """
+        self.split()
+        return self.train_idx, self.test_idx
+
+    def train_size(self, fold_index):
+        """Número de ratings de entrenamiento de la partición"""
+        self.split()
+        return len(self.train_idx)
+
+    def describe(self):
+        """Descripción de la partición para la salida y el CSV"""
+        if self.strategy == 'temporal':
+            if self.cutoff is None:
+                return f"temporal (último {self.test_fraction:.0%} de los ratings)"
+            date = datetime.fromtimestamp(self.cutoff, tz=timezone.utc).strftime('%Y-%m-%d')
+            return f"temporal (corte {date})"
+        return f"leave_last_{self.last_n}"
@@ -0,0 +1,202 @@
+"""
+Codificación densa de los ids de usuarios y películas
+Traduce una sola vez, al cargar el dataset, los userId/movieId originales a
+códigos int32 consecutivos (0..n-1) con operaciones vectorizadas. Los
+datasets, los folds, los modelos guardados y el servicio de recomendaciones
+comparten la misma tabla, que se guarda junto a la caché binaria de ratings
+"""
+
+import os
+from collections import defaultdict
+import numpy as np
+from surprise import Trainset
+
+
+USER_IDS_FILE = 'user_ids.npy'
+ITEM_IDS_FILE = 'item_ids.npy'
+
+# Ids enteros no negativos con un máximo de hasta DENSE_RANGE_FACTOR veces el
+# número de valores se factorizan con una tabla directa (sin ordenar)
+DENSE_RANGE_FACTOR = 4
+
+
+def factorize(values):
+    """
+    Códigos densos de un array de ids
+
+    Los valores distintos se numeran en orden creciente, de modo que el
+    código de un id no depende del orden de los ratings
+
+    Returns:
+        tuple: (ids distintos ordenados, código int32 de cada valor)
+    """
+    values = np.asarray(values)
+    if len(values) and values.dtype.kind in 'iu':
+        low, high = int(values.min()), int(values.max())
+        if low >= 0 and high < DENSE_RANGE_FACTOR * len(values):
+            present = np.zeros(high + 1, dtype=bool)
+            present[values] = True
+            codes = np.cumsum(present, dtype=np.int32) - 1
+            return np.flatnonzero(present).astype(values.dtype), codes[values]
+
+    uniques, codes = np.unique(values, return_inverse=True)
+    return uniques, codes.astype(np.int32).ravel()
+
+
+def _first_appearance(codes):
+    """
+    Ids internos numerados por orden de primera aparición, como los asigna
+    Dataset.construct_trainset de Surprise
+
+    Returns:
+        tuple: (id interno de cada valor, código de cada id interno)
+    """
+    uniques, first, inverse = np.unique(codes, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind='stable')
+    rank = np.empty(len(order), dtype=np.int32)
+    rank[order] = np.arange(len(order), dtype=np.int32)
+    return rank[inverse.ravel()], uniques[order]
+
+
+def group_ratings(keys, values, ratings, n_keys):
+    """Listas [(valor, rating), ...] de cada clave, en el orden original de los ratings"""
+    order = np.argsort(keys, kind='stable')
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(keys, minlength=n_keys))]).tolist()
+    pairs = list(zip(values[order].tolist(), ratings[order].tolist()))
+    groups = defaultdict(list)
+    for key in range(n_keys):
+        groups[key] = pairs[indptr[key]:indptr[key + 1]]
+    return groups
+
+
+class IdMapping:
+    """
+    Tabla de traducción entre ids originales y códigos densos
+
+    user_ids[c] es el id original del usuario con código c (igual para
+    item_ids). Los ids están ordenados, así que la traducción inversa es una
+    búsqueda binaria
+    """
+
+    def __init__(self, user_ids, item_ids):
+        self.user_ids = np.asarray(user_ids)
+        self.item_ids = np.asarray(item_ids)
+
+    @classmethod
+    def encode(cls, ratings):
+        """
+        Factoriza las columnas 'user' e 'item' de unos ratings
+
+        Args:
+            ratings: dict con los arrays 'user', 'item', 'rating' y,
+                opcionalmente, 'timestamp'
+
+        Returns:
+            tuple: (IdMapping, dict con los mismos arrays y los ids
+            sustituidos por sus códigos)
+        """
+        user_ids, user_codes = factorize(ratings['user'])
+        item_ids, item_codes = factorize(ratings['item'])
+        encoded = dict(ratings, user=user_codes, item=item_codes)
+        return cls(user_ids, item_ids), encoded
+
+    @property
+    def n_users(self):
+        return len(self.user_ids)
+
+    @property
+    def n_items(self):
+        return len(self.item_ids)
+
+    @staticmethod
+    def _lookup(ids, raw_values):
+        """Código de cada id original (-1 si no está en la tabla)"""
+        raw_values = np.asarray(raw_values)
+        positions = np.minimum(np.searchsorted(ids, raw_values), max(len(ids) - 1, 0))
+        found = ids[positions] == raw_values if len(ids) else np.zeros(len(raw_values), dtype=bool)
+        return np.where(found, positions, -1).astype(np.int32)
+
+    def user_codes(self, raw_users):
+        """Códigos de una lista de usuarios originales (-1 si son desconocidos)"""
+        return self._lookup(self.user_ids, raw_users)
+
+    def item_codes(self, raw_items):
+        """Códigos de una lista de películas originales (-1 si son desconocidas)"""
+        return self._lookup(self.item_ids, raw_items)
+
+    def decode_users(self, codes):
+        """Ids originales de unos códigos de usuario"""
+        return self.user_ids[np.asarray(codes, dtype=np.int64)]
+
+    def decode_items(self, codes):
+        """Ids originales de unos códigos de película"""
+        return self.item_ids[np.asarray(codes, dtype=np.int64)]
+
+    def build_trainset(self, users, items, ratings, rating_scale):
+        """
+        Trainset de Surprise a partir de ratings ya codificados, sin recorrer
+        los ratings con diccionarios. Los ids internos, ur e ir son los mismos
+        que construiría Dataset.construct_trainset con esos ratings
+
+        El trainset guarda además la traducción código -> id interno
+        (user_inner_of_code, item_inner_of_code; -1 si no aparece) con la
+        que scoring y ranking traducen los testsets sin diccionarios
+
+        Args:
+            users: Códigos de usuario de cada rating
+            items: Códigos de película de cada rating
+            ratings: Rating de cada par
+            rating_scale: Tupla (mínimo, máximo) de la escala de ratings
+
+        Returns:
+            Trainset: Trainset cuyos ids "originales" son los códigos
+        """
+        inner_users, user_codes = _first_appearance(np.asarray(users))
+        inner_items, item_codes = _first_appearance(np.asarray(items))
+        ratings = np.asarray(ratings)
+        n_users, n_items = len(user_codes), len(item_codes)
+
+        trainset = Trainset(
+            group_ratings(inner_users, inner_items, ratings, n_users),
+            group_ratings(inner_items, inner_users, ratings, n_items),
+            n_users,
+            n_items,
+            len(ratings),
+            tuple(rating_scale),
+            dict(zip(user_codes.tolist(), range(n_users))),
+            dict(zip(item_codes.tolist(), range(n_items))),
+        )
+        trainset.user_inner_of_code = np.full(self.n_users, -1, dtype=np.int32)
+        trainset.user_inner_of_code[user_codes] = np.arange(n_users, dtype=np.int32)
+        trainset.item_inner_of_code = np.full(self.n_items, -1, dtype=np.int32)
+        trainset.item_inner_of_code[item_codes] = np.arange(n_items, dtype=np.int32)
+        return trainset
+
+    def save(self, directory):
+        """Guarda la tabla en directory (user_ids.npy e item_ids.npy)"""
+        os.makedirs(directory, exist_ok=True)
+        for file_name, ids in ((USER_IDS_FILE, self.user_ids), (ITEM_IDS_FILE, self.item_ids)):
+            tmp_path = os.path.join(directory, file_name.replace('.npy', '.tmp.npy'))
+            np.save(tmp_path, ids)
+            os.replace(tmp_path, os.path.join(directory, file_name))
+
+    @classmethod
+    def load(cls, directory):
+        """Lee una tabla guardada con save()"""
+        return cls(np.load(os.path.join(directory, USER_IDS_FILE)),
+                   np.load(os.path.join(directory, ITEM_IDS_FILE)))
+
+    @staticmethod
+    def exists(directory):
+        """Indica si directory contiene una tabla guardada"""
+        return all(os.path.exists(os.path.join(directory, name)) for name in (USER_IDS_FILE, ITEM_IDS_FILE))
+
+
+def translate(inner_of_code, codes):
+    """
+    Ids internos de un trainset para unos códigos (-1 si el trainset no los
+    conoce o el código está fuera de la tabla)
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    valid = (codes >= 0) & (codes < len(inner_of_code))
+    return np.where(valid, inner_of_code[np.where(valid, codes, 0)], -1).astype(np.int64)
@@ -0,0 +1,352 @@
+"""
+Actualización incremental de modelos de factores
+Aplica a un modelo SVD o NMF guardado con model_store un fichero de ratings
+nuevos (userId,movieId,rating,timestamp): añade filas a los factores para los
+usuarios y películas nuevos y entrena unas pocas épocas que solo actualizan
+los usuarios y películas afectados, sin reentrenar desde cero
+
+    python incremental.py            # aplica config.INCREMENTAL_DELTA_FILE
+    python incremental.py benchmark  # compara con reentrenar desde cero
+"""
+
+import os
+import sys
+import time
+import numpy as np
+from surprise.utils import get_rng
+import config
+import model_store
+import ratings_cache
+import scoring
+from scoring import BatchScorer, trainset_csr
+
+
+# Modelos que se pueden actualizar de forma incremental
+INCREMENTAL_ALGORITHMS = ('SVD', 'NMF')
+
+
+def load_delta(file_path):
+    """
+    Lee un fichero de ratings nuevos con el formato de ml-32m
+
+    Returns:
+        dict: Arrays 'user', 'item' y 'rating'
+    """
+    blocks = list(ratings_cache.iter_32m_chunks(file_path, config.CSV_CHUNK_SIZE, with_timestamp=False))
+    if not blocks:
+        return {name: np.empty(0) for name in ('user', 'item', 'rating')}
+    return {name: np.concatenate([block[name] for block in blocks]) for name in ('user', 'item', 'rating')}
+
+
+def _inner_ids(raw_values, raw_ids, index):
+    """
+    Ids internos de unos ids originales, asignando ids nuevos (a partir de
+    len(raw_ids)) a los que el modelo no conoce. raw_ids se amplía en el sitio
+
+    Los ids del fichero se convierten al tipo de los del modelo (texto si el
+    dataset se cargó sin la caché binaria)
+    """
+    as_text = bool(raw_ids) and isinstance(raw_ids[0], str)
+    inner = np.empty(len(raw_values), dtype=np.int64)
+    for position, raw in enumerate(raw_values.tolist()):
+        raw = str(raw) if as_text else raw
+        inner_id = index.get(raw)
+        if inner_id is None:
+            inner_id = index[raw] = len(raw_ids)
+            raw_ids.append(raw)
+        inner[position] = inner_id
+    return inner
+
+
+def _grow(array, n_rows, init):
+    """Añade filas al final de un array de parámetros, inicializadas con init(n, columnas)"""
+    extra = n_rows - len(array)
+    if extra <= 0:
+        return np.array(array)
+    return np.concatenate([array, init(extra, *array.shape[1:])])
+
+
+def _sgd_epoch(algo, users, items, ratings, user_mask, item_mask, rng, batch_size):
+    """
+    Una época de SGD de SVD por minilotes: los ratings de cada lote se
+    procesan a la vez con los parámetros del inicio del lote. Solo se
+    actualizan los usuarios de user_mask y las películas de item_mask
+    """
+    mu = algo.trainset.global_mean
+    order = rng.permutation(len(ratings))
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        u, i, r = users[batch], items[batch], ratings[batch]
+        pu, qi = algo.pu[u], algo.qi[i]
+
+        est = np.einsum('ij,ij->i', pu, qi)
+        if algo.biased:
+            est += mu + algo.bu[u] + algo.bi[i]
+        err = r - est
+
+        update_u, update_i = user_mask[u], item_mask[i]
+        if algo.biased:
+            np.add.at(algo.bu, u[update_u], algo.lr_bu * (err - algo.reg_bu * algo.bu[u])[update_u])
+            np.add.at(algo.bi, i[update_i], algo.lr_bi * (err - algo.reg_bi * algo.bi[i])[update_i])
+        np.add.at(algo.pu, u[update_u], (algo.lr_pu * (err[:, None] * qi - algo.reg_pu * pu))[update_u])
+        np.add.at(algo.qi, i[update_i], (algo.lr_qi * (err[:, None] * pu - algo.reg_qi * qi))[update_i])
+
+
+def _nmf_epoch(algo, users, items, ratings, user_mask, item_mask, rng, batch_size):
+    """
+    Una época de NMF con las actualizaciones multiplicativas de Surprise,
+    solo para los usuarios de user_mask y las películas de item_mask. Los
+    ratings de entrada deben incluir todos los de esos usuarios y películas,
+    y entonces sus filas se actualizan igual que en un entrenamiento completo
+    """
+    mu = algo.trainset.global_mean
+    est = np.einsum('ij,ij->i', algo.pu[users], algo.qi[items])
+    if algo.biased:
+        # Los sesgos se ajustan por SGD como en Surprise (por minilotes)
+        order = rng.permutation(len(ratings))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            u, i = users[batch], items[batch]
+            err = ratings[batch] - (mu + algo.bu[u] + algo.bi[i] + est[batch])
+            update_u, update_i = user_mask[u], item_mask[i]
+            np.add.at(algo.bu, u[update_u], algo.lr_bu * (err - algo.reg_bu * algo.bu[u])[update_u])
+            np.add.at(algo.bi, i[update_i], algo.lr_bi * (err - algo.reg_bi * algo.bi[i])[update_i])
+        est = est + mu + algo.bu[users] + algo.bi[items]
+
+    n_factors = algo.pu.shape[1]
+    user_num = np.zeros((len(algo.pu), n_factors))
+    user_denom = np.zeros((len(algo.pu), n_factors))
+    item_num = np.zeros((len(algo.qi), n_factors))
+    item_denom = np.zeros((len(algo.qi), n_factors))
+    np.add.at(user_num, users, algo.qi[items] * ratings[:, None])
+    np.add.at(user_denom, users, algo.qi[items] * est[:, None])
+    np.add.at(item_num, items, algo.pu[users] * ratings[:, None])
+    np.add.at(item_denom, items, algo.pu[users] * est[:, None])
+
+    touched_users = np.flatnonzero(user_mask)
+    n_user_ratings = np.bincount(users, minlength=len(algo.pu))[touched_users]
+    user_denom[touched_users] += n_user_ratings[:, None] * algo.reg_pu * algo.pu[touched_users]
+    algo.pu[touched_users] *= user_num[touched_users] / user_denom[touched_users]
+
+    touched_items = np.flatnonzero(item_mask)
+    n_item_ratings = np.bincount(items, minlength=len(algo.qi))[touched_items]
+    item_denom[touched_items] += n_item_ratings[:, None] * algo.reg_qi * algo.qi[touched_items]
+    algo.qi[touched_items] *= item_num[touched_items] / item_denom[touched_items]
+
+
+def update_model(algo, delta, n_epochs=None, batch_size=None, verbose=False):
+    """
+    Actualiza en el sitio un modelo SVD o NMF entrenado con ratings nuevos
+
+    Los ratings se añaden al trainset (un rating nuevo de un par ya
+    valorado sustituye al anterior), los factores crecen con filas
+    inicializadas como en fit() para los usuarios y películas nuevos, y se
+    entrenan n_epochs épocas actualizando solo los parámetros de los usuarios
+    y películas del fichero: SVD con SGD sobre los ratings nuevos y NMF con
+    sus actualizaciones multiplicativas sobre todos los ratings de esas filas
+
+    Args:
+        algo: Modelo SVD o NMF entrenado (con algo.trainset)
+        delta: dict con los arrays 'user', 'item' y 'rating' (ids originales)
+        n_epochs: Épocas de entrenamiento (por defecto, config.INCREMENTAL_EPOCHS)
+        batch_size: Ratings por minilote de SGD (por defecto, config.INCREMENTAL_BATCH_SIZE)
+        verbose: Si True, informa de cada época
+
+    Returns:
+        dict: Usuarios y películas nuevos y afectados, ratings usados y tiempo
+    """
+    class_name = type(algo).__name__
+    if class_name not in INCREMENTAL_ALGORITHMS:
+        raise ValueError(
+            f"El algoritmo {class_name} no admite actualización incremental. "
+            f"Soportados: {', '.join(INCREMENTAL_ALGORITHMS)}"
+        )
+    n_epochs = config.INCREMENTAL_EPOCHS if n_epochs is None else n_epochs
+    batch_size = batch_size or config.INCREMENTAL_BATCH_SIZE
+    start_time = time.time()
+
+    trainset = algo.trainset
+    raw_user_ids = [trainset.to_raw_uid(u) for u in range(trainset.n_users)]
+    raw_item_ids = [trainset.to_raw_iid(i) for i in range(trainset.n_items)]
+    delta_users = _inner_ids(delta['user'], raw_user_ids, dict(trainset._raw2inner_id_users))
+    delta_items = _inner_ids(delta['item'], raw_item_ids, dict(trainset._raw2inner_id_items))
+    n_users, n_items = len(raw_user_ids), len(raw_item_ids)
+
+    # Ratings antiguos más los nuevos; si un par se repite se queda el último
+    indptr, old_items, old_ratings = trainset_csr(trainset)
+    users = np.concatenate([np.repeat(np.arange(trainset.n_users), np.diff(indptr)), delta_users])
+    items = np.concatenate([old_items.astype(np.int64), delta_items])
+    ratings = np.concatenate([old_ratings.astype(np.float64), np.asarray(delta['rating'], dtype=np.float64)])
+    is_new = np.r_[np.zeros(len(old_ratings), dtype=bool), np.ones(len(delta_users), dtype=bool)]
+    keys = users * n_items + items
+    order = np.argsort(keys, kind='stable')
+    order = order[np.r_[keys[order][1:] != keys[order][:-1], True]]
+    users, items, ratings, is_new = users[order], items[order], ratings[order], is_new[order]
+
+    arrays = {
+        'ur_indptr': np.concatenate([[0], np.cumsum(np.bincount(users, minlength=n_users))]),
+        'ur_items': items.astype(np.int32),
+        'ur_ratings': ratings.astype(np.float32),
+        'raw_user_ids': raw_user_ids,
+        'raw_item_ids': raw_item_ids,
+    }
+    algo.trainset = model_store.build_trainset(arrays, trainset.rating_scale)
+    algo.trainset._global_mean = float(ratings.mean())
+
+    # Filas nuevas inicializadas como en fit()
+    rng = get_rng(algo.random_state)
+    if class_name == 'SVD':
+        init = lambda n, f: rng.normal(algo.init_mean, algo.init_std_dev, (n, f))
+    else:
+        init = lambda n, f: rng.uniform(algo.init_low, algo.init_high, (n, f))
+    algo.pu = _grow(algo.pu, n_users, init)
+    algo.qi = _grow(algo.qi, n_items, init)
+    algo.bu = _grow(algo.bu, n_users, lambda n: np.zeros(n))
+    algo.bi = _grow(algo.bi, n_items, lambda n: np.zeros(n))
+
+    # SVD ajusta por SGD los parámetros afectados con los ratings nuevos. Las
+    # actualizaciones multiplicativas de NMF necesitan todos los ratings de
+    # cada fila, así que NMF usa todos los de los usuarios y películas afectados
+    user_mask = np.zeros(n_users, dtype=bool)
+    user_mask[delta_users] = True
+    item_mask = np.zeros(n_items, dtype=bool)
+    item_mask[delta_items] = True
+    if class_name == 'SVD':
+        selected = is_new
+    else:
+        selected = user_mask[users] | item_mask[items]
+    users, items, ratings = users[selected], items[selected], ratings[selected]
+
+    epoch = _sgd_epoch if class_name == 'SVD' else _nmf_epoch
+    for current_epoch in range(n_epochs):
+        if verbose:
+            print(f"  Época incremental {current_epoch + 1}/{n_epochs}")
+        epoch(algo, users, items, ratings, user_mask, item_mask, rng, batch_size)
+
+    return {
+        'new_users': n_users - trainset.n_users,
+        'new_items': n_items - trainset.n_items,
+        'touched_users': int(user_mask.sum()),
+        'touched_items': int(item_mask.sum()),
+        'trained_ratings': len(ratings),
+        'total_ratings': algo.trainset.n_ratings,
+        'update_time': time.time() - start_time,
+    }
+
+
+def _accuracy(algo, testset):
+    """RMSE y MAE de un modelo sobre un testset, con predicción vectorizada"""
+    inner_users, inner_items, ratings, user_codes = scoring.map_testset(algo.trainset, testset)
+    estimates = BatchScorer(algo).predict_pairs(inner_users, inner_items)
+    return scoring.accuracy_metrics(['RMSE', 'MAE'], ratings, estimates, user_codes)
+
+
+def benchmark(recommender, algo_name):
+    """
+    Compara la actualización incremental con reentrenar desde cero
+
+    Los ratings se ordenan por fecha: el modelo base se entrena con los más
+    antiguos, los siguientes INCREMENTAL_BENCHMARK_DELTA forman el fichero de
+    ratings nuevos y los últimos INCREMENTAL_BENCHMARK_TEST el test
+
+    Args:
+        recommender: MovieLensRecommender con los datos cargados (con la caché
+            binaria, que conserva las fechas)
+        algo_name: Algoritmo del registro (SVD o NMF)
+
+    Returns:
+        list: Filas (modo, RMSE, MAE, tiempo en segundos)
+    """
+    if recommender.ratings is None:
+        raise ValueError("El benchmark necesita las fechas de los ratings: active USE_RATINGS_CACHE")
+
+    ratings = recommender.ratings
+    rating_scale = recommender.data.reader.rating_scale
+    order = np.argsort(ratings['timestamp'], kind='stable')
+    n_test = int(len(order) * config.INCREMENTAL_BENCHMARK_TEST)
+    n_delta = int(len(order) * config.INCREMENTAL_BENCHMARK_DELTA)
+    base_end = len(order) - n_test - n_delta
+    parts = {
+        'base': order[:base_end],
+        'delta': order[base_end:base_end + n_delta],
+        'test': order[base_end + n_delta:],
+    }
+    subset = lambda positions: {name: np.asarray(ratings[name])[positions] for name in ('user', 'item', 'rating')}
+    base, delta, test = (subset(parts[name]) for name in ('base', 'delta', 'test'))
+    testset = list(zip(test['user'].tolist(), test['item'].tolist(), test['rating'].tolist()))
+    params = config.ALGORITHM_PARAMS.get(algo_name, {})
+
+    print(f"Base: {len(parts['base'])} ratings | Nuevos: {n_delta} | Test: {n_test}")
+
+    start_time = time.time()
+    algo = recommender.algorithms[algo_name](**params)
+    algo.fit(ratings_cache.build_dataset(base, rating_scale).build_full_trainset())
+    base_time = time.time() - start_time
+    rows = [('Sin actualizar', *_accuracy(algo, testset).values(), base_time)]
+
+    stats = update_model(algo, delta)
+    rows.append((f"Incremental ({config.INCREMENTAL_EPOCHS} épocas)",
+                 *_accuracy(algo, testset).values(), stats['update_time']))
+
+    full = {name: np.concatenate([base[name], delta[name]]) for name in base}
+    start_time = time.time()
+    retrained = recommender.algorithms[algo_name](**params)
+    retrained.fit(ratings_cache.build_dataset(full, rating_scale).build_full_trainset())
+    rows.append(('Reentrenamiento completo', *_accuracy(retrained, testset).values(), time.time() - start_time))
+
+    print(f"Usuarios nuevos: {stats['new_users']} | Películas nuevas: {stats['new_items']} | "
+          f"Ratings entrenados en modo incremental: {stats['trained_ratings']} de {stats['total_ratings']}")
+    return rows
+
+
+def main():
+    """
+    Aplica config.INCREMENTAL_DELTA_FILE al modelo guardado de
+    config.INCREMENTAL_ALGORITHM, o compara ambos modos con 'benchmark'
+    """
+    from recommender import MovieLensRecommender
+
+    algo_name = config.INCREMENTAL_ALGORITHM
+    recommender = MovieLensRecommender()
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'benchmark':
+        print("\n" + "="*60)
+        print(f" BENCHMARK: ACTUALIZACIÓN INCREMENTAL vs REENTRENAMIENTO ({algo_name})")
+        print("="*60)
+        recommender.load_data()
+        rows = benchmark(recommender, algo_name)
+        print(f"\n{'Modo':<30} {'RMSE':<10} {'MAE':<10} {'Tiempo (s)':<12}")
+        print("-" * 62)
+        for mode, rmse, mae, elapsed in rows:
+            print(f"{mode:<30} {rmse:<10.4f} {mae:<10.4f} {elapsed:<12.2f}")
+        return
+
+    print("\n" + "="*60)
+    print(" ACTUALIZACIÓN INCREMENTAL")
+    print("="*60)
+
+    model_dir = os.path.join(model_store.models_dir(recommender.dataset_name), algo_name)
+    if not os.path.exists(model_dir):
+        print(f"✗ No hay un modelo guardado en {model_dir}/ (ejecuta 'python model_store.py')")
+        return
+    if not os.path.exists(config.INCREMENTAL_DELTA_FILE):
+        print(f"✗ No se encuentra el fichero de ratings nuevos: {config.INCREMENTAL_DELTA_FILE}")
+        return
+
+    meta, _ = model_store.load_arrays(model_dir)
+    algo = model_store.load_model(model_dir, recommender.algorithms, mmap=False)
+    delta = load_delta(config.INCREMENTAL_DELTA_FILE)
+    print(f"Aplicando {len(delta['rating'])} ratings nuevos a {algo_name}...")
+
+    stats = update_model(algo, delta, verbose=config.VERBOSE)
+    model_store.save_model(algo, algo_name, model_dir, meta['params'])
+
+    print(f"✓ Modelo actualizado en {model_dir}/")
+    print(f"  Usuarios nuevos: {stats['new_users']} | Películas nuevas: {stats['new_items']}")
+    print(f"  Afectados: {stats['touched_users']} usuarios, {stats['touched_items']} películas "
+          f"({stats['trained_ratings']} de {stats['total_ratings']} ratings)")
+    print(f"  Tiempo: {stats['update_time']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,531 @@
+"""
+Motor KNN sobre matrices dispersas
+Versiones de KNNBasic, KNNWithMeans, KNNWithZScore y KNNBaseline que calculan
+las similitudes (cosine, msd, pearson y pearson_baseline, con las mismas
+fórmulas que Surprise) por bloques de filas de una matriz CSR de ratings y
+solo guardan los vecinos más similares de cada fila. La memoria deja de
+crecer con n_x² y la familia KNN se puede usar con ml-32m
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from scipy import sparse
+from surprise import AlgoBase, PredictionImpossible
+import config
+import resources
+from scoring import trainset_csr
+
+
+SIMILARITIES = ('cosine', 'msd', 'pearson', 'pearson_baseline')
+
+# Celdas (pares x vecinos guardados) procesadas a la vez al buscar vecindarios
+MAX_NEIGHBORHOOD_CELLS = 4_000_000
+
+
+def _n_threads():
+    """Hilos para calcular bloques de similitud según config.KNN_N_THREADS"""
+    return resources.threads_per_job(config.KNN_N_THREADS)
+
+
+def _to_csr(rows, cols, values, n_rows):
+    """Arrays CSR (punteros, columnas int32, valores float32) de unos ratings"""
+    order = np.argsort(rows, kind='stable')
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=n_rows))])
+    return indptr, cols[order].astype(np.int32), values[order].astype(np.float32)
+
+
+def _lists_csr(lists, n_rows):
+    """
+    Arrays CSR (punteros, columnas int32, valores float32) de las listas
+    [(columna, rating), ...] de un trainset (ur o ir), en su mismo orden
+    """
+    lengths = np.array([len(lists[row]) for row in range(n_rows)], dtype=np.int64)
+    indptr = np.concatenate([[0], np.cumsum(lengths)])
+    cols = np.empty(indptr[-1], dtype=np.int32)
+    values = np.empty(indptr[-1], dtype=np.float32)
+    for row in range(n_rows):
+        if lists[row]:
+            cols[indptr[row]:indptr[row + 1]], values[indptr[row]:indptr[row + 1]] = zip(*lists[row])
+    return indptr, cols, values
+
+
+def _row_positions(indptr, rows, lengths):
+    """Posiciones en los arrays CSR de todas las entradas de las filas dadas"""
+    offsets = np.cumsum(lengths) - lengths
+    return np.repeat(indptr[rows] - offsets, lengths) + np.arange(lengths.sum())
+
+
+def top_k_similarities(values, name, min_support, n_neighbors, shrinkage=100, verbose=False):
+    """
+    Calcula las similitudes entre las filas de una matriz CSR por bloques y
+    conserva solo los n_neighbors vecinos más similares (con similitud > 0,
+    que son los únicos que usan las predicciones) de cada fila
+
+    Para cada par de filas, las sumas sobre los ítems en común se obtienen
+    con productos dispersos (V·Vᵀ, V²·Bᵀ, B·V²ᵀ, B·Bᵀ... con B la matriz
+    binaria de ratings), de modo que cada bloque ocupa block x n_filas valores
+
+    Args:
+        values: Matriz CSR (n_x, n_y) con los ratings (o los residuos respecto
+            al baseline para 'pearson_baseline')
+        name: Similitud ('cosine', 'msd', 'pearson' o 'pearson_baseline')
+        min_support: Mínimo de ítems en común para que la similitud no sea 0
+        n_neighbors: Vecinos guardados por fila
+        shrinkage: Shrinkage de 'pearson_baseline'
+        verbose: Si True, informa del cálculo
+
+    Returns:
+        tuple: (vecinos int32, similitudes float32), matrices (n_x, n_neighbors)
+        ordenadas de mayor a menor similitud y rellenas con -1 / 0
+    """
+    if name not in SIMILARITIES:
+        raise ValueError(f"Similitud '{name}' no soportada. Use una de: {', '.join(SIMILARITIES)}")
+    if name == 'pearson_baseline':
+        min_support = max(2, min_support)
+
+    n_x = values.shape[0]
+    n_neighbors = max(1, min(n_neighbors, n_x - 1))
+
+    binary = values.copy()
+    binary.data[:] = 1.0
+    squares = values.multiply(values).tocsr()
+    values_t, binary_t, squares_t = (m.T.tocsr() for m in (values, binary, squares))
+
+    n_threads = _n_threads()
+    # Unas 8 matrices (bloque x n_x) float64 vivas por hilo
+    block_size = int(config.KNN_BLOCK_MEMORY_MB * 1024 ** 2 / (n_threads * 8 * 8 * n_x))
+    block_size = max(1, min(block_size, n_x))
+
+    if verbose:
+        print(f"Calculando similitudes {name} por bloques de {block_size} filas "
+              f"({n_threads} hilos, {n_neighbors} vecinos por fila)...")
+
+    neighbors = np.full((n_x, n_neighbors), -1, dtype=np.int32)
+    neighbor_sims = np.zeros((n_x, n_neighbors), dtype=np.float32)
+
+    def compute_block(start):
+        stop = min(start + block_size, n_x)
+        block_values, block_binary, block_squares = values[start:stop], binary[start:stop], squares[start:stop]
+
+        freq = (block_binary @ binary_t).toarray()
+        prods = (block_values @ values_t).toarray()
+        sqi = (block_squares @ binary_t).toarray()
+        sqj = (block_binary @ squares_t).toarray()
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if name == 'cosine':
+                sim = prods / np.sqrt(sqi * sqj)
+            elif name == 'msd':
+                sim = 1 / ((sqi + sqj - 2 * prods) / freq + 1)
+            elif name == 'pearson':
+                si = (block_values @ binary_t).toarray()
+                sj = (block_binary @ values_t).toarray()
+                num = freq * prods - si * sj
+                denum = np.sqrt((freq * sqi - si ** 2) * (freq * sqj - sj ** 2))
+                sim = np.where(denum == 0, 0.0, num / denum)
+            else:
+                sim = prods / np.sqrt(sqi * sqj)
+                sim *= (freq - 1) / (freq - 1 + shrinkage)
+
+        sim[(freq < min_support) | ~np.isfinite(sim)] = 0.0
+        sim[np.arange(stop - start), np.arange(start, stop)] = -np.inf  # una fila no es su propio vecino
+
+        top = np.argpartition(-sim, n_neighbors - 1, axis=1)[:, :n_neighbors]
+        top_sims = np.take_along_axis(sim, top, axis=1)
+        # Mayor similitud primero; los empates, por id de vecino
+        order = np.lexsort((top, -top_sims), axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_sims = np.take_along_axis(top_sims, order, axis=1)
+
+        positive = top_sims > 0
+        neighbors[start:stop] = np.where(positive, top, -1)
+        neighbor_sims[start:stop] = np.where(positive, top_sims, 0.0)
+
+    starts = range(0, n_x, block_size)
+    if n_threads > 1:
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            list(executor.map(compute_block, starts))
+    else:
+        for start in starts:
+            compute_block(start)
+
+    return neighbors, neighbor_sims
+
+
+class SparseSymmetricAlgo(AlgoBase):
+    """
+    Base de los KNN dispersos. Como en Surprise, x son los usuarios e y los
+    ítems si user_based es True, y al revés en caso contrario
+    """
+
+    def __init__(self, k=40, min_k=1, sim_options={}, verbose=True, **kwargs):
+        AlgoBase.__init__(self, sim_options=sim_options, **kwargs)
+        self.k = k
+        self.min_k = min_k
+        self.verbose = verbose
+
+    def fit(self, trainset):
+        AlgoBase.fit(self, trainset)
+
+        ub = self.sim_options['user_based']
+        self.n_x = trainset.n_users if ub else trainset.n_items
+        self.n_y = trainset.n_items if ub else trainset.n_users
+
+        # Ratings en CSR por x y por y (los ratings de MovieLens son exactos en float32)
+        indptr, items, ratings = trainset_csr(trainset)
+        users = np.repeat(np.arange(trainset.n_users, dtype=np.int32), np.diff(indptr))
+        x, y = (users, items) if ub else (items, users)
+        self.x_indptr, self.x_cols, self.x_ratings = _to_csr(x, y, ratings, self.n_x)
+        # Las filas de y conservan el orden de yr (ir o ur del trainset), con el
+        # que Surprise desempata los vecinos de igual similitud
+        if ub:
+            self.y_indptr, self.y_cols, self.y_ratings = _lists_csr(trainset.ir, self.n_y)
+        else:
+            self.y_indptr, self.y_cols, self.y_ratings = indptr, items, ratings
+        self._tie_ranks = None
+
+        x = x.astype(np.int64)
+        y = y.astype(np.int64)
+        ratings = ratings.astype(np.float64)
+        self.x_counts = np.diff(self.x_indptr)
+        self.means = np.bincount(x, weights=ratings, minlength=self.n_x) / self.x_counts
+
+        self._prepare(x, y, ratings)
+        self._compute_neighbors(x, y, ratings)
+        return self
+
+    def _prepare(self, x, y, ratings):
+        """Estadísticos propios de cada variante, antes de calcular vecinos"""
+
+    def switch(self, u_stuff, i_stuff):
+        """Devuelve (x, y) según user_based"""
+        if self.sim_options['user_based']:
+            return u_stuff, i_stuff
+        return i_stuff, u_stuff
+
+    def _compute_neighbors(self, x, y, ratings):
+        """Calcula los vecinos de cada x con la similitud de sim_options"""
+        name = self.sim_options.get('name', 'msd').lower()
+        values = ratings.astype(np.float64)
+        if name == 'pearson_baseline':
+            bu, bi = self.compute_baselines()
+            bx, by = self.switch(bu, bi)
+            values = values - (self.trainset.global_mean + bx[x] + by[y])
+
+        matrix = sparse.csr_matrix((values, (x, y)), shape=(self.n_x, self.n_y))
+        matrix.sort_indices()
+        self.neighbors, self.neighbor_sims = top_k_similarities(
+            matrix, name,
+            min_support=self.sim_options.get('min_support', 1),
+            n_neighbors=max(self.k, config.KNN_MAX_NEIGHBORS),
+            shrinkage=self.sim_options.get('shrinkage', 100),
+            verbose=self.verbose
+        )
+
+    def _neighborhood(self, x, y):
+        """
+        Los k vecinos más similares de cada x entre los que valoraron y
+
+        Los pares se agrupan por y: para cada y se marcan en un vector denso
+        los x que lo valoraron, y comprobar cada vecino es un acceso directo
+
+        Returns:
+            tuple: (filas, vecinos, pesos, ratings), arrays planos con una
+            entrada por vecino seleccionado; filas es la posición del par
+        """
+        n_neighbors = self.neighbors.shape[1]
+        max_pairs = max(1, MAX_NEIGHBORHOOD_CELLS // n_neighbors)
+        rated = np.zeros(self.n_x, dtype=bool)
+        rating_of = np.zeros(self.n_x)
+        tie_rank = np.zeros(self.n_x, dtype=np.int64)
+
+        order = np.argsort(y, kind='stable')
+        sorted_y = y[order]
+        group_starts = np.flatnonzero(np.r_[True, sorted_y[1:] != sorted_y[:-1]])
+        group_stops = np.r_[group_starts[1:], len(order)]
+
+        parts = []
+        for group_start, group_stop in zip(group_starts, group_stops):
+            y_value = sorted_y[group_start]
+            raters = self.y_cols[self.y_indptr[y_value]:self.y_indptr[y_value + 1]]
+            rated[raters] = True
+            rating_of[raters] = self.y_ratings[self.y_indptr[y_value]:self.y_indptr[y_value + 1]]
+            tie_rank[raters] = np.arange(len(raters))
+
+            for chunk_start in range(group_start, group_stop, max_pairs):
+                pairs = order[chunk_start:min(chunk_start + max_pairs, group_stop)]
+                neighbors = self.neighbors[x[pairs]]
+                rows, cols = np.nonzero((neighbors >= 0) & rated[neighbors])
+                chosen = neighbors[rows, cols]
+                weights = self.neighbor_sims[x[pairs[rows]], cols]
+                # Los vecinos están ordenados por similitud: basta con desempatar en el k-ésimo
+                keep = self._first_k(rows, weights, tie_rank[chosen], len(pairs))
+                parts.append((pairs[rows[keep]], chosen[keep], weights[keep], rating_of[chosen[keep]]))
+
+            rated[raters] = False
+
+        if not parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+        rows, neighbors, weights, ratings = (np.concatenate(arrays) for arrays in zip(*parts))
+        return rows, neighbors.astype(np.int64), weights.astype(np.float64), ratings
+
+    def _first_k(self, targets, sims, tie_ranks, n_targets):
+        """
+        Máscara de las entradas con las k mayores similitudes de cada
+        objetivo, dadas ordenadas por objetivo y de mayor a menor similitud.
+        Como heapq.nlargest en Surprise, los empates con el k-ésimo vecino se
+        resuelven a favor del que aparece antes en yr (tie_ranks es su posición)
+        """
+        counts = np.bincount(targets, minlength=n_targets)
+        first = np.cumsum(counts) - counts
+        selected = np.arange(len(targets)) - first[targets] < self.k
+
+        # Objetivos con vecinos fuera de los k primeros empatados con el k-ésimo
+        over = np.flatnonzero(counts > self.k)
+        if not len(over):
+            return selected
+        boundary = np.full(n_targets, np.nan, dtype=sims.dtype)
+        boundary[over] = sims[first[over] + self.k - 1]
+        tied = sims == boundary[targets]
+        crossing = np.zeros(n_targets, dtype=bool)
+        crossing[targets[tied & ~selected]] = True
+        tied &= crossing[targets]
+        if not tied.any():
+            return selected
+
+        # Los empatados de cada objetivo ocupan los huecos que quedan, por orden en yr
+        free = self.k - np.bincount(targets[selected & ~tied], minlength=n_targets)
+        tied = np.flatnonzero(tied)
+        tied = tied[np.lexsort((tie_ranks[tied], targets[tied]))]
+        tied_counts = np.bincount(targets[tied], minlength=n_targets)
+        tied_first = np.cumsum(tied_counts) - tied_counts
+        selected[tied] = np.arange(len(tied)) - tied_first[targets[tied]] < free[targets[tied]]
+        return selected
+
+    def _select_first_k(self, targets, ranks, sims, tie_ranks, n_targets):
+        """
+        Índices de las entradas con las k mayores similitudes de cada objetivo
+        (el rango es la posición del vecino en la lista de similitudes)
+        """
+        order = np.argsort(targets * self.neighbors.shape[1] + ranks, kind='stable')
+        return order[self._first_k(targets[order], sims[order], tie_ranks[order], n_targets)]
+
+    def _user_entries(self, u):
+        """
+        Vecinos de todos los pares (u, i) de un usuario, sin buscar par a par:
+        con user_based se recorren los ratings de los vecinos de u y, si no,
+        el índice inverso de vecinos de las películas que valoró u
+
+        Returns:
+            tuple: (ítems, vecinos, pesos, ratings), arrays planos
+        """
+        n_items = self.trainset.n_items
+        if self.sim_options['user_based']:
+            valid = np.flatnonzero(self.neighbors[u] >= 0)
+            neighbors = self.neighbors[u, valid].astype(np.int64)
+            lengths = self.x_counts[neighbors]
+            positions = _row_positions(self.x_indptr, neighbors, lengths)
+            targets = self.x_cols[positions].astype(np.int64)
+            ranks = np.repeat(valid, lengths)
+            tie_ranks = self._x_tie_ranks()[positions]
+            entry_neighbors = np.repeat(neighbors, lengths)
+            weights = np.repeat(self.neighbor_sims[u, valid].astype(np.float64), lengths)
+            ratings = self.x_ratings[positions].astype(np.float64)
+        else:
+            indptr, reverse_targets, reverse_ranks = self._reverse_neighbors()
+            items = self.y_cols[self.y_indptr[u]:self.y_indptr[u + 1]].astype(np.int64)
+            user_ratings = self.y_ratings[self.y_indptr[u]:self.y_indptr[u + 1]].astype(np.float64)
+            lengths = indptr[items + 1] - indptr[items]
+            positions = _row_positions(indptr, items, lengths)
+            targets = reverse_targets[positions].astype(np.int64)
+            ranks = reverse_ranks[positions].astype(np.int64)
+            tie_ranks = np.repeat(np.arange(len(items)), lengths)
+            entry_neighbors = np.repeat(items, lengths)
+            weights = self.neighbor_sims[targets, ranks].astype(np.float64)
+            ratings = np.repeat(user_ratings, lengths)
+
+        keep = self._select_first_k(targets, ranks, weights, tie_ranks, n_items)
+        return targets[keep], entry_neighbors[keep], weights[keep], ratings[keep]
+
+    def _x_tie_ranks(self):
+        """
+        Para cada rating de la CSR por x, la posición de x en la fila de y
+        (su orden en yr, con el que se desempatan los vecinos; se construye
+        una vez)
+        """
+        if getattr(self, '_tie_ranks', None) is None:
+            x_rows = np.repeat(np.arange(self.n_x, dtype=np.int64), np.diff(self.x_indptr))
+            y_rows = np.repeat(np.arange(self.n_y, dtype=np.int64), np.diff(self.y_indptr))
+            x_keys = x_rows * self.n_y + self.x_cols
+            y_keys = self.y_cols.astype(np.int64) * self.n_y + y_rows
+            y_order = np.argsort(y_keys)
+            tie_ranks = np.empty(len(x_keys), dtype=np.int64)
+            tie_ranks[np.argsort(x_keys)] = (np.arange(len(y_keys)) - self.y_indptr[y_rows])[y_order]
+            self._tie_ranks = tie_ranks
+        return self._tie_ranks
+
+    def _reverse_neighbors(self):
+        """
+        Índice inverso de las listas de vecinos en formato CSR: para cada x,
+        los x' que lo tienen como vecino y en qué posición (se construye una vez)
+        """
+        if getattr(self, '_reverse', None) is None:
+            n_neighbors = self.neighbors.shape[1]
+            flat = self.neighbors.ravel()
+            valid = np.flatnonzero(flat >= 0)
+            order = valid[np.argsort(flat[valid], kind='stable')]
+            counts = np.bincount(flat[valid], minlength=self.n_x)
+            indptr = np.concatenate([[0], np.cumsum(counts)])
+            self._reverse = (indptr, (order // n_neighbors).astype(np.int32),
+                             (order % n_neighbors).astype(np.int32))
+        return self._reverse
+
+    def _aggregate(self, x, y, rows, neighbors, weights, ratings):
+        """
+        Estimación de cada par a partir de sus vecinos seleccionados
+        (NaN = imposible)
+        """
+        raise NotImplementedError
+
+    def _unknown_estimate(self, inner_users, inner_items):
+        """Estimación de los pares con usuario o ítem desconocido (NaN = imposible)"""
+        return np.full(len(inner_users), np.nan)
+
+    def estimate_pairs(self, inner_users, inner_items):
+        """
+        Estimaciones vectorizadas para pares (usuario, ítem) con ids internos
+        (-1 = desconocido). Las predicciones imposibles se devuelven como NaN
+
+        Args:
+            inner_users: Array de ids internos de usuario
+            inner_items: Array de ids internos de ítem
+
+        Returns:
+            np.ndarray: Estimaciones float64 sin recortar
+        """
+        inner_users = np.asarray(inner_users, dtype=np.int64)
+        inner_items = np.asarray(inner_items, dtype=np.int64)
+
+        estimates = self._unknown_estimate(inner_users, inner_items)
+        known = np.flatnonzero((inner_users >= 0) & (inner_items >= 0))
+        x, y = self.switch(inner_users[known], inner_items[known])
+        estimates[known] = self._aggregate(x, y, *self._neighborhood(x, y))
+        return estimates
+
+    def estimate_users(self, inner_users):
+        """
+        Estimaciones de todos los ítems para cada usuario (ids internos
+        conocidos). Las predicciones imposibles se devuelven como NaN
+
+        Returns:
+            np.ndarray: Matriz float64 (len(inner_users), n_items) sin recortar
+        """
+        n_items = self.trainset.n_items
+        all_items = np.arange(n_items)
+        estimates = np.empty((len(inner_users), n_items))
+        for row, u in enumerate(inner_users):
+            x, y = self.switch(np.full(n_items, u), all_items)
+            estimates[row] = self._aggregate(x, y, *self._user_entries(u))
+        return estimates
+
+    def estimate(self, u, i):
+        if not (self.trainset.knows_user(u) and self.trainset.knows_item(i)):
+            est = self._unknown_estimate(
+                np.array([u if self.trainset.knows_user(u) else -1]),
+                np.array([i if self.trainset.knows_item(i) else -1])
+            )[0]
+            if np.isnan(est):
+                raise PredictionImpossible('User and/or item is unknown.')
+            return est
+
+        x, y = self.switch(np.array([u]), np.array([i]))
+        neighborhood = self._neighborhood(x, y)
+        est = self._aggregate(x, y, *neighborhood)[0]
+        if np.isnan(est):
+            raise PredictionImpossible('Not enough neighbors.')
+        return est, {'actual_k': len(neighborhood[0])}
+
+
+class KNNBasic(SparseSymmetricAlgo):
+    """
+    r_ui = sum(sim(u, v) * r_vi) / sum(sim(u, v)) sobre los k vecinos de u
+    que valoraron i
+    """
+
+    def _aggregate(self, x, y, rows, neighbors, weights, ratings):
+        n_pairs = len(x)
+        actual_k = np.bincount(rows, minlength=n_pairs)
+        sum_sim = np.bincount(rows, weights=weights, minlength=n_pairs)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            est = np.bincount(rows, weights=weights * ratings, minlength=n_pairs) / sum_sim
+        est[(actual_k < self.min_k) | (sum_sim == 0)] = np.nan
+        return est
+
+
+class KNNWithMeans(SparseSymmetricAlgo):
+    """
+    r_ui = mu_u + sum(sim(u, v) * (r_vi - mu_v)) / sum(sim(u, v))
+    """
+
+    def _deviations(self, neighbors, ratings):
+        return ratings - self.means[neighbors]
+
+    def _aggregate(self, x, y, rows, neighbors, weights, ratings):
+        n_pairs = len(x)
+        actual_k = np.bincount(rows, minlength=n_pairs)
+        sum_sim = np.bincount(rows, weights=weights, minlength=n_pairs)
+        sum_dev = np.bincount(rows, weights=weights * self._deviations(neighbors, ratings), minlength=n_pairs)
+        enough = (actual_k >= self.min_k) & (sum_sim > 0)
+        return self.means[x] + np.where(enough, sum_dev / np.where(enough, sum_sim, 1.0), 0.0) * self._scale(x)
+
+    def _scale(self, x):
+        return 1.0
+
+
+class KNNWithZScore(KNNWithMeans):
+    """
+    r_ui = mu_u + sigma_u * sum(sim(u, v) * (r_vi - mu_v) / sigma_v) / sum(sim(u, v))
+    """
+
+    def _prepare(self, x, y, ratings):
+        # Cuando una desviación es 0 se usa la desviación global
+        self.overall_sigma = np.std(ratings)
+        variances = np.bincount(x, weights=(ratings - self.means[x]) ** 2, minlength=self.n_x) / self.x_counts
+        sigmas = np.sqrt(variances)
+        self.sigmas = np.where(sigmas == 0.0, self.overall_sigma, sigmas)
+
+    def _deviations(self, neighbors, ratings):
+        return (ratings - self.means[neighbors]) / self.sigmas[neighbors]
+
+    def _scale(self, x):
+        return self.sigmas[x]
+
+
+class KNNBaseline(SparseSymmetricAlgo):
+    """
+    r_ui = b_ui + sum(sim(u, v) * (r_vi - b_vi)) / sum(sim(u, v))
+    """
+
+    def __init__(self, k=40, min_k=1, sim_options={}, bsl_options={}, verbose=True, **kwargs):
+        SparseSymmetricAlgo.__init__(self, k=k, min_k=min_k, sim_options=sim_options,
+                                     bsl_options=bsl_options, verbose=verbose, **kwargs)
+
+    def _prepare(self, x, y, ratings):
+        self.bu, self.bi = self.compute_baselines()
+        self.bx, self.by = self.switch(self.bu, self.bi)
+
+    def _unknown_estimate(self, inner_users, inner_items):
+        mu = self.trainset.global_mean
+        return (mu + np.where(inner_users >= 0, self.bu[np.maximum(inner_users, 0)], 0.0)
+                + np.where(inner_items >= 0, self.bi[np.maximum(inner_items, 0)], 0.0))
+
+    def _aggregate(self, x, y, rows, neighbors, weights, ratings):
+        mu = self.trainset.global_mean
+        n_pairs = len(x)
+        actual_k = np.bincount(rows, minlength=n_pairs)
+        sum_sim = np.bincount(rows, weights=weights, minlength=n_pairs)
+        neighbor_baselines = mu + self.bx[neighbors] + self.by[y][rows]
+        sum_dev = np.bincount(rows, weights=weights * (ratings - neighbor_baselines), minlength=n_pairs)
+        enough = (actual_k >= self.min_k) & (sum_sim > 0)
+        baseline = mu + self.bx[x] + self.by[y]
+        return baseline + np.where(enough, sum_dev / np.where(enough, sum_sim, 1.0), 0.0)
@@ -0,0 +1,268 @@
+"""
+Persistencia de modelos entrenados
+Guarda cada algoritmo entrenado en un directorio con un fichero model.json
+(formato versionado) y sus arrays grandes (factores, sesgos, matrices de
+similitud, trainset) como ficheros .npy que se pueden abrir con mmap, de modo
+que un modelo se restaura sin volver a entrenarlo
+"""
+
+import os
+import json
+import time
+import numpy as np
+import surprise
+from collections import defaultdict
+from surprise import Trainset
+import config
+from scoring import trainset_csr
+
+
+# Versión del formato en disco. Los modelos guardados con otra versión no se cargan
+FORMAT_VERSION = 1
+
+META_FILE = 'model.json'
+
+# Arrays con los que se reconstruye el trainset (CSR por usuario)
+TRAINSET_ARRAYS = ('ur_indptr', 'ur_items', 'ur_ratings', 'raw_user_ids', 'raw_item_ids')
+
+
+def models_dir(dataset_name):
+    """Directorio donde se guardan los modelos de un dataset"""
+    return os.path.join(config.OUTPUT_DIR, config.MODELS_SUBDIR, dataset_name)
+
+
+def _trainset_arrays(trainset, id_mapping=None):
+    """
+    Convierte un trainset en arrays CSR por usuario más los ids originales
+
+    Args:
+        trainset: Trainset de Surprise
+        id_mapping: IdMapping con el que se codificaron los ids del
+            trainset (None si ya son los originales)
+
+    Returns:
+        dict: Arrays de TRAINSET_ARRAYS
+    """
+    indptr, items, ratings = trainset_csr(trainset)
+    raw_user_ids = np.array([trainset.to_raw_uid(u) for u in range(trainset.n_users)])
+    raw_item_ids = np.array([trainset.to_raw_iid(i) for i in range(trainset.n_items)])
+    if id_mapping is not None:
+        raw_user_ids = id_mapping.decode_users(raw_user_ids)
+        raw_item_ids = id_mapping.decode_items(raw_item_ids)
+    return {
+        'ur_indptr': indptr,
+        'ur_items': items,
+        'ur_ratings': ratings,
+        'raw_user_ids': raw_user_ids,
+        'raw_item_ids': raw_item_ids,
+    }
+
+
+def build_trainset(arrays, rating_scale):
+    """Reconstruye un Trainset de Surprise a partir de los arrays CSR"""
+    indptr = arrays['ur_indptr']
+    items = np.asarray(arrays['ur_items'])
+    ratings = np.asarray(arrays['ur_ratings']).astype(np.float64)
+    users = np.repeat(np.arange(len(indptr) - 1, dtype=np.int32), np.diff(indptr))
+
+    ur = defaultdict(list)
+    for u in range(len(indptr) - 1):
+        ur[u] = list(zip(items[indptr[u]:indptr[u + 1]].tolist(),
+                         ratings[indptr[u]:indptr[u + 1]].tolist()))
+
+    # Índice por ítem: ordenar los ratings por ítem conservando el orden de usuario
+    order = np.argsort(items, kind='stable')
+    item_counts = np.bincount(items, minlength=len(arrays['raw_item_ids']))
+    item_indptr = np.concatenate([[0], np.cumsum(item_counts)])
+    ir_users, ir_ratings = users[order], ratings[order]
+    ir = defaultdict(list)
+    for i in range(len(item_counts)):
+        ir[i] = list(zip(ir_users[item_indptr[i]:item_indptr[i + 1]].tolist(),
+                         ir_ratings[item_indptr[i]:item_indptr[i + 1]].tolist()))
+
+    raw_user_ids = np.asarray(arrays['raw_user_ids']).tolist()
+    raw_item_ids = np.asarray(arrays['raw_item_ids']).tolist()
+
+    return Trainset(
+        ur, ir,
+        n_users=len(raw_user_ids),
+        n_items=len(raw_item_ids),
+        n_ratings=len(items),
+        rating_scale=tuple(rating_scale),
+        raw2inner_id_users={raw: inner for inner, raw in enumerate(raw_user_ids)},
+        raw2inner_id_items={raw: inner for inner, raw in enumerate(raw_item_ids)},
+    )
+
+
+def _is_json_value(value):
+    """Indica si un atributo se puede guardar tal cual en model.json"""
+    try:
+        json.dumps(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def save_model(algo, algo_name, model_dir, params, id_mapping=None):
+    """
+    Guarda un modelo entrenado
+
+    Los atributos que son arrays de NumPy se guardan como .npy; los que
+    apuntan al trainset (por ejemplo xr/yr de los KNN) o a otro array ya
+    guardado (bx/by de KNNBaseline) se guardan como referencias
+
+    Args:
+        algo: Modelo de Surprise entrenado
+        algo_name: Nombre del algoritmo en el registro
+        model_dir: Directorio de destino
+        params: Parámetros con los que se instanció el algoritmo
+        id_mapping: IdMapping del dataset si el modelo se entrenó con ids
+            codificados; el modelo se guarda con los ids originales
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    trainset = algo.trainset
+
+    arrays = _trainset_arrays(trainset, id_mapping)
+    attributes, array_attrs, references, skipped = {}, [], {}, []
+    saved_ids = {}
+
+    for name, value in vars(algo).items():
+        if name == 'trainset':
+            continue
+        if value is trainset.ur:
+            references[name] = 'trainset.ur'
+        elif value is trainset.ir:
+            references[name] = 'trainset.ir'
+        elif isinstance(value, np.ndarray) and value.ndim > 0:
+            if id(value) in saved_ids:
+                references[name] = saved_ids[id(value)]
+            else:
+                arrays[name] = value
+                array_attrs.append(name)
+                saved_ids[id(value)] = name
+        elif isinstance(value, list) and value and isinstance(value[0], (int, float)):
+            arrays[name] = np.asarray(value)
+            array_attrs.append(name)
+            references[name] = 'list'
+        elif isinstance(value, np.generic):
+            attributes[name] = value.item()
+        elif _is_json_value(value):
+            attributes[name] = value
+        else:
+            skipped.append(name)
+
+    for name, array in arrays.items():
+        np.save(os.path.join(model_dir, f'{name}.npy'), np.ascontiguousarray(array))
+
+    meta = {
+        'format_version': FORMAT_VERSION,
+        'surprise_version': surprise.__version__,
+        'algorithm': algo_name,
+        'class': type(algo).__name__,
+        'module': type(algo).__module__,
+        'params': params,
+        'rating_scale': list(trainset.rating_scale),
+        'global_mean': trainset.global_mean,
+        'n_users': trainset.n_users,
+        'n_items': trainset.n_items,
+        'n_ratings': trainset.n_ratings,
+        'attributes': attributes,
+        'array_attributes': array_attrs,
+        'references': references,
+        'skipped': skipped,
+        'saved_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    with open(os.path.join(model_dir, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2, default=str)
+
+
+def load_arrays(model_dir, mmap=True):
+    """
+    Lee los metadatos y abre los arrays de un modelo guardado, sin
+    reconstruir el trainset (arranque en milisegundos)
+
+    Args:
+        model_dir: Directorio del modelo
+        mmap: Si True, los arrays se abren con mmap en solo lectura
+
+    Returns:
+        tuple: (dict de metadatos, dict nombre -> array)
+    """
+    with open(os.path.join(model_dir, META_FILE), encoding='utf-8') as f:
+        meta = json.load(f)
+
+    if meta['format_version'] != FORMAT_VERSION:
+        raise ValueError(
+            f"Formato de modelo {meta['format_version']} no soportado "
+            f"(se esperaba {FORMAT_VERSION}): {model_dir}"
+        )
+
+    mmap_mode = 'r' if mmap else None
+    names = list(TRAINSET_ARRAYS) + meta['array_attributes']
+    arrays = {
+        name: np.load(os.path.join(model_dir, f'{name}.npy'), mmap_mode=mmap_mode)
+        for name in names
+    }
+    return meta, arrays
+
+
+def load_model(model_dir, algorithms, mmap=True):
+    """
+    Restaura un modelo guardado listo para predict()/test()
+
+    Args:
+        model_dir: Directorio del modelo
+        algorithms: Registro nombre -> clase (MovieLensRecommender.algorithms)
+        mmap: Si True, los arrays del modelo se abren con mmap
+
+    Returns:
+        AlgoBase: Modelo restaurado sin reentrenar
+    """
+    meta, arrays = load_arrays(model_dir, mmap=mmap)
+
+    algo_class = algorithms[meta['algorithm']]
+    # Un KNN guardado con el motor disperso no se puede restaurar en la clase de Surprise (ni al revés)
+    if meta.get('module', algo_class.__module__) != algo_class.__module__:
+        raise ValueError(
+            f"El modelo se guardó con {meta['module']}.{meta['class']} pero el registro usa "
+            f"{algo_class.__module__}.{algo_class.__name__} (revise USE_SPARSE_KNN, USE_FAST_SVDPP, USE_SPARSE_SLOPE_ONE y USE_EPOCH_MODELS): {model_dir}"
+        )
+    algo = algo_class(**meta['params'])
+    trainset = build_trainset(arrays, meta['rating_scale'])
+    algo.trainset = trainset
+
+    for name, value in meta['attributes'].items():
+        setattr(algo, name, value)
+    for name in meta['array_attributes']:
+        setattr(algo, name, arrays[name])
+    for name, target in meta['references'].items():
+        if target == 'trainset.ur':
+            setattr(algo, name, trainset.ur)
+        elif target == 'trainset.ir':
+            setattr(algo, name, trainset.ir)
+        elif target == 'list':
+            setattr(algo, name, arrays[name].tolist())
+        else:
+            setattr(algo, name, getattr(algo, target))
+
+    return algo
+
+
+def main():
+    """
+    Entrena con todos los datos los algoritmos seleccionados en config.py y
+    los guarda en OUTPUT_DIR/MODELS_SUBDIR/{DATASET}/
+    """
+    from recommender import MovieLensRecommender
+
+    print("\n" + "="*60)
+    print(" ENTRENAR Y GUARDAR MODELOS")
+    print("="*60)
+
+    recommender = MovieLensRecommender()
+    recommender.load_data()
+    recommender.train_and_save_models()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Métricas de ranking top-K
+Calcula Precision@K, Recall@K, NDCG@K y MAP@K sobre el testset de un fold:
+para cada usuario se puntúan por bloques todos los ítems que no valoró en
+entrenamiento y se comparan los K mejores con sus ítems relevantes de test
+"""
+
+import numpy as np
+import id_mapping
+from scoring import BatchScorer
+
+
+# Métricas de ranking que se pueden pedir en config.METRICS
+RANKING_METRICS = ('Precision@K', 'Recall@K', 'NDCG@K', 'MAP@K')
+
+
+def metric_label(metric, k):
+    """Nombre de la métrica con el valor de K: 'NDCG@K' -> 'NDCG@10'"""
+    return metric.replace('@K', f'@{k}')
+
+
+def relevant_items(trainset, testset, threshold):
+    """
+    Ítems relevantes de test (rating >= threshold) de cada usuario conocido
+    por el trainset, en formato CSR
+
+    Los ítems relevantes que el trainset no conoce no se pueden recomendar,
+    pero cuentan en el número de relevantes del usuario (penalizan el recall)
+
+    Returns:
+        tuple: (usuarios internos ordenados, punteros CSR, ítems internos
+        conocidos (-1 si el ítem es desconocido))
+    """
+    if getattr(trainset, 'user_inner_of_code', None) is not None:
+        # Ids codificados: traducción con las tablas código -> id interno del trainset
+        columns = np.array(testset, dtype=np.float64).reshape(-1, 3)
+        inner_users = id_mapping.translate(trainset.user_inner_of_code, columns[:, 0])
+        keep = (columns[:, 2] >= threshold) & (inner_users >= 0)
+        inner_items = id_mapping.translate(trainset.item_inner_of_code, columns[keep, 1])
+        pairs = np.column_stack([inner_users[keep], inner_items])
+        return _relevant_csr(pairs)
+
+    user_index = trainset._raw2inner_id_users
+    item_index = trainset._raw2inner_id_items
+
+    pairs = [
+        (user_index[ruid], item_index.get(riid, -1))
+        for ruid, riid, rating in testset
+        if rating >= threshold and ruid in user_index
+    ]
+    return _relevant_csr(np.array(pairs, dtype=np.int64).reshape(-1, 2))
+
+
+def _relevant_csr(pairs):
+    """Pares (usuario interno, ítem interno) agrupados por usuario en formato CSR"""
+    if not len(pairs):
+        return np.empty(0, dtype=np.int64), np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    pairs = pairs[np.argsort(pairs[:, 0], kind='stable')]
+    users, counts = np.unique(pairs[:, 0], return_counts=True)
+    indptr = np.concatenate([[0], np.cumsum(counts)])
+    return users, indptr, pairs[:, 1]
+
+
+def evaluate_ranking(algo, testset, k, threshold, batch_size, seed=None, scorer=None):
+    """
+    Métricas de ranking de un modelo entrenado sobre un testset
+
+    Args:
+        algo: Modelo de Surprise entrenado (con algo.trainset)
+        testset: Lista de tuplas (usuario, ítem, rating) con ids originales
+        k: Longitud de la lista de recomendaciones
+        threshold: Rating mínimo para considerar relevante un ítem de test
+        batch_size: Usuarios puntuados a la vez (acota la memoria a
+            batch_size x n_items valores)
+        seed: Semilla de las puntuaciones aleatorias de NormalPredictor
+        scorer: BatchScorer ya construido para algo (None = se construye)
+
+    Returns:
+        dict: Valor medio por usuario de cada métrica de RANKING_METRICS
+        (claves sin sustituir K) y número de usuarios evaluados
+    """
+    if scorer is None:
+        scorer = BatchScorer(algo, seed=seed)
+    users, indptr, items = relevant_items(algo.trainset, testset, threshold)
+    k = min(k, scorer.n_items)
+
+    # Descuento de cada posición para DCG y DCG ideal según el número de relevantes
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    ideal_dcg = np.cumsum(discounts)
+
+    totals = dict.fromkeys(RANKING_METRICS, 0.0)
+    for start in range(0, len(users), batch_size):
+        batch = users[start:start + batch_size]
+        rows = np.arange(len(batch))
+
+        scores = scorer.score_users(batch)
+        scores[scorer.rated_mask(batch)] = -np.inf
+
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+
+        # Matriz de relevancia del bloque con los ítems de test conocidos
+        batch_ptr = indptr[start:start + len(batch) + 1]
+        n_relevant = np.diff(batch_ptr)
+        batch_items = items[batch_ptr[0]:batch_ptr[-1]]
+        batch_rows = np.repeat(rows, n_relevant)
+        known = batch_items >= 0
+        relevance = np.zeros(scores.shape, dtype=bool)
+        relevance[batch_rows[known], batch_items[known]] = True
+
+        hits = relevance[rows[:, None], top]
+        n_hits = hits.sum(axis=1)
+        precision_at = np.cumsum(hits, axis=1) / np.arange(1, k + 1)
+        n_ideal = np.minimum(n_relevant, k)
+
+        totals['Precision@K'] += (n_hits / k).sum()
+        totals['Recall@K'] += (n_hits / n_relevant).sum()
+        totals['NDCG@K'] += ((hits @ discounts) / ideal_dcg[n_ideal - 1]).sum()
+        totals['MAP@K'] += ((precision_at * hits).sum(axis=1) / n_ideal).sum()
+
+    n_users = max(len(users), 1)
+    result = {metric: total / n_users for metric, total in totals.items()}
+    result['n_users'] = len(users)
+    return result
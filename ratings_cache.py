@@ -0,0 +1,488 @@
+"""
+Caché binaria columnar para los ratings de MovieLens
+Guarda los ratings ya parseados como arrays tipados (.npy) que se cargan
+con mmap, de forma que las siguientes ejecuciones no vuelven a parsear el
+fichero de texto original. Los ficheros de ratings se pueden leer también
+directamente del zip descargado, descomprimiéndolos mientras se parsean.
+La caché guarda también los ids codificados y su tabla (ver id_mapping.py)
+"""
+
+import io
+import os
+import json
+import queue
+import zipfile
+import itertools
+import threading
+import contextlib
+import numpy as np
+import pandas as pd
+from surprise import Dataset, Reader
+from surprise.dataset import DatasetAutoFolds
+import config
+from id_mapping import IdMapping
+
+
+# Versión del formato de la caché. Cambiarla invalida las cachés existentes
+CACHE_VERSION = 2
+
+# Columnas de la caché y su tipo en disco
+COLUMNS = {
+    'user': np.int32,
+    'item': np.int32,
+    'rating': np.float32,
+    'timestamp': np.int64,
+}
+
+# Columnas con los ids codificados (códigos densos de id_mapping.IdMapping)
+ENCODED_COLUMNS = {
+    'user_code': np.int32,
+    'item_code': np.int32,
+}
+
+# Separador entre el zip y el fichero que contiene en las rutas de origen
+# ('ml-32m.zip::ml-32m/ratings.csv')
+ZIP_SEPARATOR = '::'
+
+# Bloques descomprimidos por adelantado al leer del zip (de 4 MB cada uno)
+READ_AHEAD_BLOCK = 4 * 1024 * 1024
+READ_AHEAD_BLOCKS = 4
+
+META_FILE = 'meta.json'
+
+
+class ArrayDataset(DatasetAutoFolds):
+    """
+    Dataset de Surprise construido directamente a partir de arrays columnares,
+    sin pasar por Reader.parse_line ni por DataFrame.itertuples. Los ratings
+    se pueden añadir por bloques con extend()
+
+    Los ratings se guardan como columnas. raw_ratings (una tupla de Python
+    por rating, unos 7 GB en ml-32m) solo se construye la primera vez que lo
+    pide un camino de Surprise; el resto del proyecto usa n_ratings y las
+    columnas. Las fechas se guardan en un array int64 aparte, alineado con
+    las columnas
+
+    Si los ids son códigos densos (id_mapping no es None), el dataset
+    construye los trainsets a partir de las columnas con operaciones de arrays
+    """
+
+    def __init__(self, reader):
+        Dataset.__init__(self, reader)
+        self.has_been_split = False
+        self._column_blocks = {'user': [], 'item': [], 'rating': []}
+        self._timestamp_blocks = []
+        self._raw_ratings = None
+        self.id_mapping = None
+
+    def extend(self, users, items, ratings, timestamps=None):
+        """Añade un bloque de ratings (arrays de igual longitud) al dataset"""
+        for name, values in (('user', users), ('item', items), ('rating', ratings)):
+            self._column_blocks[name].append(np.asarray(values))
+        if timestamps is not None:
+            self._timestamp_blocks.append(np.asarray(timestamps, dtype=np.int64))
+        self._raw_ratings = None
+
+    @property
+    def columns(self):
+        """dict con los arrays 'user', 'item' y 'rating' de todos los ratings"""
+        for name, blocks in self._column_blocks.items():
+            if len(blocks) != 1:
+                self._column_blocks[name] = [np.concatenate(blocks) if blocks else np.empty(0)]
+        return {name: blocks[0] for name, blocks in self._column_blocks.items()}
+
+    @property
+    def n_ratings(self):
+        """Número de ratings del dataset, sin construir raw_ratings"""
+        return sum(len(block) for block in self._column_blocks['rating'])
+
+    @property
+    def raw_ratings(self):
+        """Lista de tuplas (usuario, película, rating, None) de Surprise, construida al pedirla"""
+        if self._raw_ratings is None:
+            self._raw_ratings = self.ratings_at(slice(None))
+        return self._raw_ratings
+
+    def ratings_at(self, indices):
+        """Tuplas (usuario, película, rating, None) de los ratings de las posiciones indicadas"""
+        columns = self.columns
+        users = columns['user'][indices]
+        return list(zip(
+            users.tolist(),
+            columns['item'][indices].tolist(),
+            columns['rating'][indices].tolist(),
+            itertools.repeat(None, len(users))
+        ))
+
+    @property
+    def timestamps(self):
+        """Array int64 con la fecha de cada rating, o None si no se añadieron fechas"""
+        if not self._timestamp_blocks:
+            return None
+        if len(self._timestamp_blocks) > 1:
+            self._timestamp_blocks = [np.concatenate(self._timestamp_blocks)]
+        return self._timestamp_blocks[0]
+
+    def trainset_from_indices(self, indices):
+        """Trainset con los ratings de las posiciones indicadas (requiere id_mapping)"""
+        return self.id_mapping.build_trainset(
+            self.columns['user'][indices],
+            self.columns['item'][indices],
+            self.columns['rating'][indices],
+            self.reader.rating_scale
+        )
+
+    def testset_from_indices(self, indices):
+        """Testset (usuario, película, rating) con los ratings de las posiciones indicadas"""
+        return list(zip(
+            self.columns['user'][indices].tolist(),
+            self.columns['item'][indices].tolist(),
+            self.columns['rating'][indices].tolist()
+        ))
+
+    def build_full_trainset(self):
+        if self.id_mapping is None:
+            return DatasetAutoFolds.build_full_trainset(self)
+        return self.id_mapping.build_trainset(
+            self.columns['user'], self.columns['item'], self.columns['rating'], self.reader.rating_scale
+        )
+
+
+def split_source(source_path):
+    """
+    Separa una ruta de origen en (zip, fichero dentro del zip), o
+    (ruta, None) si es un fichero normal
+    """
+    if ZIP_SEPARATOR in source_path:
+        archive, member = source_path.split(ZIP_SEPARATOR, 1)
+        return archive, member
+    return source_path, None
+
+
+def find_source(file_path, zip_path=None):
+    """
+    Ruta de origen de un fichero de ratings: el fichero extraído si existe
+    o, si no, el mismo fichero dentro del zip descargado (los zips de
+    MovieLens guardan 'ml-32m/ratings.csv' con esa misma ruta)
+
+    Raises:
+        FileNotFoundError: Si no está ni extraído ni dentro del zip
+    """
+    if os.path.exists(file_path):
+        return file_path
+    if zip_path is not None and os.path.exists(zip_path):
+        member = file_path.replace(os.sep, '/')
+        with zipfile.ZipFile(zip_path) as archive:
+            if member in archive.namelist():
+                return f'{zip_path}{ZIP_SEPARATOR}{member}'
+        raise FileNotFoundError(f"No se encuentra {member} dentro de {zip_path}")
+    raise FileNotFoundError(f"No se encuentra el archivo: {file_path}")
+
+
+class _ReadAheadStream(io.RawIOBase):
+    """
+    Lee un flujo en un hilo aparte, con hasta READ_AHEAD_BLOCKS bloques por
+    adelantado. Con un zip, la descompresión (zlib libera el GIL) se solapa
+    con el parseo de pandas en lugar de sumarse a él
+    """
+
+    def __init__(self, stream):
+        super().__init__()
+        self._blocks = queue.Queue(maxsize=READ_AHEAD_BLOCKS)
+        self._stop = threading.Event()
+        self._buffer = memoryview(b'')
+        self._finished = False
+        self._thread = threading.Thread(target=self._fill, args=(stream,), daemon=True)
+        self._thread.start()
+
+    def _fill(self, stream):
+        try:
+            while not self._stop.is_set():
+                block = stream.read(READ_AHEAD_BLOCK)
+                self._put(block)
+                if not block:
+                    return
+        except Exception as e:
+            self._put(e)
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._blocks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if not self._buffer and not self._finished:
+            block = self._blocks.get()
+            if isinstance(block, Exception):
+                raise block
+            self._finished = not block
+            self._buffer = memoryview(block)
+        n = min(len(buffer), len(self._buffer))
+        buffer[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        super().close()
+
+
+@contextlib.contextmanager
+def open_source(source_path):
+    """
+    Abre un fichero de ratings en modo binario. Si está dentro de un zip, se
+    descomprime en un hilo aparte mientras se lee, sin escribirlo en disco
+    """
+    archive_path, member = split_source(source_path)
+    if member is None:
+        with open(archive_path, 'rb') as f:
+            yield f
+        return
+    with zipfile.ZipFile(archive_path) as archive, archive.open(member) as compressed:
+        with io.BufferedReader(_ReadAheadStream(compressed), READ_AHEAD_BLOCK) as f:
+            yield f
+
+
+def source_stat(source_path):
+    """os.stat del fichero de ratings, o del zip que lo contiene"""
+    return os.stat(split_source(source_path)[0])
+
+
+def source_size(source_path):
+    """Tamaño (descomprimido) del fichero de ratings en bytes"""
+    archive_path, member = split_source(source_path)
+    if member is None:
+        return os.path.getsize(archive_path)
+    with zipfile.ZipFile(archive_path) as archive:
+        return archive.getinfo(member).file_size
+
+
+def parse_100k(file_path):
+    """
+    Parsea el fichero u.data de ml-100k (user item rating timestamp, separado por tabs)
+
+    Returns:
+        dict: Arrays 'user', 'item', 'rating' y 'timestamp'
+    """
+    with open_source(file_path) as f:
+        df = pd.read_csv(
+            f,
+            sep='\t',
+            names=list(COLUMNS.keys()),
+            dtype=COLUMNS,
+            engine='c'
+        )
+    return {name: df[name].to_numpy() for name in COLUMNS}
+
+
+def iter_32m_chunks(file_path, chunksize, with_timestamp=True):
+    """
+    Lee ratings.csv de ml-32m por bloques acotados, con tipos estrechos y solo
+    las columnas necesarias
+
+    Args:
+        file_path: Ruta de ratings.csv (userId,movieId,rating,timestamp)
+        chunksize: Número de filas por bloque
+        with_timestamp: Si False, la columna timestamp no se llega a parsear
+
+    Yields:
+        dict: Arrays 'user', 'item', 'rating' (y 'timestamp') de cada bloque
+    """
+    dtypes = {'userId': np.int32, 'movieId': np.int32, 'rating': np.float32}
+    if with_timestamp:
+        dtypes['timestamp'] = np.int64
+
+    with open_source(file_path) as f, pd.read_csv(
+        f,
+        usecols=list(dtypes.keys()),
+        dtype=dtypes,
+        chunksize=chunksize,
+        engine='c'
+    ) as reader:
+        for chunk in reader:
+            block = {
+                'user': chunk['userId'].to_numpy(),
+                'item': chunk['movieId'].to_numpy(),
+                'rating': chunk['rating'].to_numpy(),
+            }
+            if with_timestamp:
+                block['timestamp'] = chunk['timestamp'].to_numpy()
+            yield block
+
+
+def _collect_chunks(chunks, expected_rows):
+    """
+    Copia los bloques en arrays preasignados, de modo que nunca existe una
+    copia intermedia completa de los datos
+
+    Args:
+        chunks: Iterador de dicts de arrays (ver iter_32m_chunks)
+        expected_rows: Estimación inicial del número de filas
+
+    Returns:
+        dict: Arrays con todos los ratings
+    """
+    capacity = max(int(expected_rows), 1)
+    arrays = None
+    n_rows = 0
+
+    for block in chunks:
+        if arrays is None:
+            arrays = {name: np.empty(capacity, dtype=COLUMNS[name]) for name in block}
+        n_block = len(block['user'])
+        if n_rows + n_block > capacity:
+            # La estimación se quedó corta: crecer un 25% (o lo necesario)
+            capacity = max(n_rows + n_block, int(capacity * 1.25))
+            for name in arrays:
+                arrays[name] = np.resize(arrays[name], capacity)
+        for name in arrays:
+            arrays[name][n_rows:n_rows + n_block] = block[name]
+        n_rows += n_block
+
+    if arrays is None:
+        return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+    return {name: array[:n_rows] for name, array in arrays.items()}
+
+
+def parse_32m(file_path, with_timestamp=True):
+    """
+    Parsea el fichero ratings.csv de ml-32m (userId,movieId,rating,timestamp)
+    por bloques de config.CSV_CHUNK_SIZE filas
+
+    Args:
+        file_path: Ruta de ratings.csv
+        with_timestamp: Si False, la columna timestamp no se llega a parsear
+
+    Returns:
+        dict: Arrays 'user', 'item', 'rating' y 'timestamp'
+    """
+    # Estimar el número de filas a partir del tamaño del fichero (~25 bytes por línea)
+    expected_rows = source_size(file_path) / 25
+    chunks = iter_32m_chunks(file_path, config.CSV_CHUNK_SIZE, with_timestamp=with_timestamp)
+    return _collect_chunks(chunks, expected_rows)
+
+
+def _cache_dir_for(source_path):
+    """Directorio de la caché asociado a un fichero de ratings"""
+    name = os.path.normpath(source_path).replace(os.sep, '_').replace('/', '_')
+    name = name.replace(ZIP_SEPARATOR, '_').strip('._')
+    return os.path.join(config.CACHE_DIR, name)
+
+
+def _fingerprint(source_path):
+    """Identifica la versión del fichero de origen por su tamaño y fecha de modificación"""
+    stat = source_stat(source_path)
+    archive_path, member = split_source(source_path)
+    source = os.path.abspath(archive_path)
+    if member is not None:
+        source += ZIP_SEPARATOR + member
+    return {
+        'version': CACHE_VERSION,
+        'source': source,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+    }
+
+
+def _read_meta(cache_dir):
+    """Lee los metadatos de una caché, o None si no existe o está corrupta"""
+    meta_path = os.path.join(cache_dir, META_FILE)
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(cache_dir, arrays, fingerprint):
+    """
+    Escribe los arrays, los ids codificados con su tabla y, en último lugar,
+    el fichero de metadatos. Si la escritura se interrumpe, la caché queda sin
+    metadatos y se regenera
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+
+    meta_path = os.path.join(cache_dir, META_FILE)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    id_mapping, encoded = IdMapping.encode(arrays)
+    id_mapping.save(cache_dir)
+    columns = dict(arrays, user_code=encoded['user'], item_code=encoded['item'])
+
+    for name, dtype in dict(COLUMNS, **ENCODED_COLUMNS).items():
+        tmp_path = os.path.join(cache_dir, f'{name}.tmp.npy')
+        np.save(tmp_path, np.ascontiguousarray(columns[name], dtype=dtype))
+        os.replace(tmp_path, os.path.join(cache_dir, f'{name}.npy'))
+
+    meta = dict(fingerprint, n_ratings=int(len(arrays['rating'])),
+                n_users=id_mapping.n_users, n_items=id_mapping.n_items)
+    with open(meta_path + '.tmp', 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(meta_path + '.tmp', meta_path)
+
+
+def _read_cache(cache_dir):
+    """Abre los arrays de la caché con mmap (sin leerlos a memoria)"""
+    return {
+        name: np.load(os.path.join(cache_dir, f'{name}.npy'), mmap_mode='r')
+        for name in list(COLUMNS) + list(ENCODED_COLUMNS)
+    }
+
+
+def load_ratings(source_path, parser):
+    """
+    Devuelve los ratings de un fichero como arrays columnares, usando la
+    caché binaria si está actualizada
+
+    Args:
+        source_path: Ruta del fichero de ratings original
+        parser: Función que parsea el fichero original y devuelve un dict
+            con los arrays 'user', 'item', 'rating' y 'timestamp'
+
+    Returns:
+        tuple: (dict de arrays de solo lectura, con los ids originales y sus
+        códigos en 'user_code' e 'item_code', True si se leyó de la caché)
+    """
+    cache_dir = _cache_dir_for(source_path)
+    fingerprint = _fingerprint(source_path)
+
+    meta = _read_meta(cache_dir)
+    if meta is not None and all(meta.get(k) == v for k, v in fingerprint.items()):
+        return _read_cache(cache_dir), True
+
+    arrays = parser(source_path)
+    _write_cache(cache_dir, arrays, fingerprint)
+    return _read_cache(cache_dir), False
+
+
+def load_id_mapping(source_path):
+    """Tabla de ids codificados guardada en la caché de un fichero de ratings"""
+    return IdMapping.load(_cache_dir_for(source_path))
+
+
+def build_dataset(ratings, rating_scale, id_mapping=None, timestamps=None):
+    """
+    Construye un dataset de Surprise a partir de los arrays de ratings
+
+    Args:
+        ratings: dict con los arrays 'user', 'item' y 'rating'
+        rating_scale: Tupla (mínimo, máximo) de la escala de ratings
+        id_mapping: IdMapping con el que se codificaron 'user' e 'item'
+            (None si son los ids originales)
+        timestamps: Fecha de cada rating, que se guarda en dataset.timestamps
+
+    Returns:
+        ArrayDataset: Dataset listo para cross_validate
+    """
+    dataset = ArrayDataset(Reader(rating_scale=rating_scale))
+    dataset.extend(ratings['user'], ratings['item'], ratings['rating'], timestamps)
+    dataset.id_mapping = id_mapping
+    return dataset
@@ -7,17 +7,70 @@ Autores: Marcos Llinares Montes, Ángel De Lorenzo Jerez
 
 import os
 import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timezone
+import surprise
 from surprise import (
-    Dataset, Reader,
-    NormalPredictor, BaselineOnly,
-    KNNBasic, KNNWithMeans, KNNWithZScore, KNNBaseline,
-    SVD, SVDpp, NMF,
-    SlopeOne, CoClustering
+    NormalPredictor,
+    SVDpp,
+    SlopeOne, CoClustering,
+    accuracy
 )
-from surprise.model_selection import cross_validate
 import config
+import ratings_cache
+from id_mapping import IdMapping
+from folds import FoldManager, TemporalSplit
+from checkpoint import Checkpoint, make_key
+import result_cache
+import model_store
+import ranking
+import scoring
+from scoring import BatchScorer
+import knn
+import factorization
+import slope_one
+import early_stopping
+import telemetry
+import resources
+import synthetic
+
+
+# Métricas de error disponibles en surprise.accuracy
+RATING_METRICS = ('RMSE', 'MAE', 'MSE', 'FCP')
+
+# Estado compartido con los procesos del pool. Se rellena una sola vez por
+# proceso en _init_worker: con 'fork' se heredan sin copiar el dataset y los
+# trainsets de los folds, y con 'spawn' se serializan una vez por proceso,
+# nunca una vez por tarea.
+_worker_state = {}
+
+
+def _parse_cutoff(cutoff):
+    """Convierte config.TEMPORAL_CUTOFF ('AAAA-MM-DD', timestamp o None) en timestamp"""
+    if cutoff is None or isinstance(cutoff, (int, np.integer)):
+        return cutoff
+    date = datetime.strptime(cutoff, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+    return int(date.timestamp())
+
+
+def _fold_compute_time(fold_result):
+    """Segundos de cómputo de un fold (entrenamiento, test y ranking)"""
+    return fold_result['fit_time'] + fold_result['test_time'] + fold_result.get('ranking_time', 0.0)
+
+
+def _init_worker(recommender):
+    """Inicializa un proceso del pool con el recomendador y sus folds"""
+    _worker_state['recommender'] = recommender
+
+
+def run_fold_task(algo_name, fold_index, params=None):
+    """Evalúa un fold de un algoritmo dentro de un proceso del pool"""
+    recommender = _worker_state['recommender']
+    return recommender.evaluate_fold(algo_name, fold_index, params)
 
 
 class MovieLensRecommender:
@@ -30,20 +83,41 @@ class MovieLensRecommender:
         """Inicializa el sistema de recomendación"""
         self.dataset_name = config.DATASET
         self.data = None
+        self.ratings = None  # Arrays columnares de la caché binaria (si se usa)
+        self.load_stats = {}  # Tiempo de carga y memoria pico del proceso
+        self.folds = None  # FoldManager compartido por todos los algoritmos
+        self.checkpoint = None  # Checkpoint de folds y resultados terminados
+        self.source_path = None  # Fichero de ratings del que se cargó el dataset
+        self.id_mapping = None  # Tabla ids originales <-> códigos densos de los ratings
+        self.result_cache = None
+        if config.USE_RESULT_CACHE:
+            self.result_cache = result_cache.ResultCache(
+                os.path.join(config.CACHE_DIR, 'results'),
+                max_entries=config.RESULT_CACHE_MAX_ENTRIES
+            )
         self.results = []
+        self.memory_estimates = {}  # Memoria estimada (MB) de cada algoritmo
+        self.skipped = []  # Filas de los algoritmos omitidos por memoria
+        
+        # Los KNN usan el motor disperso de knn.py salvo que se pidan los de Surprise
+        knn_module = knn if config.USE_SPARSE_KNN else surprise
+        # SVD, NMF y BaselineOnly época a época (admiten parada temprana) o los de Surprise
+        epoch_module = factorization if config.USE_EPOCH_MODELS else surprise
         
         # Diccionario con todos los algoritmos disponibles
         self.algorithms = {
             'NormalPredictor': NormalPredictor,
-            'BaselineOnly': BaselineOnly,
-            'KNNBasic': KNNBasic,
-            'KNNWithMeans': KNNWithMeans,
-            'KNNWithZScore': KNNWithZScore,
-            'KNNBaseline': KNNBaseline,
-            'SVD': SVD,
-            'SVDpp': SVDpp,
-            'NMF': NMF,
-            'SlopeOne': SlopeOne,
+            'BaselineOnly': epoch_module.BaselineOnly,
+            'KNNBasic': knn_module.KNNBasic,
+            'KNNWithMeans': knn_module.KNNWithMeans,
+            'KNNWithZScore': knn_module.KNNWithZScore,
+            'KNNBaseline': knn_module.KNNBaseline,
+            'SVD': epoch_module.SVD,
+            'SVDpp': factorization.SVDpp if config.USE_FAST_SVDPP else SVDpp,
+            'NMF': epoch_module.NMF,
+            'ALS': factorization.ALS,
+            'ParallelSGD': factorization.ParallelSGD,
+            'SlopeOne': slope_one.SlopeOne if config.USE_SPARSE_SLOPE_ONE else SlopeOne,
             'CoClustering': CoClustering
         }
         
@@ -55,46 +129,120 @@ class MovieLensRecommender:
         print(f"Cargando dataset: MovieLens {self.dataset_name}")
         print(f"{'='*60}\n")
         
-        if self.dataset_name == '100k':
-            self._load_100k()
-        elif self.dataset_name == '32m':
-            self._load_32m()
-        else:
-            raise ValueError(f"Dataset '{self.dataset_name}' no reconocido. Use '100k' o '32m'")
+        start_time = time.time()
+        
+        with telemetry.span('load', dataset=self.dataset_name) as span:
+            if self.dataset_name == '100k':
+                self._load_100k()
+            elif self.dataset_name == '32m':
+                self._load_32m()
+            elif self.dataset_name == 'synthetic':
+                self._load_synthetic()
+            else:
+                raise ValueError(f"Dataset '{self.dataset_name}' no reconocido. Use '100k', '32m' o 'synthetic'")
+            span.set(n_ratings=self.data.n_ratings)
+        
+        self.load_stats = {
+            'load_time': time.time() - start_time,
+            'peak_rss_mb': resources.peak_rss_mb()
+        }
             
         print(f"✓ Dataset cargado exitosamente")
-        print(f"  - Número de ratings: {len(self.data.raw_ratings)}")
+        print(f"  - Número de ratings: {self.data.n_ratings}")
+        print(f"  - Tiempo de carga: {self.load_stats['load_time']:.2f}s")
+        if self.load_stats['peak_rss_mb'] is not None:
+            print(f"  - Memoria pico: {self.load_stats['peak_rss_mb']:.1f} MB")
         print()
         
-    def _load_100k(self):
-        """Carga el dataset MovieLens 100k"""
+    def _load_100k(self, file_path=None, rating_scale=(1, 5)):
+        """Carga el dataset MovieLens 100k (o un fichero con su mismo formato)"""
         # El formato de ml-100k es: user_id item_id rating timestamp (separado por tabs)
-        file_path = config.DATASET_PATHS['100k']['full']
+        # Si no está extraído, se lee directamente de ml-100k.zip
+        if file_path is None:
+            paths = config.DATASET_PATHS['100k']
+            file_path = ratings_cache.find_source(paths['full'], paths.get('zip'))
+        else:
+            file_path = ratings_cache.find_source(file_path)
+        self.source_path = file_path
         
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"No se encuentra el archivo: {file_path}")
+        if config.USE_RATINGS_CACHE:
+            self._load_from_cache(file_path, ratings_cache.parse_100k, rating_scale=rating_scale)
+            return
         
-        # Definir el formato del Reader
-        reader = Reader(line_format='user item rating timestamp', sep='\t', rating_scale=(1, 5))
+        with telemetry.span('read_ratings', cached=False):
+            ratings = ratings_cache.parse_100k(file_path)
+        self._encode(ratings, rating_scale)
+        
+    def _load_32m(self, file_path=None, rating_scale=(0.5, 5.0)):
+        """Carga el dataset MovieLens 32m (o un fichero con su mismo formato)"""
+        # Si no está extraído, ratings.csv se descomprime de ml-32m.zip mientras se lee
+        if file_path is None:
+            paths = config.DATASET_PATHS['32m']
+            file_path = ratings_cache.find_source(paths['ratings'], paths.get('zip'))
+        else:
+            file_path = ratings_cache.find_source(file_path)
+        self.source_path = file_path
+        
+        if config.USE_RATINGS_CACHE:
+            self._load_from_cache(file_path, ratings_cache.parse_32m, rating_scale=rating_scale)
+            return
+        
+        # El formato de ml-32m es: userId, movieId, rating, timestamp
+        # Se lee por bloques con tipos estrechos en arrays preasignados, sin
+        # crear un DataFrame completo. La columna timestamp solo se parsea si
+        # la partición es temporal
+        with telemetry.span('read_ratings', cached=False):
+            ratings = ratings_cache.parse_32m(file_path, with_timestamp=config.SPLIT_STRATEGY != 'kfold')
+        self._encode(ratings, rating_scale)
+    
+    def _load_synthetic(self):
+        """Carga el dataset sintético, generándolo antes si no existe o cambió su configuración"""
+        file_path, rating_scale = synthetic.ensure_dataset()
+        if config.SYNTHETIC_FORMAT == '100k':
+            self._load_100k(file_path, rating_scale)
+        else:
+            self._load_32m(file_path, rating_scale)
         
-        # Cargar el dataset desde archivo
-        self.data = Dataset.load_from_file(file_path, reader=reader)
+    def _load_from_cache(self, file_path, parser, rating_scale):
+        """
+        Carga los ratings a través de la caché binaria
         
-    def _load_32m(self):
-        """Carga el dataset MovieLens 32m"""
-        file_path = config.DATASET_PATHS['32m']['ratings']
+        Args:
+            file_path: Ruta del fichero de ratings original
+            parser: Función de ratings_cache que parsea el fichero original
+            rating_scale: Tupla (mínimo, máximo) de la escala de ratings
+        """
+        with telemetry.span('read_ratings', cached=True) as span:
+            self.ratings, from_cache = ratings_cache.load_ratings(file_path, parser)
+            span.set(from_cache=from_cache)
         
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"No se encuentra el archivo: {file_path}")
+        if from_cache:
+            print(f"  - Ratings leídos de la caché binaria ({config.CACHE_DIR}/)")
+        else:
+            print(f"  - Caché binaria creada en {config.CACHE_DIR}/")
         
-        # Cargar el CSV
-        df = pd.read_csv(file_path)
+        with telemetry.span('id_mapping'):
+            self.id_mapping = ratings_cache.load_id_mapping(file_path)
+        codes = {'user': self.ratings['user_code'], 'item': self.ratings['item_code'],
+                 'rating': self.ratings['rating']}
+        with telemetry.span('build_dataset'):
+            self.data = ratings_cache.build_dataset(codes, rating_scale, self.id_mapping)
         
-        # El formato de ml-32m es: userId, movieId, rating, timestamp
-        reader = Reader(rating_scale=(0.5, 5.0))
+    def _encode(self, ratings, rating_scale):
+        """
+        Codifica los ids de unos ratings recién parseados (sin caché binaria)
+        y construye el dataset con los códigos
         
-        # Cargar desde el DataFrame
-        self.data = Dataset.load_from_df(df[['userId', 'movieId', 'rating']], reader)
+        Args:
+            ratings: dict con los arrays 'user', 'item', 'rating' y,
+                opcionalmente, 'timestamp'
+            rating_scale: Tupla (mínimo, máximo) de la escala de ratings
+        """
+        with telemetry.span('id_mapping'):
+            self.id_mapping, codes = IdMapping.encode(ratings)
+        with telemetry.span('build_dataset'):
+            self.data = ratings_cache.build_dataset(codes, rating_scale, self.id_mapping,
+                                                    timestamps=ratings.get('timestamp'))
         
     def get_algorithms_to_run(self):
         """
@@ -115,94 +263,800 @@ class MovieLensRecommender:
         Returns:
             dict: Diccionario con los resultados de la evaluación
         """
+        with telemetry.span('evaluate', algorithm=algo_name):
+            return self._evaluate_algorithm(algo_name)
+    
+    def _evaluate_algorithm(self, algo_name):
+        """Evalúa un algoritmo sobre todos los folds (ver evaluate_algorithm)"""
         print(f"\n{'-'*60}")
         print(f"Evaluando: {algo_name}")
         print(f"{'-'*60}")
         
-        # Obtener la clase del algoritmo
-        algo_class = self.algorithms[algo_name]
+        # Si el algoritmo ya se evaluó antes con la misma configuración, no se repite
+        checkpointed = self._stored_result(algo_name)
+        if checkpointed is not None:
+            return checkpointed
         
-        # Obtener los parámetros del algoritmo
-        params = config.ALGORITHM_PARAMS.get(algo_name, {})
-        
-        # Instanciar el algoritmo con sus parámetros
-        algo = algo_class(**params)
+        # Folds terminados en una ejecución anterior que se interrumpió
+        done_folds = self._checkpointed_folds(algo_name)
         
         # Medir tiempo de ejecución
         start_time = time.time()
         
         try:
-            # Realizar validación cruzada
-            cv_results = cross_validate(
-                algo,
-                self.data,
-                measures=['RMSE', 'MAE'],
-                cv=config.CV_FOLDS,
-                verbose=config.VERBOSE
-            )
+            # Realizar validación cruzada sobre los folds compartidos
+            cv_results = {}
+            restored_time = 0.0
+            for fold_i in range(len(self.folds)):
+                if fold_i in done_folds:
+                    fold_result = done_folds[fold_i]
+                    restored_time += _fold_compute_time(fold_result)
+                else:
+                    fold_result = self.evaluate_fold(algo_name, fold_i)
+                    self._record_fold(algo_name, fold_i, fold_result)
+                    
+                for key, value in fold_result.items():
+                    cv_results.setdefault(key, []).append(value)
+                    
+                if config.VERBOSE:
+                    ranking_str = ''.join(
+                        f"{label}={fold_result['test_' + label.lower()]:.4f} "
+                        for label in self.ranking_labels() if 'test_' + label.lower() in fold_result
+                    )
+                    print(f"  Fold {fold_i + 1}/{len(self.folds)}: "
+                          f"RMSE={fold_result['test_rmse']:.4f} "
+                          f"MAE={fold_result['test_mae']:.4f} "
+                          f"{ranking_str}"
+                          f"fit={fold_result['fit_time']:.2f}s "
+                          f"test={fold_result['test_time']:.2f}s"
+                          f"{self._fold_resources_str(fold_result)}"
+                          f"{self._fold_epochs_str(fold_result)}")
             
-            execution_time = time.time() - start_time
+            execution_time = time.time() - start_time + restored_time
             
-            # Importar numpy para calcular medias y desviaciones estándar
-            import numpy as np
+            result = self._build_result(algo_name, cv_results, execution_time)
+            self._record_result(algo_name, result)
+            return result
             
-            # Calcular métricas promedio
-            result = {
-                'Algorithm': algo_name,
-                'Dataset': self.dataset_name,
-                'RMSE_mean': np.mean(cv_results['test_rmse']),
-                'RMSE_std': np.std(cv_results['test_rmse']),
-                'MAE_mean': np.mean(cv_results['test_mae']),
-                'MAE_std': np.std(cv_results['test_mae']),
-                'Fit_time_mean': np.mean(cv_results['fit_time']),
-                'Test_time_mean': np.mean(cv_results['test_time']),
-                'Total_time': execution_time,
-                'CV_folds': config.CV_FOLDS,
-                'Timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
+        except Exception as e:
+            return self._build_error(algo_name, e)
+    
+    def evaluate_fold(self, algo_name, fold_index, params=None):
+        """
+        Entrena y evalúa un algoritmo sobre un único fold, midiendo la
+        memoria pico del proceso y los tiempos de CPU y real del fold
+        
+        Args:
+            algo_name: Nombre del algoritmo a evaluar
+            fold_index: Índice del fold en self.folds
+            params: Parámetros del algoritmo (por defecto, los de
+                config.ALGORITHM_PARAMS)
             
-            # Agregar información de parámetros
-            if params:
-                result['Parameters'] = str(params)
+        Returns:
+            dict: Métricas, tiempos y recursos del fold
+        """
+        with telemetry.span('fold', algorithm=algo_name, fold=fold_index):
+            with resources.ResourceMonitor() as monitor:
+                fold_result = self._evaluate_fold(algo_name, fold_index, params)
+        fold_result.update(monitor.stats)
+        return fold_result
+    
+    def _evaluate_fold(self, algo_name, fold_index, params):
+        """Entrena y evalúa un algoritmo sobre un fold (ver evaluate_fold)"""
+        with telemetry.span('fold_split', fold=fold_index):
+            trainset, testset = self.folds.get(fold_index)
+        
+        # Instanciar el algoritmo con sus parámetros
+        if params is None:
+            params = config.ALGORITHM_PARAMS.get(algo_name, {})
+        algo = self.algorithms[algo_name](**params)
+        
+        # Con parada temprana, los algoritmos que la admiten se entrenan
+        # época a época validando con una parte del trainset del fold
+        stopping = None
+        start_time = time.time()
+        with telemetry.span('fit', n_ratings=trainset.n_ratings) as span:
+            if config.EARLY_STOPPING and early_stopping.supports_early_stopping(algo):
+                stopping = early_stopping.fit_with_early_stopping(
+                    algo, trainset,
+                    fraction=config.EARLY_STOPPING_VALIDATION_FRACTION,
+                    patience=config.EARLY_STOPPING_PATIENCE,
+                    min_delta=config.EARLY_STOPPING_MIN_DELTA,
+                    seed=config.RANDOM_SEED + fold_index,
+                    refit=config.EARLY_STOPPING_REFIT
+                )
+                span.set(epochs_used=stopping['epochs_used'], best_epoch=stopping['best_epoch'])
             else:
-                result['Parameters'] = 'Default'
-                
-            print(f"\n✓ Evaluación completada")
-            print(f"  RMSE: {result['RMSE_mean']:.4f} (±{result['RMSE_std']:.4f})")
-            print(f"  MAE:  {result['MAE_mean']:.4f} (±{result['MAE_std']:.4f})")
-            print(f"  Tiempo total: {execution_time:.2f}s")
+                algo.fit(trainset)
+        fit_time = time.time() - start_time
+        
+        rating_metrics, ranking_metrics = self.get_metrics()
+        vectorized = scoring.is_vectorized(algo)
+        scorer = None
+        
+        # Los modelos de factores, sesgos, CoClustering, SlopeOne, NormalPredictor
+        # y los KNN dispersos se predicen con operaciones de arrays; el resto,
+        # con una llamada a predict() por rating
+        start_time = time.time()
+        with telemetry.span('predict', n_ratings=len(testset)) as span:
+            if vectorized and config.VECTORIZED_TESTING:
+                span.set(vectorized=True)
+                scorer = BatchScorer(algo, seed=config.RANDOM_SEED)
+                inner_users, inner_items, ratings, user_codes = scoring.map_testset(trainset, testset)
+                estimates = scorer.predict_pairs(inner_users, inner_items)
+            else:
+                predictions = algo.test(testset)
+        test_time = time.time() - start_time
+        
+        with telemetry.span('metric', metrics=rating_metrics):
+            if scorer is not None:
+                metric_values = scoring.accuracy_metrics(rating_metrics, ratings, estimates, user_codes)
+            else:
+                metric_values = {
+                    metric: getattr(accuracy, metric.lower())(predictions, verbose=False)
+                    for metric in rating_metrics
+                }
+        fold_result = {'test_' + metric.lower(): value for metric, value in metric_values.items()}
+        fold_result['fit_time'] = fit_time
+        fold_result['test_time'] = test_time
+        if stopping is not None:
+            # Entrenamiento estimado con n_epochs fijas menos el tiempo real de
+            # la parada temprana (separar la validación, validar cada época y
+            # reentrenar); negativo si la parada temprana sale más cara
+            fold_result['epochs_used'] = stopping['epochs_used']
+            fold_result['best_epoch'] = stopping['best_epoch']
+            fold_result['time_saved'] = stopping['fixed_time'] - fit_time
+        
+        # Métricas de ranking: solo para los modelos que se pueden puntuar por bloques
+        if ranking_metrics and vectorized:
+            start_time = time.time()
+            with telemetry.span('ranking', metrics=ranking_metrics, k=config.RANKING_K):
+                ranking_results = ranking.evaluate_ranking(
+                    algo, testset,
+                    k=config.RANKING_K,
+                    threshold=config.RELEVANCE_THRESHOLD,
+                    batch_size=config.RANKING_BATCH_SIZE,
+                    seed=config.RANDOM_SEED,
+                    scorer=scorer
+                )
+            fold_result['ranking_time'] = time.time() - start_time
+            for metric in ranking_metrics:
+                label = ranking.metric_label(metric, config.RANKING_K)
+                fold_result['test_' + label.lower()] = ranking_results[metric]
+        
+        return fold_result
+    
+    def get_metrics(self):
+        """
+        Métricas pedidas en config.METRICS, separadas en métricas de error
+        (RMSE y MAE se calculan siempre) y métricas de ranking top-K
+        
+        Returns:
+            tuple: (métricas de error, métricas de ranking)
+        """
+        unknown = [
+            metric for metric in config.METRICS
+            if metric not in RATING_METRICS and metric not in ranking.RANKING_METRICS
+        ]
+        if unknown:
+            raise ValueError(
+                f"Métricas no reconocidas en config.METRICS: {', '.join(unknown)}. "
+                f"Disponibles: {', '.join(RATING_METRICS + ranking.RANKING_METRICS)}"
+            )
+        
+        rating_metrics = ['RMSE', 'MAE'] + [
+            metric for metric in config.METRICS if metric in RATING_METRICS and metric not in ('RMSE', 'MAE')
+        ]
+        ranking_metrics = [metric for metric in config.METRICS if metric in ranking.RANKING_METRICS]
+        return rating_metrics, ranking_metrics
+    
+    def ranking_labels(self):
+        """Nombres de las métricas de ranking pedidas con el valor de K (p. ej. 'NDCG@10')"""
+        return [ranking.metric_label(metric, config.RANKING_K) for metric in self.get_metrics()[1]]
+    
+    def fit_full_model(self, algo_name, params=None):
+        """
+        Entrena un algoritmo del registro con todos los ratings del dataset
+        
+        Args:
+            algo_name: Nombre del algoritmo en self.algorithms
+            params: Parámetros del algoritmo (por defecto, los de
+                config.ALGORITHM_PARAMS)
             
-            return result
+        Returns:
+            AlgoBase: Modelo entrenado
+        """
+        if params is None:
+            params = config.ALGORITHM_PARAMS.get(algo_name, {})
+        algo = self.algorithms[algo_name](**params)
+        algo.fit(self.data.build_full_trainset())
+        return algo
+    
+    def train_and_save_models(self):
+        """
+        Entrena con todos los ratings cada algoritmo seleccionado y lo guarda
+        en OUTPUT_DIR/MODELS_SUBDIR/{dataset}/{algoritmo}/ con model_store
+        """
+        algorithms_to_run = self.get_algorithms_to_run()
+        output_dir = model_store.models_dir(self.dataset_name)
+        
+        for i, algo_name in enumerate(algorithms_to_run, 1):
+            print(f"\n[{i}/{len(algorithms_to_run)}] Entrenando {algo_name} con todos los datos...")
+            params = config.ALGORITHM_PARAMS.get(algo_name, {})
             
-        except Exception as e:
-            print(f"\n✗ Error al evaluar {algo_name}: {str(e)}")
-            return {
-                'Algorithm': algo_name,
-                'Dataset': self.dataset_name,
-                'Error': str(e),
-                'Timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            try:
+                with telemetry.span('train_full', algorithm=algo_name):
+                    start_time = time.time()
+                    with telemetry.span('fit'):
+                        algo = self.fit_full_model(algo_name, params)
+                    fit_time = time.time() - start_time
+                    
+                    model_dir = os.path.join(output_dir, algo_name)
+                    start_time = time.time()
+                    with telemetry.span('save', target='model'):
+                        model_store.save_model(algo, algo_name, model_dir, params, self.id_mapping)
+                    save_time = time.time() - start_time
+                
+                size_mb = sum(
+                    os.path.getsize(os.path.join(model_dir, f)) for f in os.listdir(model_dir)
+                ) / (1024 * 1024)
+                print(f"✓ {algo_name} guardado en {model_dir}/ ({size_mb:.1f} MB)")
+                print(f"  Entrenamiento: {fit_time:.2f}s | Guardado: {save_time:.2f}s")
+            except Exception as e:
+                print(f"✗ Error al entrenar/guardar {algo_name}: {str(e)}")
+    
+    def prepare_folds(self):
+        """
+        Crea las particiones de la evaluación una sola vez: los folds de
+        validación cruzada, con la semilla de config.RANDOM_SEED, que se
+        guardan en disco, o la partición temporal de config.SPLIT_STRATEGY
+        """
+        if self.folds is not None:
+            return
+        
+        n_folds = config.CV_FOLDS if config.SPLIT_STRATEGY == 'kfold' else 1
+        keep_trainsets = resources.keep_trainsets(self.dataset_shape()[2], n_folds)
+        if not keep_trainsets and config.KEEP_TRAINSETS_IN_MEMORY == 'auto':
+            print("⚠ Los trainsets de los folds no caben en el presupuesto de memoria: "
+                  "se construirán en cada fold sin conservarlos")
+        
+        if config.SPLIT_STRATEGY != 'kfold':
+            self.folds = TemporalSplit(
+                self.data,
+                timestamps=self.rating_timestamps(),
+                strategy=config.SPLIT_STRATEGY,
+                users=self.rating_users() if config.SPLIT_STRATEGY == 'leave_last_n' else None,
+                test_fraction=config.TEMPORAL_TEST_FRACTION,
+                cutoff=_parse_cutoff(config.TEMPORAL_CUTOFF),
+                last_n=config.LEAVE_LAST_N,
+                name=self.dataset_name,
+                keep_trainsets=keep_trainsets
+            )
+            with telemetry.span('fold_split', strategy=config.SPLIT_STRATEGY):
+                self.folds.split()
+            print(f"✓ Partición {self.folds.describe()}: "
+                  f"{len(self.folds.train_idx)} ratings de train y {len(self.folds.test_idx)} de test")
+            return
+        
+        self.folds = FoldManager(
+            self.data,
+            n_folds=config.CV_FOLDS,
+            seed=config.RANDOM_SEED,
+            name=self.dataset_name,
+            cache_dir=os.path.join(config.CACHE_DIR, 'folds'),
+            keep_trainsets=keep_trainsets
+        )
+        with telemetry.span('fold_split', strategy='kfold', n_folds=config.CV_FOLDS):
+            self.folds.split()
+        
+        origin = "leídos de disco" if self.folds.loaded_from_disk else "creados"
+        print(f"✓ Folds {origin}: {config.CV_FOLDS} particiones (semilla {config.RANDOM_SEED})")
+    
+    def rating_timestamps(self):
+        """
+        Fecha de cada rating del dataset como array de enteros
+        
+        Raises:
+            ValueError: Si el dataset se cargó sin fechas
+        """
+        if self.ratings is not None:
+            return np.asarray(self.ratings['timestamp'], dtype=np.int64)
+        
+        if self.data.timestamps is not None:
+            return self.data.timestamps
+        raise ValueError("El dataset se cargó sin la fecha de los ratings; "
+                         "no se puede usar una partición temporal")
+    
+    def rating_users(self):
+        """Código de usuario de cada rating del dataset como array"""
+        return self.data.columns['user']
+    
+    def split_description(self):
+        """Partición usada en la evaluación, para la salida y el CSV"""
+        if config.SPLIT_STRATEGY == 'kfold':
+            return f"kfold ({config.CV_FOLDS} folds)"
+        self.prepare_folds()
+        return self.folds.describe()
+        
+    def open_checkpoint(self):
+        """
+        Abre el checkpoint de la evaluación en config.OUTPUT_DIR (si está
+        activado), recuperando lo que ya terminó en ejecuciones anteriores
+        """
+        if not config.USE_CHECKPOINT or self.checkpoint is not None:
+            return
+        
+        checkpoint_path = os.path.join(config.OUTPUT_DIR, f'checkpoint_{self.dataset_name}.jsonl')
+        self.checkpoint = Checkpoint(checkpoint_path)
+        
+        if self.checkpoint.results or self.checkpoint.folds:
+            print(f"✓ Checkpoint encontrado: {checkpoint_path}")
+            print(f"  - Algoritmos terminados: {len(self.checkpoint.results)}")
+    
+    def _evaluation_key(self, algo_name):
+        """
+        Clave del checkpoint para un algoritmo con la configuración actual.
+        Incluye la huella del fichero de ratings, para no reutilizar folds de
+        un fichero que ha cambiado
+        """
+        dataset = self._dataset_fingerprint() if self.source_path is not None else self.dataset_name
+        return make_key(dataset, algo_name, self._key_params(algo_name), config.CV_FOLDS,
+                        config.RANDOM_SEED, self._evaluation_config())
+    
+    def _key_params(self, algo_name):
+        """
+        Parámetros que identifican un algoritmo en las claves de checkpoint y
+        caché. Los KNN dispersos añaden el número de vecinos guardados, que
+        cambia sus resultados respecto a los de Surprise, ALS y ParallelSGD el
+        número de hilos de entrenamiento (los minilotes de ParallelSGD dependen
+        de él), y SVD, SVDpp, NMF, BaselineOnly y SlopeOne el motor con el que
+        se entrenan si no es el de Surprise
+        """
+        params = config.ALGORITHM_PARAMS.get(algo_name, {})
+        module = self.algorithms[algo_name].__module__
+        if module == knn.__name__:
+            return dict(params, _knn_max_neighbors=config.KNN_MAX_NEIGHBORS)
+        if algo_name in ('ALS', 'ParallelSGD'):
+            n_threads = params.get('n_threads')
+            if n_threads is None:
+                n_threads = config.FACTORIZATION_N_THREADS
+            return dict(params, _n_threads=resources.threads_per_job(n_threads))
+        if module in (slope_one.__name__, factorization.__name__):
+            return dict(params, _engine=module)
+        return params
+    
+    def _evaluation_config(self):
+        """
+        Configuración de las métricas, de la partición y de la parada
+        temprana, que forma parte de las claves de checkpoint y caché (con
+        'kfold' y sin parada temprana solo las métricas, para conservar las
+        claves de las evaluaciones ya guardadas)
+        """
+        evaluation = {
+            'metrics': config.METRICS,
+            'ranking_k': config.RANKING_K,
+            'relevance_threshold': config.RELEVANCE_THRESHOLD,
+        }
+        if self.dataset_name == 'synthetic':
+            evaluation['synthetic'] = synthetic.generation_settings()
+        if config.EARLY_STOPPING:
+            evaluation['early_stopping'] = {
+                'validation_fraction': config.EARLY_STOPPING_VALIDATION_FRACTION,
+                'patience': config.EARLY_STOPPING_PATIENCE,
+                'min_delta': config.EARLY_STOPPING_MIN_DELTA,
+            }
+            if config.EARLY_STOPPING_REFIT:
+                evaluation['early_stopping']['refit'] = True
+        if config.SPLIT_STRATEGY != 'kfold':
+            evaluation['split'] = {
+                'strategy': config.SPLIT_STRATEGY,
+                'test_fraction': config.TEMPORAL_TEST_FRACTION,
+                'cutoff': config.TEMPORAL_CUTOFF,
+                'last_n': config.LEAVE_LAST_N,
             }
+        return evaluation
+    
+    def _dataset_fingerprint(self):
+        """Identifica el fichero de ratings por su nombre, tamaño y fecha de modificación"""
+        stat = ratings_cache.source_stat(self.source_path)
+        return {
+            'dataset': self.dataset_name,
+            'file': os.path.basename(self.source_path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns
+        }
+    
+    def _result_cache_key(self, algo_name):
+        """Clave de la caché de resultados para un algoritmo con la configuración actual"""
+        return result_cache.make_key(
+            self._dataset_fingerprint(), algo_name, self._key_params(algo_name), config.CV_FOLDS,
+            config.RANDOM_SEED, self._evaluation_config()
+        )
+    
+    def _stored_result(self, algo_name):
+        """
+        Resultado de un algoritmo ya evaluado con la configuración actual,
+        buscado primero en la caché de resultados y después en el checkpoint
+        
+        Returns:
+            dict: Fila de resultados, o None si hay que evaluarlo
+        """
+        if self.result_cache is not None and self.source_path is not None:
+            result = self.result_cache.get(self._result_cache_key(algo_name))
+            if result is not None:
+                print(f"✓ {algo_name}: resultado recuperado de la caché de resultados")
+                return result
+        
+        if self.checkpoint is not None:
+            result = self.checkpoint.get_result(self._evaluation_key(algo_name))
+            if result is not None:
+                print(f"✓ {algo_name}: resultado recuperado del checkpoint")
+                return result
+        
+        return None
+    
+    def _checkpointed_folds(self, algo_name):
+        """Folds de un algoritmo ya terminados según el checkpoint"""
+        if self.checkpoint is None:
+            return {}
+        return self.checkpoint.get_folds(self._evaluation_key(algo_name))
+    
+    def _record_fold(self, algo_name, fold_index, fold_result):
+        """Guarda un fold terminado en el checkpoint"""
+        if self.checkpoint is not None:
+            self.checkpoint.record_fold(self._evaluation_key(algo_name), fold_index, fold_result)
+    
+    def _record_result(self, algo_name, result):
+        """Guarda el resultado de un algoritmo terminado en el checkpoint y en la caché"""
+        if 'Error' in result:
+            return
+        if self.checkpoint is not None:
+            self.checkpoint.record_result(self._evaluation_key(algo_name), result)
+        if self.result_cache is not None and self.source_path is not None:
+            self.result_cache.put(self._result_cache_key(algo_name), result)
+    
+    def _on_fold_done(self, algo_name, fold_index, future):
+        """Callback del pool: guarda el fold en el checkpoint en cuanto termina"""
+        if not future.cancelled() and future.exception() is None:
+            self._record_fold(algo_name, fold_index, future.result())
+    
+    def _build_result(self, algo_name, cv_results, execution_time):
+        """
+        Construye la fila de resultados de un algoritmo a partir de las
+        métricas de cada fold
+        
+        Args:
+            algo_name: Nombre del algoritmo evaluado
+            cv_results: Diccionario con una lista por métrica (test_rmse,
+                test_mae, test_ndcg@10...) y por tiempo (fit_time, test_time,
+                ranking_time), con una entrada por fold
+            execution_time: Tiempo total de la evaluación en segundos
+            
+        Returns:
+            dict: Diccionario con los resultados de la evaluación
+        """
+        params = config.ALGORITHM_PARAMS.get(algo_name, {})
+        
+        # Calcular métricas promedio
+        result = {
+            'Algorithm': algo_name,
+            'Dataset': self.dataset_name,
+        }
+        rating_metrics = self.get_metrics()[0]
+        for metric in rating_metrics + self.ranking_labels():
+            values = cv_results.get('test_' + metric.lower())
+            if values is not None:
+                result[f'{metric}_mean'] = np.mean(values)
+                result[f'{metric}_std'] = np.std(values)
+        
+        result['Fit_time_mean'] = np.mean(cv_results['fit_time'])
+        result['Test_time_mean'] = np.mean(cv_results['test_time'])
+        if 'ranking_time' in cv_results:
+            result['Ranking_time_mean'] = np.mean(cv_results['ranking_time'])
+        result.update(self._resource_columns(algo_name, cv_results))
+        if cv_results.get('epochs_used'):
+            result['Epochs_used_mean'] = np.mean(cv_results['epochs_used'])
+            result['Best_epoch_mean'] = np.mean(cv_results['best_epoch'])
+            result['Time_saved_mean'] = np.mean(cv_results['time_saved'])
+        result['Total_time'] = execution_time
+        result['CV_folds'] = len(cv_results['test_rmse'])
+        result['Split'] = self.split_description()
+        result['Timestamp'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
+        # Agregar información de parámetros
+        if params:
+            result['Parameters'] = str(params)
+        else:
+            result['Parameters'] = 'Default'
+            
+        print(f"\n✓ Evaluación completada: {algo_name}")
+        print(f"  RMSE: {result['RMSE_mean']:.4f} (±{result['RMSE_std']:.4f})")
+        print(f"  MAE:  {result['MAE_mean']:.4f} (±{result['MAE_std']:.4f})")
+        for metric in rating_metrics[2:] + self.ranking_labels():
+            if f'{metric}_mean' in result:
+                print(f"  {metric}: {result[f'{metric}_mean']:.4f} (±{result[f'{metric}_std']:.4f})")
+        if self.ranking_labels() and 'Ranking_time_mean' not in result:
+            print(f"  Métricas de ranking no disponibles para {algo_name} (no se puede puntuar por bloques)")
+        if 'Epochs_used_mean' in result:
+            print(f"  Parada temprana: {result['Epochs_used_mean']:.1f} épocas de media "
+                  f"(mejor: {result['Best_epoch_mean']:.1f}), "
+                  f"{result['Time_saved_mean']:.2f}s ahorrados por fold")
+        elif config.EARLY_STOPPING and algo_name in ('SVD', 'NMF', 'BaselineOnly'):
+            print(f"  Parada temprana no disponible para {algo_name} de Surprise "
+                  f"(USE_EPOCH_MODELS = True usa su versión época a época)")
+        elif config.EARLY_STOPPING:
+            print(f"  Parada temprana no disponible para {algo_name} (se entrena con n_epochs fijas)")
+        if 'Peak_RSS_MB' in result:
+            print(f"  Memoria pico: {result['Peak_RSS_MB']:.1f} MB | "
+                  f"CPU por fold: {result['CPU_time_mean']:.2f}s")
+        print(f"  Tiempo total: {execution_time:.2f}s")
+        
+        return result
+    
+    def _resource_columns(self, algo_name, cv_results):
+        """
+        Columnas de recursos de un algoritmo: memoria pico (máximo de los
+        folds), tiempos medios de CPU y real, los valores de cada fold
+        separados por ';' y la memoria que se estimó antes de empezar
+        
+        Los folds recuperados de checkpoints anteriores a estas medidas no
+        tienen recursos y no se incluyen
+        """
+        columns = {}
+        if cv_results.get('peak_rss_mb') and None not in cv_results['peak_rss_mb']:
+            columns['Peak_RSS_MB'] = max(cv_results['peak_rss_mb'])
+        if cv_results.get('cpu_time'):
+            columns['CPU_time_mean'] = np.mean(cv_results['cpu_time'])
+            columns['Wall_time_mean'] = np.mean(cv_results['wall_time'])
+        for key, column in [('peak_rss_mb', 'Peak_RSS_MB_folds'), ('cpu_time', 'CPU_time_folds'),
+                            ('wall_time', 'Wall_time_folds')]:
+            if cv_results.get(key):
+                columns[column] = ';'.join('' if v is None else f'{v:.2f}' for v in cv_results[key])
+        if algo_name in self.memory_estimates:
+            columns['Estimated_memory_MB'] = self.memory_estimates[algo_name]
+        return columns
+    
+    def _fold_resources_str(self, fold_result):
+        """Memoria pico y tiempo de CPU de un fold para la salida detallada"""
+        parts = ''
+        if fold_result.get('peak_rss_mb') is not None:
+            parts += f" mem={fold_result['peak_rss_mb']:.0f}MB"
+        if 'cpu_time' in fold_result:
+            parts += f" cpu={fold_result['cpu_time']:.2f}s"
+        return parts
+    
+    def _fold_epochs_str(self, fold_result):
+        """Épocas entrenadas con parada temprana para la salida detallada"""
+        if 'epochs_used' not in fold_result:
+            return ''
+        return f" épocas={fold_result['epochs_used']} (mejor {fold_result['best_epoch']})"
+    
+    def _build_error(self, algo_name, error, verbose=True):
+        """Construye la fila de resultados de un algoritmo que ha fallado"""
+        if verbose:
+            print(f"\n✗ Error al evaluar {algo_name}: {str(error)}")
+        return {
+            'Algorithm': algo_name,
+            'Dataset': self.dataset_name,
+            'Error': str(error),
+            'Timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+    
+    def get_n_jobs(self):
+        """Número de procesos a utilizar según config.N_JOBS"""
+        if config.N_JOBS is None or config.N_JOBS <= 0:
+            return os.cpu_count() or 1
+        return config.N_JOBS
+    
+    def create_process_pool(self, n_workers):
+        """
+        Crea un pool de procesos que comparte este recomendador (dataset y
+        folds) con todos sus procesos. Las tareas se envían con
+        executor.submit(run_fold_task, algo_name, fold_index, params)
+        
+        Args:
+            n_workers: Número de procesos del pool
+            
+        Returns:
+            ProcessPoolExecutor: Pool listo para usar como context manager
+        """
+        # 'fork' permite que los procesos compartan el dataset y los trainsets
+        # sin copiarlos, por lo que se construyen antes de crear el pool
+        start_methods = multiprocessing.get_all_start_methods()
+        use_fork = 'fork' in start_methods
+        if use_fork and self.folds.keep_trainsets:
+            self.folds.build_all()
+        context = multiprocessing.get_context('fork' if use_fork else None)
+        
+        return ProcessPoolExecutor(
+            max_workers=n_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self,)
+        )
+    
+    def _run_parallel_evaluations(self, algorithms_to_run, n_jobs):
+        """
+        Evalúa todos los folds de todos los algoritmos en un pool de procesos
+        
+        Cada tarea es un par (algoritmo, fold). El dataset y los índices de
+        los folds se entregan a cada proceso una sola vez al arrancar, y los
+        resultados se agregan en el orden de algorithms_to_run para que el
+        CSV sea reproducible.
+        
+        Args:
+            algorithms_to_run: Lista de nombres de algoritmos
+            n_jobs: Número de procesos del pool
+        """
+        # Resultados y folds ya terminados en ejecuciones anteriores
+        checkpointed = {algo_name: self._stored_result(algo_name) for algo_name in algorithms_to_run}
+        done_folds = {algo_name: self._checkpointed_folds(algo_name) for algo_name in algorithms_to_run}
+        pending = [
+            (algo_name, fold_i)
+            for algo_name in algorithms_to_run if checkpointed[algo_name] is None
+            for fold_i in range(len(self.folds)) if fold_i not in done_folds[algo_name]
+        ]
+        n_tasks = max(len(pending), 1)
+        
+        with self.create_process_pool(min(n_jobs, n_tasks)) as executor:
+            futures = {}
+            for algo_name, fold_i in pending:
+                future = executor.submit(run_fold_task, algo_name, fold_i)
+                future.add_done_callback(partial(self._on_fold_done, algo_name, fold_i))
+                futures[(algo_name, fold_i)] = future
+            
+            for i, algo_name in enumerate(algorithms_to_run, 1):
+                if checkpointed[algo_name] is not None:
+                    self.results.append(checkpointed[algo_name])
+                    continue
+                    
+                cv_results = {}
+                try:
+                    execution_time = 0.0
+                    for fold_i in range(len(self.folds)):
+                        if fold_i in done_folds[algo_name]:
+                            fold_result = done_folds[algo_name][fold_i]
+                        else:
+                            fold_result = futures[(algo_name, fold_i)].result()
+                        for key, value in fold_result.items():
+                            cv_results.setdefault(key, []).append(value)
+                        # Tiempo de cómputo acumulado de todos los folds del algoritmo
+                        execution_time += _fold_compute_time(fold_result)
+                    
+                    result = self._build_result(algo_name, cv_results, execution_time)
+                    self._record_result(algo_name, result)
+                except Exception as e:
+                    result = self._build_error(algo_name, e)
+                    
+                print(f"[{i}/{len(algorithms_to_run)}] {algo_name} finalizado")
+                self.results.append(result)
+    
+    def dataset_shape(self):
+        """
+        Tamaño del dataset cargado
+        
+        Returns:
+            tuple: (usuarios, películas, ratings)
+        """
+        if self.id_mapping is not None:
+            return self.id_mapping.n_users, self.id_mapping.n_items, self.data.n_ratings
+        columns = self.data.columns
+        return len(np.unique(columns['user'])), len(np.unique(columns['item'])), self.data.n_ratings
+    
+    def plan_memory(self, algorithms_to_run, n_jobs):
+        """
+        Estima la memoria de cada algoritmo antes de empezar y aplica
+        config.MEMORY_BUDGET_ACTION a los que superarían el presupuesto
+        
+        Un algoritmo cabe si la memoria actual del proceso, más la de los
+        trainsets que se conservan en memoria (todos los folds con
+        KEEP_TRAINSETS_IN_MEMORY), más su estimación (con el trainset del fold
+        si no se conservan) multiplicada por los procesos que pueden estar
+        entrenando a la vez no supera el presupuesto
+        
+        Args:
+            algorithms_to_run: Lista de nombres de algoritmos
+            n_jobs: Número de procesos en paralelo
+            
+        Returns:
+            list: Algoritmos a evaluar, en el orden en que se evaluarán
+        """
+        n_users, n_items, n_ratings = self.dataset_shape()
+        budget = resources.memory_budget_mb()
+        baseline = resources.current_rss_mb() or 0.0
+        concurrency = max(1, min(n_jobs, len(algorithms_to_run) * len(self.folds)))
+        
+        # Los trainsets aún no se han construido: los que se conservan se
+        # comparten entre algoritmos (y entre procesos con 'fork'); si no, cada
+        # proceso construye el de su fold
+        fold_sizes = [self.folds.train_size(fold_i) for fold_i in range(len(self.folds))]
+        if self.folds.keep_trainsets:
+            shared = sum(resources.trainset_memory_mb(size) for size in fold_sizes)
+            per_process = 0.0
+        else:
+            shared = 0.0
+            per_process = resources.trainset_memory_mb(max(fold_sizes))
+        
+        fitting, too_big = [], []
+        for algo_name in algorithms_to_run:
+            params = config.ALGORITHM_PARAMS.get(algo_name, {})
+            estimate = resources.estimate_memory_mb(
+                algo_name, params, n_users, n_items, n_ratings,
+                sparse_knn=self.algorithms[algo_name].__module__ == knn.__name__
+            )
+            self.memory_estimates[algo_name] = estimate
+            if budget is None or baseline + shared + (estimate + per_process) * concurrency <= budget:
+                fitting.append(algo_name)
+            else:
+                too_big.append(algo_name)
+        
+        if config.VERBOSE or too_big:
+            budget_str = f"{budget:.0f} MB" if budget is not None else "desconocido"
+            print(f"Memoria estimada ({n_users} usuarios, {n_items} películas, {n_ratings} ratings; "
+                  f"proceso: {baseline:.0f} MB, trainsets: {shared + per_process * concurrency:.0f} MB, "
+                  f"presupuesto: {budget_str}, procesos: {concurrency})")
+            for algo_name in algorithms_to_run:
+                mark = '✗' if algo_name in too_big else '✓'
+                print(f"  {mark} {algo_name:<16} {self.memory_estimates[algo_name]:>12.1f} MB")
+            print()
+        
+        if not too_big or config.MEMORY_BUDGET_ACTION == 'warn':
+            return list(algorithms_to_run)
+        
+        if config.MEMORY_BUDGET_ACTION == 'last':
+            too_big.sort(key=self.memory_estimates.get)
+            print(f"⚠ Se evaluarán al final por superar el presupuesto de memoria: {', '.join(too_big)}")
+            return fitting + too_big
+        
+        if config.MEMORY_BUDGET_ACTION != 'skip':
+            raise ValueError(
+                f"MEMORY_BUDGET_ACTION '{config.MEMORY_BUDGET_ACTION}' no reconocido. "
+                f"Use 'skip', 'last' o 'warn'"
+            )
+        for algo_name in too_big:
+            message = (f"Omitido: el proceso ({baseline:.0f} MB) más los trainsets "
+                       f"({shared + per_process * concurrency:.0f} MB) y la memoria estimada "
+                       f"({self.memory_estimates[algo_name]:.0f} MB x {concurrency} procesos) "
+                       f"supera el presupuesto de {budget:.0f} MB")
+            print(f"✗ {algo_name}: {message}")
+            row = self._build_error(algo_name, message, verbose=False)
+            row['Estimated_memory_MB'] = self.memory_estimates[algo_name]
+            self.skipped.append(row)
+        return fitting
     
     def run_all_evaluations(self):
         """
         Ejecuta la evaluación de todos los algoritmos seleccionados
         """
         algorithms_to_run = self.get_algorithms_to_run()
+        n_jobs = self.get_n_jobs()
         
         print(f"\n{'='*60}")
         print(f"INICIO DE EVALUACIÓN")
         print(f"{'='*60}")
         print(f"Dataset: MovieLens {self.dataset_name}")
         print(f"Algoritmos a evaluar: {len(algorithms_to_run)}")
-        print(f"Validación cruzada: {config.CV_FOLDS} folds")
+        if config.SPLIT_STRATEGY == 'kfold':
+            print(f"Validación cruzada: {config.CV_FOLDS} folds")
+        else:
+            print(f"Partición: {config.SPLIT_STRATEGY}")
+        print(f"Procesos en paralelo: {n_jobs}")
         print(f"{'='*60}\n")
         
+        self.prepare_folds()
+        self.open_checkpoint()
+        algorithms_to_run = self.plan_memory(algorithms_to_run, n_jobs)
+        
         total_start_time = time.time()
         
-        for i, algo_name in enumerate(algorithms_to_run, 1):
-            print(f"\n[{i}/{len(algorithms_to_run)}] Procesando {algo_name}...")
-            result = self.evaluate_algorithm(algo_name)
-            self.results.append(result)
+        if n_jobs > 1:
+            self._run_parallel_evaluations(algorithms_to_run, n_jobs)
+        else:
+            for i, algo_name in enumerate(algorithms_to_run, 1):
+                print(f"\n[{i}/{len(algorithms_to_run)}] Procesando {algo_name}...")
+                result = self.evaluate_algorithm(algo_name)
+                self.results.append(result)
+        self.results.extend(self.skipped)
             
         total_time = time.time() - total_start_time
         
@@ -226,7 +1080,8 @@ class MovieLensRecommender:
         
         # Guardar en CSV
         output_path = os.path.join(config.OUTPUT_DIR, config.RESULTS_FILE)
-        df_results.to_csv(output_path, index=False)
+        with telemetry.span('save', target='results'):
+            df_results.to_csv(output_path, index=False)
         
         print(f"✓ Resultados guardados en: {output_path}")
         
@@ -261,6 +1116,12 @@ class MovieLensRecommender:
         print(f"RESUMEN DE RESULTADOS - MovieLens {self.dataset_name}")
         print(f"{'='*80}\n")
         
+        if self.load_stats:
+            print(f"Carga del dataset: {self.load_stats['load_time']:.2f}s", end='')
+            if self.load_stats['peak_rss_mb'] is not None:
+                print(f" | Memoria pico: {self.load_stats['peak_rss_mb']:.1f} MB", end='')
+            print("\n")
+        
         # Ordenar por RMSE
         df_success = df_success.sort_values('RMSE_mean')
         
@@ -289,20 +1150,28 @@ def main():
     print(" Evaluación de Algoritmos con Surprise")
     print("="*60)
     
-    # Crear instancia del recomendador
-    recommender = MovieLensRecommender()
+    # Los tramos de telemetría de esta ejecución (y de sus procesos) comparten id
+    if config.TELEMETRY:
+        telemetry.start_run()
     
-    # Cargar datos
-    recommender.load_data()
-    
-    # Ejecutar evaluaciones
-    recommender.run_all_evaluations()
-    
-    # Mostrar resumen
-    recommender.display_summary()
+    with telemetry.span('run', dataset=config.DATASET):
+        # Crear instancia del recomendador
+        recommender = MovieLensRecommender()
+        
+        # Cargar datos
+        recommender.load_data()
+        
+        # Ejecutar evaluaciones
+        recommender.run_all_evaluations()
+        
+        # Mostrar resumen
+        recommender.display_summary()
+        
+        # Guardar resultados
+        recommender.save_results()
     
-    # Guardar resultados
-    recommender.save_results()
+    if config.TELEMETRY:
+        telemetry.print_summary()
     
     print("\n¡Proceso completado!")
 
@@ -0,0 +1,286 @@
+"""
+Medición y estimación de recursos
+Mide la memoria residente pico, el tiempo de CPU y el tiempo real de cada
+fold, y estima antes de empezar la memoria que necesitará cada algoritmo a
+partir del tamaño del dataset, para no descubrir un algoritmo demasiado
+grande cuando el sistema mata el proceso por falta de memoria
+"""
+
+import os
+import sys
+import time
+import config
+
+
+MB = 1024 ** 2
+
+# Memoria de un fold por rating de entrenamiento: el Trainset de Surprise
+# (ur e ir, listas de tuplas (id, rating) por usuario y por película) y el
+# testset de tuplas del fold (medido: unos 280 bytes)
+TRAINSET_BYTES_PER_RATING = 290
+
+# Fracción del presupuesto de memoria que pueden ocupar los trainsets de
+# todos los folds para conservarlos con KEEP_TRAINSETS_IN_MEMORY = 'auto'
+KEEP_TRAINSETS_BUDGET_SHARE = 0.25
+
+# Fichero de Linux que permite reiniciar el pico de memoria (VmHWM) del proceso
+_CLEAR_REFS = '/proc/self/clear_refs'
+_STATUS = '/proc/self/status'
+
+
+def _status_mb(field):
+    """Valor de un campo de /proc/self/status (VmRSS, VmHWM...) en MB, o None"""
+    try:
+        with open(_STATUS) as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_mb():
+    """
+    Memoria residente pico del proceso en MB (desde el último
+    reset_peak_rss), o None si la plataforma no permite consultarla
+    """
+    peak = _status_mb('VmHWM')
+    if peak is not None:
+        return peak
+
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    if sys.platform == 'darwin':
+        return peak / MB
+    return peak / 1024
+
+
+def current_rss_mb():
+    """Memoria residente actual del proceso en MB (el pico si no se puede consultar)"""
+    current = _status_mb('VmRSS')
+    return current if current is not None else peak_rss_mb()
+
+
+def reset_peak_rss():
+    """
+    Reinicia el pico de memoria del proceso para medir solo lo que viene
+    después (solo Linux)
+
+    Returns:
+        bool: True si se ha reiniciado
+    """
+    try:
+        with open(_CLEAR_REFS, 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def available_memory_mb():
+    """
+    Memoria de la máquina en MB, o el límite del contenedor (cgroup) si es
+    menor. None si no se puede consultar
+    """
+    limits = []
+    try:
+        limits.append(os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / MB)
+    except (ValueError, OSError, AttributeError):
+        pass
+
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.isdigit():
+            limits.append(int(value) / MB)
+
+    return min(limits) if limits else None
+
+
+def memory_budget_mb():
+    """Presupuesto de memoria según config.MEMORY_BUDGET_MB (None = sin límite conocido)"""
+    if config.MEMORY_BUDGET_MB is not None:
+        return config.MEMORY_BUDGET_MB
+    available = available_memory_mb()
+    if available is None:
+        return None
+    return available * config.MEMORY_BUDGET_FRACTION
+
+
+class ResourceMonitor:
+    """
+    Mide un bloque de código:
+
+        with ResourceMonitor() as monitor:
+            ...
+        monitor.stats  # {'peak_rss_mb': ..., 'cpu_time': ..., 'wall_time': ...}
+
+    El tiempo de CPU es el de todo el proceso (incluye los hilos de NumPy y
+    del motor KNN). Donde no se puede reiniciar el pico de memoria, el pico
+    es el del proceso desde que arrancó
+    """
+
+    def __enter__(self):
+        reset_peak_rss()
+        self.stats = {}
+        self._cpu_start = time.process_time()
+        self._wall_start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stats = {
+            'peak_rss_mb': peak_rss_mb(),
+            'cpu_time': time.process_time() - self._cpu_start,
+            'wall_time': time.perf_counter() - self._wall_start,
+        }
+        return False
+
+
+def threads_per_job(setting=None):
+    """
+    Hilos que puede usar cada proceso de la evaluación
+
+    Args:
+        setting: Número de hilos configurado (None o <= 0 = los núcleos
+            repartidos entre los procesos de config.N_JOBS)
+    """
+    if setting is not None and setting > 0:
+        return setting
+    n_jobs = config.N_JOBS if config.N_JOBS and config.N_JOBS > 0 else (os.cpu_count() or 1)
+    return max(1, (os.cpu_count() or 1) // n_jobs)
+
+
+def trainset_memory_mb(n_train):
+    """Memoria aproximada (MB) del trainset y el testset de un fold con n_train ratings de entrenamiento"""
+    return n_train * TRAINSET_BYTES_PER_RATING / MB
+
+
+def keep_trainsets(n_ratings, n_folds):
+    """
+    Indica si los trainsets de los folds se conservan en memoria entre
+    algoritmos según config.KEEP_TRAINSETS_IN_MEMORY. Con 'auto', solo si
+    los n_folds trainsets juntos ocupan como mucho KEEP_TRAINSETS_BUDGET_SHARE
+    del presupuesto de memoria (o si el presupuesto es desconocido)
+
+    Args:
+        n_ratings: Número de ratings del dataset
+        n_folds: Número de folds de la partición
+    """
+    setting = config.KEEP_TRAINSETS_IN_MEMORY
+    if setting != 'auto':
+        return bool(setting)
+    budget = memory_budget_mb()
+    if budget is None:
+        return True
+    n_train = n_ratings * (n_folds - 1) / n_folds if n_folds > 1 else n_ratings
+    return n_folds * trainset_memory_mb(n_train) <= budget * KEEP_TRAINSETS_BUDGET_SHARE
+
+
+def _trains_by_epochs(algo_name):
+    """Indica si el algoritmo del registro es uno de los de factorization.py que admiten parada temprana"""
+    if algo_name == 'SVDpp':
+        return config.USE_FAST_SVDPP
+    if algo_name in ('SVD', 'NMF', 'BaselineOnly'):
+        return config.USE_EPOCH_MODELS
+    return algo_name in ('ALS', 'ParallelSGD')
+
+
+def estimate_memory_mb(algo_name, params, n_users, n_items, n_ratings, sparse_knn=True):
+    """
+    Memoria adicional aproximada (MB) que necesita un algoritmo para
+    entrenarse y evaluarse sobre un fold, sin contar el dataset ni el
+    trainset del fold (ver trainset_memory_mb)
+
+    Las fórmulas cuentan los arrays grandes de cada modelo y de su
+    entrenamiento (matrices de similitud, desviaciones de SlopeOne,
+    factores...), más los bloques de la predicción vectorizada y del ranking
+
+    Args:
+        algo_name: Nombre del algoritmo en el registro
+        params: Parámetros del algoritmo
+        n_users: Número de usuarios
+        n_items: Número de películas
+        n_ratings: Número de ratings del dataset (cada fold entrena con
+            (CV_FOLDS - 1) / CV_FOLDS de ellos)
+        sparse_knn: Si True, los KNN usan el motor disperso de knn.py
+
+    Returns:
+        float: Memoria estimada en MB
+    """
+    default_factors = {'SVD': 100, 'ParallelSGD': 100, 'SVDpp': 20, 'ALS': 50}
+    n_factors = params.get('n_factors', default_factors.get(algo_name, 15))
+    sim_options = params.get('sim_options', {})
+    user_based = sim_options.get('user_based', True)
+    n_x = n_users if user_based else n_items
+    n_folds = max(config.CV_FOLDS, 2)
+    n_train = n_ratings * (n_folds - 1) / n_folds
+    n_test = n_ratings / n_folds
+
+    if algo_name.startswith('KNN') and sparse_knn:
+        n_neighbors = max(params.get('k', 40), config.KNN_MAX_NEIGHBORS)
+        n_neighbors = min(n_neighbors, n_x)
+        # Vecinos (int32 + float32), índice inverso de los KNN por ítem,
+        # CSR por x e y y matrices dispersas del cálculo, y bloques de similitud
+        model = n_x * n_neighbors * 8 * (1 if user_based else 2)
+        model += n_train * (16 + 6 * 12)
+        model += min(config.KNN_BLOCK_MEMORY_MB * MB, n_x * n_x * 64)
+    elif algo_name.startswith('KNN'):
+        # Matriz densa de similitud más las matrices auxiliares del cálculo
+        # (frecuencias, productos, cuadrados... hasta 6 con pearson)
+        name = sim_options.get('name', 'msd').lower()
+        n_matrices = 7 if name == 'pearson' else 5
+        model = n_x * n_x * 8 * n_matrices
+    elif algo_name == 'SlopeOne' and config.USE_SPARSE_SLOPE_ONE:
+        # Pares guardados (columna int32 + desviación float32) y las copias
+        # dispersas de la predicción (desviaciones, pares y sus traspuestas),
+        # CSR de ratings del cálculo y bloques de desviaciones
+        max_pairs = params.get('max_pairs') or n_items
+        model = n_items * min(max_pairs, n_items) * (8 + 4 * 12)
+        model += n_train * 6 * 12
+        model += min(config.SLOPE_ONE_BLOCK_MEMORY_MB * MB, n_items * n_items * 40)
+    elif algo_name == 'SlopeOne':
+        # freq y dev densas n_items x n_items, y sus copias float32 al puntuar
+        model = n_items * n_items * (8 + 8 + 8)
+    elif algo_name in ('SVD', 'SVDpp', 'NMF'):
+        # Factores y sesgos, más los acumuladores de NMF y los yj de SVDpp
+        copies = 3 if algo_name == 'NMF' else 2 if algo_name == 'SVDpp' else 1
+        model = (n_users + n_items) * (n_factors + 1) * 8 * copies
+        if _trains_by_epochs(algo_name):
+            # Minilotes precalculados de cada paso (usuario, ítem, rating y
+            # suma por ítem) y, en NMF, las matrices dispersas de ratings y estimaciones
+            model += n_train * (32 + (3 * 12 if algo_name == 'NMF' else 0))
+    elif algo_name == 'ALS':
+        # Factores float32, CSR por usuario y por película, y bloques de la
+        # resolución (matrices rellenadas y sistemas de cada hilo)
+        from factorization import MAX_BLOCK_CELLS
+        model = (n_users + n_items) * (n_factors + 1) * 4 * 2 + n_train * 2 * 12
+        model += threads_per_job(config.FACTORIZATION_N_THREADS) * MAX_BLOCK_CELLS * 4 * 4
+    elif algo_name == 'ParallelSGD':
+        # Factores float32 y ratings en arrays, más los minilotes de cada hilo
+        model = (n_users + n_items) * (n_factors + 1) * 4 + n_train * 12
+        model += threads_per_job(config.FACTORIZATION_N_THREADS) * params.get('batch_size', 4096) * n_factors * 4 * 8
+    elif algo_name == 'CoClustering':
+        model = (n_users + n_items) * 8 * 6
+    elif algo_name == 'BaselineOnly' and config.USE_EPOCH_MODELS:
+        # Sesgos y minilotes precalculados del SGD (o los arrays de ratings de 'als')
+        model = (n_users + n_items) * 8 * 2 + n_train * 32
+    else:
+        model = (n_users + n_items) * 8 * 2
+
+    if config.EARLY_STOPPING and _trains_by_epochs(algo_name):
+        # Trainset reducido de la parada temprana (sin los ratings de validación)
+        model += n_train * TRAINSET_BYTES_PER_RATING
+
+    # Test vectorizado (pares mapeados) y bloques de ranking (puntuaciones y relevancia)
+    evaluation = n_test * 48 + config.RANKING_BATCH_SIZE * n_items * 16
+
+    return (model + evaluation) / MB
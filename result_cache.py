@@ -0,0 +1,116 @@
+"""
+Caché de resultados direccionada por contenido
+Cada resultado se guarda bajo el hash de todo lo que lo determina (fichero del
+dataset, algoritmo, parámetros, folds, semilla, métricas y versión de la
+librería), de modo que cualquier script que repita una evaluación idéntica lo
+reutiliza
+"""
+
+import os
+import json
+import hashlib
+import surprise
+
+
+# Versión del formato de la caché. Cambiarla invalida todas las entradas
+RESULT_CACHE_VERSION = 1
+
+
+def make_key(dataset_fingerprint, algo_name, params, cv_folds, seed, metrics):
+    """
+    Calcula la clave de una evaluación
+
+    Args:
+        dataset_fingerprint: dict que identifica el fichero del dataset
+        algo_name: Nombre del algoritmo
+        params: Parámetros del algoritmo (config.ALGORITHM_PARAMS)
+        cv_folds: Número de folds
+        seed: Semilla de las particiones
+        metrics: Métricas calculadas (config.METRICS, K y umbral de relevancia)
+
+    Returns:
+        str: Hash SHA-256 en hexadecimal
+    """
+    payload = json.dumps({
+        'version': RESULT_CACHE_VERSION,
+        'surprise': surprise.__version__,
+        'dataset': dataset_fingerprint,
+        'algorithm': algo_name,
+        'params': params,
+        'cv_folds': cv_folds,
+        'seed': seed,
+        'metrics': metrics,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    Caché en disco de filas de resultados con expulsión LRU. Cada entrada es
+    un fichero JSON; la fecha de modificación marca su último uso
+    """
+
+    def __init__(self, cache_dir, max_entries):
+        """
+        Args:
+            cache_dir: Directorio de la caché
+            max_entries: Número máximo de resultados guardados
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.json')
+
+    def get(self, key):
+        """
+        Devuelve el resultado guardado para una clave, o None si no existe
+
+        Args:
+            key: Clave calculada con make_key
+        """
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # Marcar la entrada como usada recientemente
+        os.utime(path)
+        return result
+
+    def put(self, key, result):
+        """
+        Guarda un resultado y expulsa las entradas menos usadas si se supera
+        el límite
+
+        Args:
+            key: Clave calculada con make_key
+            result: Fila de resultados (dict serializable a JSON)
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        path = self._path(key)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, default=float)
+        os.replace(path + '.tmp', path)
+
+        self._evict()
+
+    def _evict(self):
+        """Elimina las entradas usadas hace más tiempo por encima de max_entries"""
+        entries = [
+            os.path.join(self.cache_dir, name)
+            for name in os.listdir(self.cache_dir)
+            if name.endswith('.json')
+        ]
+        if len(entries) <= self.max_entries:
+            return
+
+        entries.sort(key=os.path.getmtime)
+        for path in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,388 @@
+"""
+Puntuación vectorizada de modelos entrenados
+Calcula con operaciones de NumPy las estimaciones de un modelo de Surprise
+para bloques de usuarios frente a todos los ítems, o para todos los pares
+(usuario, ítem) de un testset, sin llamar a algo.predict una vez por cada par
+"""
+
+import numpy as np
+import id_mapping
+
+
+# Modelos cuyos factores y sesgos se exportan a arrays contiguos (ALS y
+# ParallelSGD son los de factorization.py, con los mismos atributos que SVD)
+FACTOR_ALGORITHMS = ('SVD', 'SVDpp', 'NMF', 'BaselineOnly', 'ALS', 'ParallelSGD')
+
+# Modelos de Surprise que BatchScorer sabe puntuar por bloques. Además, se
+# puntúa cualquier modelo con un método estimate_pairs (los KNN de knn.py y
+# SlopeOne de slope_one.py)
+VECTORIZED_ALGORITHMS = FACTOR_ALGORITHMS + ('CoClustering', 'SlopeOne', 'NormalPredictor')
+
+
+def is_vectorized(algo):
+    """Indica si BatchScorer puede puntuar un modelo entrenado"""
+    return type(algo).__name__ in VECTORIZED_ALGORITHMS or hasattr(algo, 'estimate_pairs')
+
+
+def trainset_csr(trainset):
+    """
+    Ítems y ratings de cada usuario del trainset en formato CSR
+
+    Returns:
+        tuple: (indptr int64, ítems internos int32, ratings float32)
+    """
+    lengths = np.array([len(trainset.ur[u]) for u in range(trainset.n_users)], dtype=np.int64)
+    indptr = np.concatenate([[0], np.cumsum(lengths)])
+    items = np.empty(indptr[-1], dtype=np.int32)
+    ratings = np.empty(indptr[-1], dtype=np.float32)
+    for u in range(trainset.n_users):
+        user_ratings = trainset.ur[u]
+        if user_ratings:
+            items[indptr[u]:indptr[u + 1]], ratings[indptr[u]:indptr[u + 1]] = zip(*user_ratings)
+    return indptr, items, ratings
+
+
+def map_testset(trainset, testset):
+    """
+    Traduce en una sola pasada los ids originales de un testset a ids internos
+    del trainset (-1 para usuarios o ítems desconocidos)
+
+    Returns:
+        tuple: (usuarios internos, ítems internos, ratings, código de usuario).
+        El código de usuario agrupa los ratings por usuario original, también
+        los de usuarios desconocidos (necesario para FCP)
+    """
+    if getattr(trainset, 'user_inner_of_code', None) is not None:
+        # Ids codificados: traducción con las tablas código -> id interno del trainset
+        columns = np.array(testset, dtype=np.float64).reshape(-1, 3)
+        codes = columns[:, 0].astype(np.int64)
+        inner_users = id_mapping.translate(trainset.user_inner_of_code, codes)
+        inner_items = id_mapping.translate(trainset.item_inner_of_code, columns[:, 1])
+        user_codes = np.where(inner_users >= 0, inner_users, trainset.n_users + codes)
+        return inner_users, inner_items, columns[:, 2], user_codes
+
+    user_index = trainset._raw2inner_id_users
+    item_index = trainset._raw2inner_id_items
+
+    mapped = np.array(
+        [(user_index.get(ruid, -1), item_index.get(riid, -1), rating) for ruid, riid, rating in testset],
+        dtype=np.float64
+    ).reshape(-1, 3)
+    inner_users = mapped[:, 0].astype(np.int64)
+    inner_items = mapped[:, 1].astype(np.int64)
+
+    user_codes = inner_users.copy()
+    unknown_codes = {}
+    for position in np.flatnonzero(inner_users < 0):
+        ruid = testset[position][0]
+        user_codes[position] = unknown_codes.setdefault(ruid, trainset.n_users + len(unknown_codes))
+
+    return inner_users, inner_items, mapped[:, 2], user_codes
+
+
+def accuracy_metrics(metrics, ratings, estimates, user_codes):
+    """
+    Métricas de error de surprise.accuracy calculadas sobre arrays
+
+    Args:
+        metrics: Nombres de las métricas ('RMSE', 'MAE', 'MSE', 'FCP')
+        ratings: Ratings reales
+        estimates: Predicciones (ya recortadas a la escala de ratings)
+        user_codes: Código del usuario de cada rating (de map_testset)
+
+    Returns:
+        dict: Métrica -> valor
+    """
+    if len(ratings) == 0:
+        raise ValueError("Prediction list is empty.")
+
+    errors = estimates - ratings
+    results = {}
+    for metric in metrics:
+        if metric == 'RMSE':
+            results[metric] = float(np.sqrt(np.mean(errors ** 2)))
+        elif metric == 'MAE':
+            results[metric] = float(np.mean(np.abs(errors)))
+        elif metric == 'MSE':
+            results[metric] = float(np.mean(errors ** 2))
+        elif metric == 'FCP':
+            results[metric] = _fcp(ratings, estimates, user_codes)
+        else:
+            raise ValueError(f"Métrica '{metric}' no soportada")
+    return results
+
+
+def _fcp(ratings, estimates, user_codes):
+    """
+    Fraction of Concordant Pairs con la misma definición que
+    surprise.accuracy.fcp: medias de pares concordantes y discordantes sobre
+    los usuarios que tienen alguno
+    """
+    order = np.argsort(user_codes, kind='stable')
+    bounds = np.flatnonzero(np.diff(user_codes[order])) + 1
+    concordant, discordant = [], []
+    for group in np.split(order, bounds):
+        r, est = ratings[group], estimates[group]
+        n_concordant = np.count_nonzero((est[:, None] > est[None, :]) & (r[:, None] > r[None, :]))
+        n_discordant = np.count_nonzero((est[:, None] >= est[None, :]) & (r[:, None] < r[None, :]))
+        if n_concordant:
+            concordant.append(n_concordant)
+        if n_discordant:
+            discordant.append(n_discordant)
+
+    nc = np.mean(concordant) if concordant else 0
+    nd = np.mean(discordant) if discordant else 0
+    if nc + nd == 0:
+        raise ValueError("cannot compute fcp on this list of prediction. " +
+                         "Does every user have at least two predictions?")
+    return float(nc / (nc + nd))
+
+
+def export_factors(class_name, attributes, global_mean, rated_indptr, rated_indices):
+    """
+    Extrae de un modelo entrenado los arrays necesarios para puntuar todos
+    los ítems de un usuario como  mu + bu[u] + bi + P[u] · Q^T
+
+    Args:
+        class_name: Clase del modelo (una de FACTOR_ALGORITHMS)
+        attributes: Atributos del modelo entrenado (pu, qi, bu, bi, yj, biased...)
+        global_mean: Media global de los ratings de entrenamiento
+        rated_indptr: Punteros CSR de los ítems valorados por cada usuario
+        rated_indices: Índices CSR (ids internos de ítem)
+
+    Returns:
+        dict: 'global_mean', 'user_bias', 'item_bias', 'user_factors' e
+        'item_factors' (float32, contiguos)
+    """
+    if class_name not in FACTOR_ALGORITHMS:
+        raise ValueError(
+            f"El algoritmo {class_name} no expone factores. "
+            f"Soportados: {', '.join(FACTOR_ALGORITHMS)}"
+        )
+
+    n_users = len(rated_indptr) - 1
+    n_items = len(attributes['bi']) if attributes.get('bi') is not None else len(attributes['qi'])
+    user_bias = np.zeros(n_users)
+    item_bias = np.zeros(n_items)
+    user_factors = np.zeros((n_users, 0))
+    item_factors = np.zeros((n_items, 0))
+
+    if class_name == 'BaselineOnly':
+        user_bias, item_bias = attributes['bu'], attributes['bi']
+    else:
+        user_factors, item_factors = attributes['pu'], attributes['qi']
+        if class_name == 'SVDpp':
+            # Factor efectivo del usuario: pu + |N(u)|^-1/2 * sum(y_j, j en N(u))
+            counts = np.diff(rated_indptr)
+            implicit = np.add.reduceat(attributes['yj'][rated_indices], rated_indptr[:-1], axis=0)
+            user_factors = user_factors + implicit / np.sqrt(counts)[:, None]
+        if class_name == 'SVDpp' or attributes['biased']:
+            user_bias, item_bias = attributes['bu'], attributes['bi']
+        else:
+            # Sin sesgos la predicción es solo el producto de factores
+            global_mean = 0.0
+
+    return {
+        'global_mean': np.float32(global_mean),
+        'user_bias': np.ascontiguousarray(user_bias, dtype=np.float32),
+        'item_bias': np.ascontiguousarray(item_bias, dtype=np.float32),
+        'user_factors': np.ascontiguousarray(user_factors, dtype=np.float32),
+        'item_factors': np.ascontiguousarray(item_factors, dtype=np.float32),
+    }
+
+
+class BatchScorer:
+    """
+    Estimaciones de un modelo entrenado para bloques de usuarios internos
+    frente a todos los ítems del trainset
+    """
+
+    def __init__(self, algo, seed=None):
+        """
+        Args:
+            algo: Modelo de Surprise entrenado (con algo.trainset)
+            seed: Semilla de las estimaciones aleatorias de NormalPredictor
+        """
+        self.class_name = type(algo).__name__
+        if not is_vectorized(algo):
+            raise ValueError(
+                f"El algoritmo {self.class_name} no se puede puntuar por bloques. "
+                f"Soportados: {', '.join(VECTORIZED_ALGORITHMS)}"
+            )
+
+        trainset = algo.trainset
+        self.n_items = trainset.n_items
+        self.global_mean = trainset.global_mean
+        self.rating_scale = trainset.rating_scale
+        self.rated_indptr, self.rated_indices, _ = trainset_csr(trainset)
+        self.refresh(algo, seed)
+
+    def refresh(self, algo, seed=None):
+        """
+        Vuelve a leer los parámetros de un modelo entrenado con el mismo
+        trainset (por ejemplo, tras otra época de entrenamiento) sin
+        recalcular la CSR del trainset
+
+        Args:
+            algo: Modelo entrenado (de la misma clase y con el mismo trainset)
+            seed: Semilla de las estimaciones aleatorias de NormalPredictor
+        """
+        trainset = algo.trainset
+
+        # Estimaciones por pares y por usuario del propio modelo (NaN = predicción imposible)
+        self.pair_estimator = getattr(algo, 'estimate_pairs', None)
+        self.user_estimator = getattr(algo, 'estimate_users', None)
+
+        if self.pair_estimator is not None:
+            pass
+        elif self.class_name in FACTOR_ALGORITHMS:
+            self.factors = export_factors(
+                self.class_name, vars(algo), trainset.global_mean,
+                self.rated_indptr, self.rated_indices
+            )
+            # Sin sesgos, predict() solo puede estimar pares con usuario e ítem conocidos
+            self.biased = self.class_name in ('BaselineOnly', 'SVDpp') or algo.biased
+        elif self.class_name == 'CoClustering':
+            # est = avg_cocltr[cu, ci] + (user_mean[u] - avg_cltr_u[cu]) + (item_mean[i] - avg_cltr_i[ci])
+            self.cltr_u = np.asarray(algo.cltr_u)
+            self.cltr_i = np.asarray(algo.cltr_i)
+            self.avg_cocltr = np.asarray(algo.avg_cocltr)
+            self.user_offset = np.asarray(algo.user_mean) - np.asarray(algo.avg_cltr_u)[self.cltr_u]
+            self.item_offset = np.asarray(algo.item_mean) - np.asarray(algo.avg_cltr_i)[self.cltr_i]
+        elif self.class_name == 'SlopeOne':
+            # est = user_mean[u] + media de dev[i, j] sobre los j valorados por u con freq[i, j] > 0
+            # (dev no está definido donde freq es 0)
+            common = np.asarray(algo.freq) > 0
+            self.user_mean = np.asarray(algo.user_mean)
+            self.dev_t = np.ascontiguousarray(np.where(common, algo.dev, 0.0).T, dtype=np.float32)
+            self.common_t = np.ascontiguousarray(common.T, dtype=np.float32)
+        else:
+            self.sigma = algo.sigma
+            self.rng = np.random.RandomState(seed)
+
+    def rated_mask(self, inner_users):
+        """
+        Posiciones (fila del bloque, ítem) ya valoradas en el trainset
+
+        Returns:
+            tuple: (filas, ítems) para indexar una matriz de puntuaciones
+        """
+        starts = self.rated_indptr[inner_users]
+        lengths = self.rated_indptr[inner_users + 1] - starts
+        rows = np.repeat(np.arange(len(inner_users)), lengths)
+        positions = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return rows, self.rated_indices[np.repeat(starts, lengths) + positions]
+
+    def score_users(self, inner_users):
+        """
+        Estimaciones (sin recortar a la escala de ratings) de todos los ítems
+        para un bloque de usuarios conocidos por el trainset
+
+        Args:
+            inner_users: Array de ids internos de usuario
+
+        Returns:
+            np.ndarray: Matriz float32 (len(inner_users), n_items)
+        """
+        inner_users = np.asarray(inner_users, dtype=np.int64)
+
+        if self.user_estimator is not None:
+            scores = self.user_estimator(inner_users)
+            return np.where(np.isnan(scores), self.global_mean, scores).astype(np.float32)
+
+        if self.pair_estimator is not None:
+            pair_users = np.repeat(inner_users, self.n_items)
+            pair_items = np.tile(np.arange(self.n_items), len(inner_users))
+            scores = self._estimate_pairs(pair_users, pair_items)
+            return scores.reshape(len(inner_users), self.n_items).astype(np.float32)
+
+        if self.class_name in FACTOR_ALGORITHMS:
+            f = self.factors
+            scores = f['user_factors'][inner_users] @ f['item_factors'].T
+            scores += f['user_bias'][inner_users][:, None]
+            scores += f['global_mean'] + f['item_bias']
+            return scores
+
+        if self.class_name == 'CoClustering':
+            scores = self.avg_cocltr[self.cltr_u[inner_users]][:, self.cltr_i]
+            scores += self.user_offset[inner_users][:, None]
+            scores += self.item_offset
+            return scores.astype(np.float32)
+
+        if self.class_name == 'SlopeOne':
+            rated = np.zeros((len(inner_users), self.n_items), dtype=np.float32)
+            rated[self.rated_mask(inner_users)] = 1.0
+            total_dev = rated @ self.dev_t
+            n_common = rated @ self.common_t
+            scores = np.divide(total_dev, n_common, out=np.zeros_like(total_dev), where=n_common > 0)
+            scores += self.user_mean[inner_users][:, None]
+            return scores
+
+        return self.rng.normal(
+            self.global_mean, self.sigma, size=(len(inner_users), self.n_items)
+        ).astype(np.float32)
+
+    def predict_pairs(self, inner_users, inner_items, batch_size=262144):
+        """
+        Predicciones para pares (usuario, ítem) con el mismo resultado que
+        algo.predict: los usuarios o ítems desconocidos (-1) se tratan como en
+        estimate(), las predicciones imposibles reciben la media global y todo
+        se recorta a la escala de ratings
+
+        Args:
+            inner_users: Array de ids internos de usuario (-1 = desconocido)
+            inner_items: Array de ids internos de ítem (-1 = desconocido)
+            batch_size: Pares calculados a la vez (acota la memoria)
+
+        Returns:
+            np.ndarray: Predicciones float64
+        """
+        estimates = np.empty(len(inner_users))
+        for start in range(0, len(inner_users), batch_size):
+            stop = start + batch_size
+            estimates[start:stop] = self._estimate_pairs(inner_users[start:stop], inner_items[start:stop])
+        return np.clip(estimates, *self.rating_scale)
+
+    def _estimate_pairs(self, inner_users, inner_items):
+        """Estimaciones sin recortar de un bloque de pares"""
+        known_user = inner_users >= 0
+        known_item = inner_items >= 0
+        both = known_user & known_item
+        users = np.where(known_user, inner_users, 0)
+        items = np.where(known_item, inner_items, 0)
+
+        if self.pair_estimator is not None:
+            estimates = self.pair_estimator(inner_users, inner_items)
+            return np.where(np.isnan(estimates), self.global_mean, estimates)
+
+        if self.class_name in FACTOR_ALGORITHMS:
+            f = self.factors
+            dot = np.einsum('ij,ij->i', f['user_factors'][users], f['item_factors'][items])
+            if not self.biased:
+                return np.where(both, dot, self.global_mean)
+            return (self.global_mean
+                    + np.where(known_user, f['user_bias'][users], 0.0)
+                    + np.where(known_item, f['item_bias'][items], 0.0)
+                    + np.where(both, dot, 0.0))
+
+        if self.class_name == 'CoClustering':
+            estimates = (self.avg_cocltr[self.cltr_u[users], self.cltr_i[items]]
+                         + self.user_offset[users] + self.item_offset[items])
+            return np.where(both, estimates, self.global_mean)
+
+        if self.class_name == 'SlopeOne':
+            # Se puntúan bloques de usuarios y se recogen los ítems de cada par
+            estimates = np.full(len(inner_users), self.global_mean)
+            positions = np.flatnonzero(both)
+            positions = positions[np.argsort(users[positions], kind='stable')]
+            block_users, starts = np.unique(users[positions], return_index=True)
+            starts = np.append(starts, len(positions))
+            for first in range(0, len(block_users), 256):
+                last = min(first + 256, len(block_users))
+                scores = self.score_users(block_users[first:last])
+                selected = positions[starts[first]:starts[last]]
+                rows = np.searchsorted(block_users[first:last], users[selected])
+                estimates[selected] = scores[rows, items[selected]]
+            return estimates
+
+        return self.rng.normal(self.global_mean, self.sigma, size=len(inner_users))
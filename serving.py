@@ -0,0 +1,220 @@
+"""
+Servicio de recomendaciones top-N
+Exporta los factores y sesgos de un modelo entrenado (SVD, SVDpp, NMF o
+BaselineOnly) a arrays contiguos de NumPy y responde consultas "top N
+películas para el usuario u" con un producto matriz-vector y argpartition
+"""
+
+import time
+import numpy as np
+import config
+import model_store
+from scoring import export_factors, trainset_csr
+
+
+class TopNRecommender:
+    """
+    Índice de factores precalculado que responde consultas top-N
+    """
+
+    def __init__(self, factors, rated_indptr, rated_indices, raw_user_ids, raw_item_ids):
+        """
+        Args:
+            factors: dict devuelto por export_factors
+            rated_indptr: Punteros CSR de los ítems ya valorados por usuario
+            rated_indices: Índices CSR (ids internos de ítem)
+            raw_user_ids: Array con el id original de cada usuario interno
+            raw_item_ids: Array con el id original de cada ítem interno
+        """
+        self.global_mean = factors['global_mean']
+        self.user_bias = factors['user_bias']
+        self.item_bias = factors['item_bias']
+        self.user_factors = factors['user_factors']
+        self.item_factors = factors['item_factors']
+
+        self.rated_indptr = rated_indptr
+        self.rated_indices = rated_indices
+        self.raw_item_ids = list(raw_item_ids)
+        self.user_index = {raw: inner for inner, raw in enumerate(raw_user_ids)}
+
+        # Puntuación que no depende del usuario, precalculada una sola vez
+        self.item_offset = self.global_mean + self.item_bias
+
+        # Latencias de cada llamada: (número de consultas, segundos)
+        self.latencies = []
+
+    @classmethod
+    def from_algorithm(cls, algo, id_mapping=None):
+        """
+        Construye el índice a partir de un modelo entrenado
+
+        Args:
+            algo: Modelo de Surprise entrenado (con algo.trainset)
+            id_mapping: IdMapping del dataset si el modelo se entrenó con ids
+                codificados; el índice se consulta con los ids originales
+        """
+        trainset = algo.trainset
+
+        rated_indptr, rated_indices, _ = trainset_csr(trainset)
+
+        raw_user_ids = [trainset.to_raw_uid(u) for u in range(trainset.n_users)]
+        raw_item_ids = [trainset.to_raw_iid(i) for i in range(trainset.n_items)]
+        if id_mapping is not None:
+            raw_user_ids = id_mapping.decode_users(raw_user_ids).tolist()
+            raw_item_ids = id_mapping.decode_items(raw_item_ids).tolist()
+
+        factors = export_factors(
+            type(algo).__name__, vars(algo), trainset.global_mean, rated_indptr, rated_indices
+        )
+        return cls(factors, rated_indptr, rated_indices, raw_user_ids, raw_item_ids)
+
+    @classmethod
+    def from_saved(cls, model_dir):
+        """
+        Construye el índice a partir de un modelo guardado con model_store,
+        abriendo sus arrays con mmap y sin reconstruir el trainset
+
+        Args:
+            model_dir: Directorio del modelo guardado
+        """
+        meta, arrays = model_store.load_arrays(model_dir)
+        attributes = dict(meta['attributes'], **arrays)
+
+        factors = export_factors(
+            meta['class'], attributes, meta['global_mean'], arrays['ur_indptr'], arrays['ur_items']
+        )
+        return cls(factors, arrays['ur_indptr'], arrays['ur_items'],
+                   arrays['raw_user_ids'].tolist(), arrays['raw_item_ids'].tolist())
+
+    def _score_block(self, inner_users):
+        """
+        Puntúa todos los ítems para un bloque de usuarios internos. Los
+        usuarios desconocidos (-1) reciben solo la parte común (mu + bi)
+
+        Returns:
+            np.ndarray: Matriz (len(inner_users), n_items)
+        """
+        known = inner_users >= 0
+        safe_users = np.where(known, inner_users, 0)
+
+        scores = self.user_factors[safe_users] @ self.item_factors.T
+        scores += self.user_bias[safe_users][:, None]
+        scores[~known] = 0.0
+        scores += self.item_offset
+
+        # Excluir los ítems que el usuario ya ha valorado
+        for row, u in enumerate(inner_users):
+            if u >= 0:
+                scores[row, self.rated_indices[self.rated_indptr[u]:self.rated_indptr[u + 1]]] = -np.inf
+        return scores
+
+    def _top_n(self, scores, n):
+        """Índices y puntuaciones de los n mejores ítems de cada fila"""
+        n = min(n, scores.shape[1])
+        top = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+    def recommend_batch(self, raw_users, n=10):
+        """
+        Top-N para un lote de usuarios
+
+        Args:
+            raw_users: Lista de ids originales de usuario
+            n: Número de recomendaciones por usuario
+
+        Returns:
+            list: Para cada usuario, lista de tuplas (id de película, puntuación)
+        """
+        start_time = time.perf_counter()
+
+        inner_users = np.array([self.user_index.get(u, -1) for u in raw_users], dtype=np.int64)
+        top, top_scores = self._top_n(self._score_block(inner_users), n)
+
+        recommendations = [
+            [(self.raw_item_ids[i], float(score)) for i, score in zip(row, row_scores)
+             if np.isfinite(score)]
+            for row, row_scores in zip(top, top_scores)
+        ]
+
+        self.latencies.append((len(raw_users), time.perf_counter() - start_time))
+        return recommendations
+
+    def recommend(self, raw_user, n=10):
+        """
+        Top-N para un único usuario
+
+        Args:
+            raw_user: Id original del usuario
+            n: Número de recomendaciones
+
+        Returns:
+            list: Lista de tuplas (id de película, puntuación)
+        """
+        return self.recommend_batch([raw_user], n)[0]
+
+    def latency_report(self):
+        """
+        Percentiles de latencia de las llamadas registradas, por lote y por
+        consulta (tiempo del lote repartido entre sus usuarios)
+
+        Returns:
+            dict: p50/p99 en milisegundos y número de lotes y consultas
+        """
+        if not self.latencies:
+            return {}
+
+        sizes = np.array([size for size, _ in self.latencies])
+        seconds = np.array([elapsed for _, elapsed in self.latencies])
+        per_query = seconds / sizes
+        return {
+            'batches': len(self.latencies),
+            'queries': int(sizes.sum()),
+            'batch_p50_ms': np.percentile(seconds, 50) * 1000,
+            'batch_p99_ms': np.percentile(seconds, 99) * 1000,
+            'query_p50_ms': np.percentile(per_query, 50) * 1000,
+            'query_p99_ms': np.percentile(per_query, 99) * 1000,
+        }
+
+
+def main():
+    """
+    Entrena el algoritmo de config.SERVING_ALGORITHM con todos los datos,
+    construye el índice y mide la latencia de consultas individuales y por lotes
+    """
+    from recommender import MovieLensRecommender
+
+    print("\n" + "="*60)
+    print(" SERVICIO DE RECOMENDACIONES TOP-N")
+    print("="*60)
+
+    recommender = MovieLensRecommender()
+    recommender.load_data()
+
+    algo_name = config.SERVING_ALGORITHM
+    print(f"Entrenando {algo_name} con todos los datos...")
+    algo = recommender.fit_full_model(algo_name)
+
+    server = TopNRecommender.from_algorithm(algo, recommender.id_mapping)
+    users = list(server.user_index.keys())
+    n = config.SERVING_TOP_N
+
+    example_user = users[0]
+    print(f"\nTop {n} para el usuario {example_user}:")
+    for rank, (item, score) in enumerate(server.recommend(example_user, n), 1):
+        print(f"  {rank:>2}. Película {item:<10} puntuación {score:.4f}")
+
+    for batch_size in [1, config.SERVING_BATCH_SIZE]:
+        server.latencies = []
+        for start in range(0, len(users), batch_size):
+            server.recommend_batch(users[start:start + batch_size], n)
+
+        report = server.latency_report()
+        print(f"\nLotes de {batch_size} usuarios ({report['batches']} lotes, {report['queries']} consultas):")
+        print(f"  Por lote:     p50 {report['batch_p50_ms']:.3f} ms | p99 {report['batch_p99_ms']:.3f} ms")
+        print(f"  Por consulta: p50 {report['query_p50_ms']:.3f} ms | p99 {report['query_p99_ms']:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+SlopeOne disperso
+Versión de SlopeOne que calcula las desviaciones entre películas por bloques
+de filas con productos dispersos y solo guarda los pares valorados a la vez
+por algún usuario (opcionalmente, solo los de más soporte). Las matrices
+densas n_items x n_items de Surprise (unos 60 GB en ml-32m) se sustituyen por
+una matriz CSR cuyo tamaño se acota con min_support y max_pairs
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from scipy import sparse
+from surprise import AlgoBase, PredictionImpossible
+import config
+import resources
+from scoring import trainset_csr
+
+
+# Entradas dispersas (ratings de los usuarios + pares de las películas)
+# procesadas a la vez al estimar pares sueltos
+MAX_PAIR_CELLS = 4_000_000
+
+
+def _n_threads():
+    """Hilos para calcular bloques de desviaciones según config.SLOPE_ONE_N_THREADS"""
+    return resources.threads_per_job(config.SLOPE_ONE_N_THREADS)
+
+
+def pair_deviations(values, min_support=1, max_pairs=None, verbose=False):
+    """
+    Desviaciones medias entre las filas (películas) de una matriz CSR de
+    ratings, calculadas por bloques de filas
+
+    Para cada par (i, j), freq = B·Bᵀ cuenta los usuarios que valoraron ambas
+    y la suma de r_ui - r_uj sobre ellos es V·Bᵀ - B·Vᵀ (B es la matriz
+    binaria de ratings), de modo que cada bloque ocupa block x n_items valores
+
+    Args:
+        values: Matriz CSR (n_items, n_users) con los ratings
+        min_support: Mínimo de usuarios en común para guardar un par
+        max_pairs: Si no es None, pares guardados por película (los de más
+            usuarios en común; los empates, por id de película)
+        verbose: Si True, informa del cálculo
+
+    Returns:
+        tuple: (indptr int64, columnas int32, desviaciones float32) de la
+        matriz CSR (n_items, n_items) de pares guardados, con las columnas de
+        cada fila ordenadas. Los pares con desviación 0 se guardan igualmente
+    """
+    n_items = values.shape[0]
+    min_support = max(1, min_support)
+    if max_pairs is not None:
+        max_pairs = max(1, min(max_pairs, n_items))
+
+    binary = values.copy()
+    binary.data[:] = 1.0
+    values_t, binary_t = values.T.tocsr(), binary.T.tocsr()
+
+    n_threads = _n_threads()
+    # Unas 5 matrices (bloque x n_items) float64 vivas por hilo
+    block_size = int(config.SLOPE_ONE_BLOCK_MEMORY_MB * 1024 ** 2 / (n_threads * 8 * 5 * n_items))
+    block_size = max(1, min(block_size, n_items))
+
+    if verbose:
+        kept = 'todos los pares' if max_pairs is None else f'{max_pairs} pares por película'
+        print(f"Calculando desviaciones por bloques de {block_size} películas "
+              f"({n_threads} hilos, {kept}, soporte mínimo {min_support})...")
+
+    def compute_block(start):
+        stop = min(start + block_size, n_items)
+        block_values, block_binary = values[start:stop], binary[start:stop]
+
+        freq = (block_binary @ binary_t).toarray()
+        diff = (block_values @ binary_t).toarray()
+        diff -= (block_binary @ values_t).toarray()
+
+        keep = freq >= min_support
+        if max_pairs is not None and max_pairs < n_items:
+            # Más soporte primero; a igual soporte, menor id de película
+            rank = np.where(keep, freq * n_items + (n_items - 1 - np.arange(n_items)), -1.0)
+            top = np.argpartition(-rank, max_pairs - 1, axis=1)[:, :max_pairs]
+            rows = np.arange(stop - start)[:, None]
+            selected = np.zeros_like(keep)
+            selected[rows, top] = keep[rows, top]
+            keep = selected
+
+        rows, cols = np.nonzero(keep)
+        deviations = (diff[rows, cols] / freq[rows, cols]).astype(np.float32)
+        return np.bincount(rows, minlength=stop - start), cols.astype(np.int32), deviations
+
+    starts = range(0, n_items, block_size)
+    if n_threads > 1:
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            blocks = list(executor.map(compute_block, starts))
+    else:
+        blocks = [compute_block(start) for start in starts]
+
+    counts, cols, deviations = (np.concatenate(arrays) for arrays in zip(*blocks))
+    indptr = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    return indptr, cols, deviations
+
+
+class SlopeOne(AlgoBase):
+    """
+    r_ui = mu_u + media de dev(i, j) sobre las películas j valoradas por u
+    que comparten usuarios con i, como en Surprise
+
+    Con min_support = 1 y max_pairs = None el resultado es el de SlopeOne de
+    Surprise. Un min_support mayor descarta las desviaciones con pocos
+    usuarios en común y max_pairs limita los pares guardados por película
+    (la matriz ocupa como mucho n_items x max_pairs x 8 bytes)
+    """
+
+    def __init__(self, min_support=1, max_pairs=None, verbose=False):
+        AlgoBase.__init__(self)
+        self.min_support = min_support
+        self.max_pairs = max_pairs
+        self.verbose = verbose
+
+    def fit(self, trainset):
+        AlgoBase.fit(self, trainset)
+
+        indptr, items, ratings = trainset_csr(trainset)
+        counts = np.diff(indptr)
+        users = np.repeat(np.arange(trainset.n_users), counts)
+        ratings = ratings.astype(np.float64)
+        self.user_mean = np.bincount(users, weights=ratings, minlength=trainset.n_users) / np.maximum(counts, 1)
+
+        values = sparse.csr_matrix((ratings, (items, users)), shape=(trainset.n_items, trainset.n_users))
+        values.sort_indices()
+        self.dev_indptr, self.dev_cols, self.dev_values = pair_deviations(
+            values, self.min_support, self.max_pairs, self.verbose
+        )
+        self._matrices = None
+        return self
+
+    def _prepare(self):
+        """
+        Matrices dispersas de la predicción (se construyen una vez, también
+        en los modelos recuperados con model_store): ratings por usuario,
+        desviaciones y pares guardados por película, y sus traspuestas
+        """
+        if getattr(self, '_matrices', None) is None:
+            indptr, items, _ = trainset_csr(self.trainset)
+            n_users, n_items = self.trainset.n_users, self.trainset.n_items
+            rated = sparse.csr_matrix((np.ones(len(items)), items, indptr), shape=(n_users, n_items))
+            dev = sparse.csr_matrix((self.dev_values.astype(np.float64), self.dev_cols, self.dev_indptr),
+                                    shape=(n_items, n_items))
+            common = sparse.csr_matrix((np.ones(len(self.dev_cols)), self.dev_cols, self.dev_indptr),
+                                       shape=(n_items, n_items))
+            self._matrices = (rated, dev, common, dev.T.tocsr(), common.T.tocsr())
+        return self._matrices
+
+    def _finish(self, users, total_dev, n_common):
+        """Media de usuario más la desviación media (0 si no hay pares)"""
+        averaged = np.divide(total_dev, n_common, out=np.zeros_like(total_dev), where=n_common > 0)
+        return self.user_mean[users] + averaged
+
+    def estimate_pairs(self, inner_users, inner_items):
+        """
+        Estimaciones vectorizadas para pares (usuario, ítem) con ids internos
+        (-1 = desconocido). Las predicciones imposibles se devuelven como NaN
+
+        Para cada par se multiplican elemento a elemento la fila de ratings
+        del usuario y la fila de desviaciones de la película, por tramos de
+        hasta MAX_PAIR_CELLS entradas
+
+        Returns:
+            np.ndarray: Estimaciones float64 sin recortar
+        """
+        inner_users = np.asarray(inner_users, dtype=np.int64)
+        inner_items = np.asarray(inner_items, dtype=np.int64)
+        rated, dev, common, _, _ = self._prepare()
+
+        estimates = np.full(len(inner_users), np.nan)
+        known = np.flatnonzero((inner_users >= 0) & (inner_items >= 0))
+        users, items = inner_users[known], inner_items[known]
+
+        cells = np.cumsum(np.diff(rated.indptr)[users] + np.diff(dev.indptr)[items])
+        total_cells = cells[-1] if len(cells) else 0
+        bounds = np.searchsorted(cells, np.arange(MAX_PAIR_CELLS, total_cells, MAX_PAIR_CELLS), side='right')
+        bounds = np.unique(np.r_[0, bounds, len(known)])
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            user_rows = rated[users[start:stop]]
+            total_dev = np.asarray(user_rows.multiply(dev[items[start:stop]]).sum(axis=1)).ravel()
+            n_common = np.asarray(user_rows.multiply(common[items[start:stop]]).sum(axis=1)).ravel()
+            estimates[known[start:stop]] = self._finish(users[start:stop], total_dev, n_common)
+        return estimates
+
+    def estimate_users(self, inner_users):
+        """
+        Estimaciones de todos los ítems para cada usuario (ids internos
+        conocidos)
+
+        Returns:
+            np.ndarray: Matriz float64 (len(inner_users), n_items) sin recortar
+        """
+        inner_users = np.asarray(inner_users, dtype=np.int64)
+        rated, _, _, dev_t, common_t = self._prepare()
+        user_rows = rated[inner_users]
+        total_dev = (user_rows @ dev_t).toarray()
+        n_common = (user_rows @ common_t).toarray()
+        return self._finish(inner_users[:, None], total_dev, n_common)
+
+    def estimate(self, u, i):
+        if not (self.trainset.knows_user(u) and self.trainset.knows_item(i)):
+            raise PredictionImpossible('User and/or item is unkown.')
+
+        # Búsqueda binaria de las películas de u en la fila (ordenada) de i
+        cols = self.dev_cols[self.dev_indptr[i]:self.dev_indptr[i + 1]]
+        rated = np.fromiter((j for (j, _) in self.trainset.ur[u]), dtype=np.int64)
+        positions = np.minimum(np.searchsorted(cols, rated), max(len(cols) - 1, 0))
+        found = positions[cols[positions] == rated] if len(cols) else positions[:0]
+        if not len(found):
+            return self.user_mean[u]
+        return self.user_mean[u] + self.dev_values[self.dev_indptr[i] + found].astype(np.float64).mean()
@@ -0,0 +1,394 @@
+"""
+Generador de datasets sintéticos con la forma de MovieLens
+Produce ratings con popularidad de usuarios y películas en ley de potencias y
+una distribución de ratings ajustada a las estadísticas de un dataset real, y
+los escribe por bloques en el mismo formato que ml-32m (ratings.csv) o ml-100k
+(u.data), con memoria constante respecto al número de ratings. Con
+DATASET = 'synthetic' el recomendador genera y carga el dataset configurado
+
+Uso:
+    python synthetic.py
+"""
+
+import os
+import json
+import time
+import numpy as np
+import pandas as pd
+from scipy.special import ndtri
+import config
+import ratings_cache
+
+
+# Perfil usado cuando el dataset de referencia no está descargado
+# (estadísticas aproximadas de ml-100k)
+DEFAULT_PROFILE = {
+    'rating_values': [1.0, 2.0, 3.0, 4.0, 5.0],
+    'rating_probs': [0.061, 0.114, 0.271, 0.342, 0.212],
+    'user_exponent': 0.6,
+    'item_exponent': 1.0,
+    'min_user_ratings': 20,
+    'ratings_per_user': 106.0,
+    'items_per_sqrt_rating': 5.3,
+    'user_bias_var': 0.19,
+    'item_bias_var': 0.26,
+    'rating_var': 1.27,
+    'timestamp_range': [874724710, 893286638],
+}
+
+# Fichero con el perfil y los parámetros del dataset generado
+PROFILE_FILE = 'profile.json'
+
+
+def _power_law_exponent(counts):
+    """Pendiente (en valor absoluto) de log(frecuencia) frente a log(rango)"""
+    counts = np.sort(counts)[::-1]
+    ranks = np.arange(1, len(counts) + 1)
+    slope = np.polyfit(np.log(ranks), np.log(counts), 1)[0]
+    return float(max(-slope, 0.0))
+
+
+def profile_from_ratings(ratings):
+    """
+    Estadísticas de un dataset que el generador reproduce
+
+    Args:
+        ratings: dict con los arrays 'user', 'item', 'rating' y 'timestamp'
+
+    Returns:
+        dict: Perfil con el mismo formato que DEFAULT_PROFILE
+    """
+    values = np.asarray(ratings['rating'], dtype=np.float64)
+    _, user_codes = np.unique(ratings['user'], return_inverse=True)
+    _, item_codes = np.unique(ratings['item'], return_inverse=True)
+    user_counts = np.bincount(user_codes)
+    item_counts = np.bincount(item_codes)
+
+    rating_values, rating_counts = np.unique(values, return_counts=True)
+    mean = values.mean()
+    # Varianza de las medias por usuario y por película: qué parte de la
+    # varianza de los ratings explican los sesgos
+    user_means = np.bincount(user_codes, weights=values) / user_counts
+    item_means = np.bincount(item_codes, weights=values) / item_counts
+    timestamps = np.asarray(ratings['timestamp'])
+
+    return {
+        'rating_values': rating_values.tolist(),
+        'rating_probs': (rating_counts / len(values)).tolist(),
+        'user_exponent': _power_law_exponent(user_counts),
+        'item_exponent': _power_law_exponent(item_counts),
+        'min_user_ratings': int(user_counts.min()),
+        'ratings_per_user': float(len(values) / len(user_counts)),
+        'items_per_sqrt_rating': float(len(item_counts) / np.sqrt(len(values))),
+        'user_bias_var': float(np.average((user_means - mean) ** 2, weights=user_counts)),
+        'item_bias_var': float(np.average((item_means - mean) ** 2, weights=item_counts)),
+        'rating_var': float(values.var()),
+        'timestamp_range': [int(timestamps.min()), int(timestamps.max())],
+    }
+
+
+def reference_profile(dataset_name):
+    """
+    Perfil del dataset de referencia, leído de la caché binaria (o
+    DEFAULT_PROFILE si el dataset no está descargado)
+    """
+    if dataset_name == '100k':
+        paths, parser = config.DATASET_PATHS['100k'], ratings_cache.parse_100k
+        file_path = paths['full']
+    elif dataset_name == '32m':
+        paths, parser = config.DATASET_PATHS['32m'], ratings_cache.parse_32m
+        file_path = paths['ratings']
+    else:
+        raise ValueError(f"Dataset de referencia '{dataset_name}' no reconocido. Use '100k' o '32m'")
+
+    try:
+        source_path = ratings_cache.find_source(file_path, paths.get('zip'))
+    except FileNotFoundError:
+        return dict(DEFAULT_PROFILE)
+    ratings, _ = ratings_cache.load_ratings(source_path, parser)
+    return profile_from_ratings(ratings)
+
+
+def dataset_shape(profile, n_ratings, n_users=None, n_items=None):
+    """
+    Usuarios y películas del dataset generado. Por defecto, los usuarios
+    crecen con los ratings (mismos ratings por usuario que la referencia) y
+    las películas con su raíz cuadrada, como entre ml-100k y ml-32m
+
+    Returns:
+        tuple: (n_users, n_items)
+    """
+    if n_users is None:
+        n_users = int(round(n_ratings / profile['ratings_per_user']))
+    if n_items is None:
+        n_items = int(round(profile['items_per_sqrt_rating'] * np.sqrt(n_ratings)))
+    return max(n_users, 1), max(n_items, 2)
+
+
+def _user_counts(profile, n_ratings, n_users, n_items, rng):
+    """
+    Ratings de cada usuario en ley de potencias sobre su rango de actividad,
+    acotados entre el mínimo de la referencia y la mitad de las películas, en
+    orden aleatorio para que el id no indique la actividad. Los recuentos
+    suman exactamente n_ratings salvo que no quepan en esas cotas
+    """
+    max_per_user = max(n_items // 2, 1)
+    min_ratings = min(profile['min_user_ratings'], n_ratings // n_users, max_per_user)
+    weights = np.arange(1, n_users + 1, dtype=np.float64) ** -profile['user_exponent']
+
+    # Escala de la ley de potencias con la que los ratings acotados suman n_ratings
+    low, high = 0.0, float(n_ratings)
+    for _ in range(60):
+        scale = (low + high) / 2
+        if np.clip(scale * weights, min_ratings, max_per_user).sum() < n_ratings:
+            low = scale
+        else:
+            high = scale
+    counts = np.clip(np.round(high * weights), min_ratings, max_per_user).astype(np.int64)
+
+    # El redondeo deja una diferencia pequeña, que se reparte de uno en uno
+    # entre los usuarios más activos que tengan margen
+    diff = n_ratings - int(counts.sum())
+    while diff != 0:
+        room = np.flatnonzero(counts < max_per_user if diff > 0 else counts > min_ratings)
+        if not len(room):
+            break
+        chosen = room[:abs(diff)]
+        counts[chosen] += np.sign(diff)
+        diff -= int(np.sign(diff)) * len(chosen)
+    return counts[rng.permutation(n_users)]
+
+
+def _sample_items(counts, item_cdf, item_weights, rng, max_rounds=10):
+    """
+    Películas distintas de cada usuario de un bloque, con probabilidad
+    proporcional a su popularidad (muestreo sin reemplazo)
+
+    Las repeticiones se vuelven a sortear hasta que cada usuario tiene sus
+    counts[u] películas; los pocos usuarios muy activos que siguen sin
+    completarlas tras max_rounds sorteos eligen las que les faltan con un
+    muestreo ponderado exacto (Efraimidis-Spirakis) entre las que no tienen
+
+    Returns:
+        tuple: (usuarios del bloque, películas), ordenados por usuario y película
+    """
+    n_users, n_items = len(counts), len(item_cdf)
+    keys = np.empty(0, dtype=np.int64)
+    missing = counts.copy()
+    for _ in range(max_rounds):
+        if not missing.any():
+            break
+        users = np.repeat(np.arange(n_users, dtype=np.int64), missing)
+        items = np.minimum(np.searchsorted(item_cdf, rng.random_sample(len(users))), n_items - 1)
+        keys = np.unique(np.concatenate([keys, users * n_items + items]))
+        missing = counts - np.bincount(keys // n_items, minlength=n_users)
+
+    extra = []
+    for user in np.flatnonzero(missing):
+        start, stop = np.searchsorted(keys, [user * n_items, (user + 1) * n_items])
+        with np.errstate(divide='ignore'):
+            priority = np.log(rng.random_sample(n_items)) / item_weights
+        priority[keys[start:stop] % n_items] = -np.inf
+        chosen = np.argpartition(-priority, missing[user] - 1)[:missing[user]]
+        extra.append(user * n_items + chosen)
+    if extra:
+        keys = np.sort(np.concatenate([keys] + extra))
+    return keys // n_items, keys % n_items
+
+
+def iter_synthetic_chunks(profile, n_ratings, n_users, n_items, seed, chunksize):
+    """
+    Genera los ratings por bloques de unos chunksize ratings (usuarios
+    completos). La memoria solo depende del número de usuarios y películas
+
+    Cada rating es el cuantil de la distribución de ratings de la referencia
+    que corresponde a sesgo del usuario + sesgo de la película + ruido
+    gaussiano, de modo que la distribución global coincide con la de la
+    referencia y los usuarios y películas tienen medias distintas
+
+    Args:
+        profile: Perfil (ver profile_from_ratings)
+        n_ratings: Ratings a generar (cada usuario puntúa películas distintas)
+        n_users: Número de usuarios
+        n_items: Número de películas
+        seed: Semilla del generador
+        chunksize: Ratings aproximados por bloque
+
+    Yields:
+        dict: Arrays 'user', 'item', 'rating' y 'timestamp' de cada bloque
+    """
+    rng = np.random.RandomState(seed)
+    counts = _user_counts(profile, n_ratings, n_users, n_items, rng)
+
+    # Popularidad de las películas en ley de potencias, en orden aleatorio
+    item_weights = np.arange(1, n_items + 1, dtype=np.float64) ** -profile['item_exponent']
+    item_weights = item_weights[rng.permutation(n_items)]
+    item_cdf = np.cumsum(item_weights)
+    item_cdf /= item_cdf[-1]
+
+    user_var = profile['user_bias_var']
+    item_var = profile['item_bias_var']
+    noise_var = max(profile['rating_var'] - user_var - item_var, 0.05 * profile['rating_var'])
+    user_bias = rng.normal(0.0, np.sqrt(user_var), n_users)
+    item_bias = rng.normal(0.0, np.sqrt(item_var), n_items)
+
+    # Umbrales de la puntuación latente (normal) que reproducen la distribución de ratings
+    rating_values = np.asarray(profile['rating_values'], dtype=np.float32)
+    cumulative = np.cumsum(profile['rating_probs'])[:-1]
+    thresholds = ndtri(np.clip(cumulative, 1e-12, 1 - 1e-12)) * np.sqrt(user_var + item_var + noise_var)
+    ts_min, ts_max = profile['timestamp_range']
+
+    # Bloques de usuarios consecutivos con unos chunksize ratings cada uno
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    boundaries = np.searchsorted(offsets, np.arange(0, offsets[-1], max(chunksize, 1)))
+    boundaries = np.unique(np.append(boundaries, n_users))
+
+    for block_index, (start, stop) in enumerate(zip(boundaries[:-1], boundaries[1:])):
+        block_rng = np.random.RandomState([seed, block_index])
+        # Un usuario no puntúa dos veces la misma película
+        users, items = _sample_items(counts[start:stop], item_cdf, item_weights, block_rng)
+        users += start
+
+        scores = user_bias[users] + item_bias[items] + block_rng.normal(0.0, np.sqrt(noise_var), len(users))
+        yield {
+            'user': (users + 1).astype(np.int32),
+            'item': (items + 1).astype(np.int32),
+            'rating': rating_values[np.searchsorted(thresholds, scores)],
+            'timestamp': block_rng.randint(ts_min, ts_max + 1, len(users)).astype(np.int64),
+        }
+
+
+def write_ratings(file_path, chunks, file_format):
+    """
+    Escribe los bloques en el formato de ml-32m (CSV con cabecera) o de
+    ml-100k (separado por tabs, sin cabecera). Se escribe en un fichero
+    temporal que solo sustituye al definitivo al terminar
+
+    Returns:
+        int: Ratings escritos
+    """
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = file_path + '.tmp'
+
+    n_written = 0
+    with open(tmp_path, 'w', newline='') as f:
+        if file_format == '32m':
+            f.write('userId,movieId,rating,timestamp\n')
+        for block in chunks:
+            df = pd.DataFrame({
+                'user': block['user'],
+                'item': block['item'],
+                'rating': block['rating'],
+                'timestamp': block['timestamp'],
+            })
+            if file_format == '32m':
+                df.to_csv(f, header=False, index=False, float_format='%.1f')
+            else:
+                df.to_csv(f, sep='\t', header=False, index=False, float_format='%g')
+            n_written += len(df)
+    os.replace(tmp_path, file_path)
+    return n_written
+
+
+def generation_settings():
+    """Parámetros de config que determinan el dataset sintético"""
+    return {
+        'n_ratings': config.SYNTHETIC_N_RATINGS,
+        'n_users': config.SYNTHETIC_N_USERS,
+        'n_items': config.SYNTHETIC_N_ITEMS,
+        'reference': config.SYNTHETIC_REFERENCE,
+        'format': config.SYNTHETIC_FORMAT,
+        'seed': config.SYNTHETIC_SEED,
+    }
+
+
+def dataset_path():
+    """Fichero de ratings del dataset sintético según config.SYNTHETIC_FORMAT"""
+    paths = config.DATASET_PATHS['synthetic']
+    if config.SYNTHETIC_FORMAT == '32m':
+        return paths['ratings']
+    if config.SYNTHETIC_FORMAT == '100k':
+        return paths['full']
+    raise ValueError(f"Formato sintético '{config.SYNTHETIC_FORMAT}' no reconocido. Use '100k' o '32m'")
+
+
+def rating_scale(profile):
+    """Escala (mínimo, máximo) de los ratings del perfil"""
+    return (min(profile['rating_values']), max(profile['rating_values']))
+
+
+def ensure_dataset(verbose=True):
+    """
+    Genera el dataset sintético si no existe o si cambió su configuración
+
+    Returns:
+        tuple: (ruta del fichero de ratings, escala de ratings)
+    """
+    file_path = dataset_path()
+    profile_path = os.path.join(os.path.dirname(file_path), PROFILE_FILE)
+    settings = generation_settings()
+
+    try:
+        with open(profile_path) as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        stored = None
+    if stored is not None and stored['settings'] == settings and os.path.exists(file_path):
+        return file_path, rating_scale(stored['profile'])
+
+    profile = reference_profile(config.SYNTHETIC_REFERENCE)
+    n_users, n_items = dataset_shape(profile, config.SYNTHETIC_N_RATINGS,
+                                     config.SYNTHETIC_N_USERS, config.SYNTHETIC_N_ITEMS)
+    if verbose:
+        print(f"  - Generando dataset sintético: {config.SYNTHETIC_N_RATINGS} ratings, "
+              f"{n_users} usuarios, {n_items} películas (referencia {config.SYNTHETIC_REFERENCE})")
+
+    start_time = time.time()
+    chunks = iter_synthetic_chunks(profile, config.SYNTHETIC_N_RATINGS, n_users, n_items,
+                                   config.SYNTHETIC_SEED, config.CSV_CHUNK_SIZE)
+    n_written = write_ratings(file_path, chunks, config.SYNTHETIC_FORMAT)
+
+    # El perfil se escribe al final: si la generación se interrumpe, se repite
+    with open(profile_path + '.tmp', 'w') as f:
+        json.dump({'settings': settings, 'profile': profile, 'n_ratings': n_written,
+                   'n_users': n_users, 'n_items': n_items}, f, indent=2)
+    os.replace(profile_path + '.tmp', profile_path)
+
+    if verbose:
+        print(f"  - {n_written} ratings escritos en {file_path} ({time.time() - start_time:.1f}s)")
+        if n_written != config.SYNTHETIC_N_RATINGS:
+            print(f"  ⚠ Solo caben {n_written} ratings con {n_users} usuarios y {n_items} películas "
+                  f"(cada usuario puntúa como mucho la mitad de las películas)")
+    return file_path, rating_scale(profile)
+
+
+def main():
+    """
+    Genera el dataset sintético configurado y compara sus estadísticas con
+    las del dataset de referencia
+    """
+    print("\n" + "="*60)
+    print(" GENERADOR DE DATASETS SINTÉTICOS - MovieLens")
+    print("="*60)
+
+    file_path, _ = ensure_dataset()
+    parser = ratings_cache.parse_32m if config.SYNTHETIC_FORMAT == '32m' else ratings_cache.parse_100k
+    ratings, _ = ratings_cache.load_ratings(file_path, parser)
+
+    generated = profile_from_ratings(ratings)
+    reference = reference_profile(config.SYNTHETIC_REFERENCE)
+    print(f"\n✓ Dataset sintético: {file_path} ({len(ratings['rating'])} ratings)")
+    print(f"\n{'Estadística':<28} {'Referencia':<14} {'Sintético':<14}")
+    print("-" * 56)
+    for key in ('user_exponent', 'item_exponent', 'ratings_per_user', 'user_bias_var',
+                'item_bias_var', 'rating_var'):
+        print(f"{key:<28} {reference[key]:<14.3f} {generated[key]:<14.3f}")
+    for value, prob in zip(reference['rating_values'], reference['rating_probs']):
+        generated_probs = dict(zip(generated['rating_values'], generated['rating_probs']))
+        print(f"{'P(rating = ' + f'{value:g}' + ')':<28} {prob:<14.3f} {generated_probs.get(value, 0.0):<14.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+Telemetría estructurada de la ejecución
+Registra tramos anidados (carga, codificación de ids, partición, fit,
+predicción, métricas, guardado...) con su duración en un reloj monotónico de
+alta resolución (perf_counter), el tiempo de CPU del proceso y la variación
+de la memoria residente. Cada tramo se escribe al cerrarse como una línea
+JSON en OUTPUT_DIR/telemetria_{DATASET}.jsonl; los procesos del pool
+escriben en el mismo fichero
+
+Con config.TELEMETRY = False, span() devuelve un contexto vacío compartido
+y no mide nada
+
+    python telemetry.py              # resumen de la última ejecución
+    python telemetry.py 100k         # resumen de otro dataset
+"""
+
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+import config
+import resources
+
+
+# Variable de entorno con el id de la ejecución, que heredan los procesos del pool
+RUN_ENV = 'MOVIELENS_TELEMETRY_RUN'
+
+_ids = itertools.count(1)
+_local = threading.local()
+_write_lock = threading.Lock()
+
+
+def log_path(dataset_name=None):
+    """Fichero JSONL de la telemetría de un dataset (por defecto, config.DATASET)"""
+    return os.path.join(config.OUTPUT_DIR, f'telemetria_{dataset_name or config.DATASET}.jsonl')
+
+
+def start_run():
+    """
+    Empieza una ejecución nueva: los tramos que se registren a partir de
+    ahora (también en los procesos hijos) comparten su id
+
+    Returns:
+        str: Id de la ejecución
+    """
+    run_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+    os.environ[RUN_ENV] = run_id
+    return run_id
+
+
+def _run_id():
+    return os.environ.get(RUN_ENV) or start_run()
+
+
+def _stack():
+    """Tramos abiertos en el hilo actual (el último es el padre del siguiente)"""
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _write(record):
+    """Añade una línea al fichero con una sola escritura O_APPEND (atómica entre procesos)"""
+    line = (json.dumps(record, ensure_ascii=False, default=str) + '\n').encode('utf-8')
+    with _write_lock:
+        os.makedirs(config.OUTPUT_DIR, exist_ok=True)
+        fd = os.open(log_path(), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+
+class _NullSpan:
+    """Tramo vacío que se usa con la telemetría desactivada"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """
+    Tramo medido. Los atributos (algoritmo, fold...) se pasan al crearlo o
+    se añaden con set() antes de que se cierre
+    """
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = _stack()
+        self.parent = stack[-1].id if stack else None
+        self.id = f'{os.getpid()}-{next(_ids)}'
+        stack.append(self)
+        self.rss_start = resources.current_rss_mb()
+        self.timestamp = time.time()
+        self.cpu_start = time.process_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration = time.perf_counter() - self.start
+        cpu = time.process_time() - self.cpu_start
+        rss_end = resources.current_rss_mb()
+        _stack().pop()
+
+        record = {
+            'run': _run_id(),
+            'id': self.id,
+            'parent': self.parent,
+            'name': self.name,
+            'pid': os.getpid(),
+            'start': self.timestamp,
+            'duration': duration,
+            'cpu_time': cpu,
+            'rss_mb': rss_end,
+            'rss_delta_mb': None if rss_end is None or self.rss_start is None else rss_end - self.rss_start,
+            'attrs': self.attrs,
+        }
+        if exc_type is not None:
+            record['error'] = f'{exc_type.__name__}: {exc_value}'
+        _write(record)
+        return False
+
+
+def span(name, **attrs):
+    """
+    Contexto que mide un tramo de la ejecución
+
+        with telemetry.span('fit', algorithm='SVD', fold=0):
+            algo.fit(trainset)
+
+    Returns:
+        Span, o NULL_SPAN si config.TELEMETRY es False
+    """
+    if not config.TELEMETRY:
+        return NULL_SPAN
+    return Span(name, attrs)
+
+
+def read_spans(file_path, run_id=None):
+    """
+    Tramos de una ejecución de un fichero de telemetría
+
+    Args:
+        file_path: Fichero JSONL
+        run_id: Id de la ejecución (por defecto, la última del fichero)
+
+    Returns:
+        list: Registros de los tramos, en el orden en que se cerraron
+    """
+    with open(file_path, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if run_id is None and records:
+        run_id = records[-1]['run']
+    return [record for record in records if record['run'] == run_id]
+
+
+def _algorithm(record, by_id):
+    """Algoritmo de un tramo: el de su atributo o el del primer antecesor que lo tenga"""
+    while record is not None:
+        if 'algorithm' in record['attrs']:
+            return record['attrs']['algorithm']
+        record = by_id.get(record['parent'])
+    return None
+
+
+def summarize(records):
+    """
+    Agrega los tramos por algoritmo (None = fases comunes: carga,
+    partición, guardado...) y por nombre
+
+    El total de cada grupo es la suma de sus tramos raíz (los que no están
+    dentro de otro tramo del mismo grupo), para no contar dos veces el
+    tiempo de los tramos anidados
+
+    Returns:
+        tuple: ({algoritmo: {nombre: {'count', 'duration', 'cpu_time',
+        'rss_delta_mb'}}}, con los nombres en orden de primera aparición,
+        y {algoritmo: total en segundos})
+    """
+    by_id = {record['id']: record for record in records}
+    summary = defaultdict(dict)
+    totals = defaultdict(float)
+    for record in sorted(records, key=lambda record: record['start']):
+        group = _algorithm(record, by_id)
+        parent = by_id.get(record['parent'])
+        if parent is None or _algorithm(parent, by_id) != group:
+            totals[group] += record['duration']
+        phases = summary[group]
+        phase = phases.setdefault(record['name'], {'count': 0, 'duration': 0.0, 'cpu_time': 0.0,
+                                                   'rss_delta_mb': 0.0})
+        phase['count'] += 1
+        phase['duration'] += record['duration']
+        phase['cpu_time'] += record['cpu_time']
+        phase['rss_delta_mb'] = max(phase['rss_delta_mb'], record['rss_delta_mb'] or 0.0)
+    return summary, totals
+
+
+def print_summary(file_path=None, run_id=None):
+    """
+    Muestra en qué fases se fue el tiempo de cada algoritmo en una ejecución
+
+    Args:
+        file_path: Fichero de telemetría (por defecto, el de config.DATASET)
+        run_id: Id de la ejecución (por defecto, la última del fichero)
+    """
+    file_path = file_path or log_path()
+    if not os.path.exists(file_path):
+        print(f"✗ No se encontró el archivo: {file_path}")
+        print("  Ejecuta 'python recommender.py' con TELEMETRY = True en config.py")
+        return
+
+    records = read_spans(file_path, run_id)
+    if not records:
+        print(f"✗ No hay tramos registrados en {file_path}")
+        return
+
+    summary, totals = summarize(records)
+    print(f"\n{'='*80}")
+    print(f" TELEMETRÍA - ejecución {records[0]['run']}")
+    print(f"{'='*80}")
+
+    groups = [None] + sorted(name for name in summary if name is not None)
+    for group in groups:
+        if group not in summary:
+            continue
+        phases, total = summary[group], totals[group]
+        print(f"\n{group or 'General'} ({total:.2f}s)")
+        print(f"  {'Fase':<16} {'Tramos':>7} {'Tiempo (s)':>11} {'%':>6} {'CPU (s)':>9} {'ΔMem máx (MB)':>14}")
+        for name, phase in phases.items():
+            share = 100 * phase['duration'] / total if total > 0 else 0.0
+            print(f"  {name:<16} {phase['count']:>7} {phase['duration']:>11.3f} {share:>6.1f} "
+                  f"{phase['cpu_time']:>9.2f} {phase['rss_delta_mb']:>+14.1f}")
+
+    errors = [record for record in records if 'error' in record]
+    if errors:
+        print(f"\n⚠ Tramos con errores: {len(errors)}")
+        for record in errors:
+            print(f"  - {record['name']} {record['attrs']}: {record['error']}")
+    print(f"\n{'='*80}\n")
+
+
+def main():
+    """Resumen de la telemetría del dataset indicado (por defecto, config.DATASET)"""
+    dataset_name = sys.argv[1] if len(sys.argv) > 1 else None
+    print_summary(log_path(dataset_name))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""
+Búsqueda de hiperparámetros en paralelo
+Evalúa las combinaciones de config.SEARCH_SPACES sobre los folds compartidos
+del recomendador, descartando las peores con successive halving, y guarda
+cada prueba en resultados/tuning_{DATASET}.csv
+"""
+
+import os
+import time
+import itertools
+import numpy as np
+import pandas as pd
+from datetime import datetime
+import config
+from recommender import MovieLensRecommender, run_fold_task
+
+
+def generate_candidates(algo_name, method, n_candidates, seed):
+    """
+    Genera las combinaciones de parámetros a probar para un algoritmo
+
+    Args:
+        algo_name: Nombre del algoritmo (clave de config.SEARCH_SPACES)
+        method: 'grid' (todas las combinaciones) o 'random' (muestreo)
+        n_candidates: Número de combinaciones a muestrear en modo 'random'
+        seed: Semilla del muestreo
+
+    Returns:
+        list: Lista de dicts con los parámetros completos de cada candidato
+    """
+    base_params = config.ALGORITHM_PARAMS.get(algo_name, {})
+    space = config.SEARCH_SPACES[algo_name]
+    names = list(space.keys())
+
+    if method == 'grid':
+        combinations = list(itertools.product(*(space[name] for name in names)))
+    elif method == 'random':
+        rng = np.random.RandomState(seed)
+        combinations = []
+        total = int(np.prod([len(space[name]) for name in names]))
+        while len(combinations) < min(n_candidates, total):
+            combination = tuple(space[name][rng.randint(len(space[name]))] for name in names)
+            if combination not in combinations:
+                combinations.append(combination)
+    else:
+        raise ValueError(f"Método de búsqueda '{method}' no reconocido. Use 'grid' o 'random'")
+
+    return [dict(base_params, **dict(zip(names, combination))) for combination in combinations]
+
+
+def halving_schedule(n_folds, eta):
+    """
+    Número de folds evaluados en cada ronda de successive halving
+
+    Con eta=3 y 5 folds: [1, 3, 5]. En cada ronda solo sobrevive 1/eta de
+    los candidatos, y los supervivientes se evalúan en más folds
+
+    Returns:
+        list: Folds acumulados por ronda (el último siempre es n_folds)
+    """
+    schedule = []
+    budget = 1
+    while budget < n_folds:
+        schedule.append(budget)
+        budget *= eta
+    schedule.append(n_folds)
+    return schedule
+
+
+class HyperparameterTuner:
+    """
+    Motor de búsqueda de hiperparámetros con successive halving
+    """
+
+    def __init__(self, recommender):
+        """
+        Args:
+            recommender: MovieLensRecommender con los datos ya cargados
+        """
+        self.recommender = recommender
+        self.trials = []
+
+    def _run_tasks(self, executor, algo_name, tasks):
+        """
+        Ejecuta tareas (candidato, fold) en el pool o, sin pool, en este proceso
+
+        Returns:
+            dict: (índice de candidato, fold) -> métricas del fold
+        """
+        if executor is None:
+            return {
+                (cand_i, fold_i): self.recommender.evaluate_fold(algo_name, fold_i, params)
+                for cand_i, fold_i, params in tasks
+            }
+
+        futures = {
+            (cand_i, fold_i): executor.submit(run_fold_task, algo_name, fold_i, params)
+            for cand_i, fold_i, params in tasks
+        }
+        return {key: future.result() for key, future in futures.items()}
+
+    def tune(self, algo_name, executor=None):
+        """
+        Busca los mejores parámetros de un algoritmo
+
+        Args:
+            algo_name: Nombre del algoritmo a ajustar
+            executor: Pool de procesos (None = ejecución secuencial)
+
+        Returns:
+            dict: Parámetros del mejor candidato
+        """
+        candidates = generate_candidates(
+            algo_name, config.TUNING_METHOD, config.TUNING_N_CANDIDATES, config.RANDOM_SEED
+        )
+        n_folds = len(self.recommender.folds)
+        schedule = halving_schedule(n_folds, config.TUNING_HALVING_FACTOR)
+
+        print(f"\n{'-'*60}")
+        print(f"Ajustando: {algo_name}")
+        print(f"{'-'*60}")
+        print(f"Candidatos: {len(candidates)} | Rondas (folds): {schedule}")
+
+        fold_results = {cand_i: {} for cand_i in range(len(candidates))}
+        alive = list(range(len(candidates)))
+        pruned_at = {}
+
+        for rung, budget in enumerate(schedule):
+            # Solo se evalúan los folds que cada superviviente aún no tiene
+            tasks = [
+                (cand_i, fold_i, candidates[cand_i])
+                for cand_i in alive
+                for fold_i in range(budget)
+                if fold_i not in fold_results[cand_i]
+            ]
+            start_time = time.time()
+            for (cand_i, fold_i), metrics in self._run_tasks(executor, algo_name, tasks).items():
+                fold_results[cand_i][fold_i] = metrics
+
+            scores = {
+                cand_i: np.mean([m['test_rmse'] for m in fold_results[cand_i].values()])
+                for cand_i in alive
+            }
+            print(f"  Ronda {rung + 1}: {len(alive)} candidatos x {budget} folds "
+                  f"({time.time() - start_time:.2f}s) | mejor RMSE: {min(scores.values()):.4f}")
+
+            if budget == n_folds:
+                break
+
+            # Successive halving: sobrevive 1/eta de los candidatos
+            n_keep = max(1, len(alive) // config.TUNING_HALVING_FACTOR)
+            ranked = sorted(alive, key=lambda cand_i: scores[cand_i])
+            for cand_i in ranked[n_keep:]:
+                pruned_at[cand_i] = rung + 1
+            alive = ranked[:n_keep]
+
+        for cand_i, params in enumerate(candidates):
+            self.trials.append(self._build_trial(algo_name, cand_i, params, fold_results[cand_i],
+                                                 pruned_at.get(cand_i), n_folds))
+
+        best = min(alive, key=lambda cand_i: np.mean(
+            [m['test_rmse'] for m in fold_results[cand_i].values()]))
+        best_rmse = np.mean([m['test_rmse'] for m in fold_results[best].values()])
+        print(f"\n✓ Mejor configuración de {algo_name} (RMSE {best_rmse:.4f}):")
+        print(f"  {candidates[best]}")
+        return candidates[best]
+
+    def _build_trial(self, algo_name, trial_index, params, fold_results, pruned_rung, n_folds):
+        """Construye la fila de la tabla de pruebas para un candidato"""
+        metrics = list(fold_results.values())
+        return {
+            'Algorithm': algo_name,
+            'Dataset': self.recommender.dataset_name,
+            'Trial': trial_index,
+            'Parameters': str(params),
+            'RMSE_mean': np.mean([m['test_rmse'] for m in metrics]),
+            'RMSE_std': np.std([m['test_rmse'] for m in metrics]),
+            'MAE_mean': np.mean([m['test_mae'] for m in metrics]),
+            'Fit_time_mean': np.mean([m['fit_time'] for m in metrics]),
+            'Test_time_mean': np.mean([m['test_time'] for m in metrics]),
+            'Folds_evaluated': len(metrics),
+            'CV_folds': n_folds,
+            'Pruned_at_round': pruned_rung if pruned_rung is not None else '',
+            'Timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+    def run(self, algorithms):
+        """
+        Ajusta todos los algoritmos indicados compartiendo un único pool
+
+        Args:
+            algorithms: Lista de nombres de algoritmos con espacio de búsqueda
+
+        Returns:
+            dict: Algoritmo -> mejores parámetros
+        """
+        n_jobs = self.recommender.get_n_jobs()
+        self.recommender.prepare_folds()
+
+        best_params = {}
+        if n_jobs > 1:
+            with self.recommender.create_process_pool(n_jobs) as executor:
+                for algo_name in algorithms:
+                    best_params[algo_name] = self.tune(algo_name, executor)
+        else:
+            for algo_name in algorithms:
+                best_params[algo_name] = self.tune(algo_name)
+        return best_params
+
+    def save_trials(self):
+        """Guarda todas las pruebas en OUTPUT_DIR/tuning_{DATASET}.csv"""
+        if not os.path.exists(config.OUTPUT_DIR):
+            os.makedirs(config.OUTPUT_DIR)
+
+        output_path = os.path.join(config.OUTPUT_DIR, f'tuning_{self.recommender.dataset_name}.csv')
+        pd.DataFrame(self.trials).to_csv(output_path, index=False)
+        print(f"✓ Pruebas guardadas en: {output_path}")
+
+
+def main():
+    """
+    Función principal
+    """
+    print("\n" + "="*60)
+    print(" BÚSQUEDA DE HIPERPARÁMETROS - MovieLens")
+    print("="*60)
+
+    recommender = MovieLensRecommender()
+    recommender.load_data()
+
+    tuner = HyperparameterTuner(recommender)
+    start_time = time.time()
+    tuner.run(config.TUNING_ALGORITHMS)
+    total_time = time.time() - start_time
+
+    print(f"\nTiempo total de la búsqueda: {total_time:.2f}s ({total_time/60:.2f} minutos)")
+    tuner.save_trials()
+    print("\nUsa 'python view_results.py' para ver el ranking de las pruebas")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,8 +20,8 @@ def clean_results():
         print(f"✓ El directorio {OUTPUT_DIR}/ no existe o ya está vacío")
         return
     
-    # Listar archivos en el directorio
-    files = [f for f in os.listdir(OUTPUT_DIR) if f.endswith('.csv')]
+    # Listar archivos en el directorio (resultados y checkpoints)
+    files = [f for f in os.listdir(OUTPUT_DIR) if f.endswith(('.csv', '.jsonl'))]
     
     if not files:
         print("✓ No hay archivos de resultados para limpiar")
@@ -60,7 +60,7 @@ def backup_results():
         print("✗ No hay resultados para respaldar")
         return
     
-    files = [f for f in os.listdir(OUTPUT_DIR) if f.endswith('.csv')]
+    files = [f for f in os.listdir(OUTPUT_DIR) if f.endswith(('.csv', '.jsonl'))]
     
     if not files:
         print("✗ No hay archivos de resultados para respaldar")
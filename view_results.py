@@ -73,10 +73,29 @@ def display_detailed_results(dataset_name):
     
     print("\n" + "-" * 100)
     
+    # Métricas de ranking top-K (solo si se calcularon)
+    ranking_columns = [col for col in df_success.columns if '@' in col and col.endswith('_mean')]
+    if ranking_columns:
+        df_ranked = df_success.dropna(subset=ranking_columns, how='all')
+        sort_column = next((col for col in ranking_columns if col.startswith('NDCG')), ranking_columns[0])
+        df_ranked = df_ranked.sort_values(sort_column, ascending=False)
+        
+        print("\nMÉTRICAS DE RANKING")
+        print("-" * 100)
+        header = ''.join(f"{col[:-len('_mean')]:<15}" for col in ranking_columns)
+        print(f"{'Algoritmo':<18} {header}")
+        print("-" * 100)
+        for _, row in df_ranked.iterrows():
+            values = ''.join(f"{row[col]:<15.4f}" for col in ranking_columns)
+            print(f"{row['Algorithm']:<18} {values}")
+        print("\n" + "-" * 100)
+    
     # Estadísticas de tiempo
+    has_ranking_time = 'Ranking_time_mean' in df_success.columns
     print("\nTIEMPOS DE EJECUCIÓN")
     print("-" * 100)
-    print(f"{'Algoritmo':<18} {'Tiempo Fit':<15} {'Tiempo Test':<15} {'Tiempo Total':<15}")
+    ranking_header = f"{'Tiempo Ranking':<15} " if has_ranking_time else ""
+    print(f"{'Algoritmo':<18} {'Tiempo Fit':<15} {'Tiempo Test':<15} {ranking_header}{'Tiempo Total':<15}")
     print("-" * 100)
     
     # Ordenar por tiempo total
@@ -86,8 +105,26 @@ def display_detailed_results(dataset_name):
         fit_time = f"{row['Fit_time_mean']:.2f}s"
         test_time = f"{row['Test_time_mean']:.2f}s"
         total_time = f"{row['Total_time']:.2f}s"
+        ranking_time = ""
+        if has_ranking_time:
+            ranking_time = f"{row['Ranking_time_mean']:.2f}s" if pd.notna(row['Ranking_time_mean']) else "-"
+            ranking_time = f"{ranking_time:<15} "
         
-        print(f"{row['Algorithm']:<18} {fit_time:<15} {test_time:<15} {total_time:<15}")
+        print(f"{row['Algorithm']:<18} {fit_time:<15} {test_time:<15} {ranking_time}{total_time:<15}")
+    
+    # Recursos por fold (memoria pico del proceso y tiempos de CPU y real)
+    if 'Peak_RSS_MB' in df_success.columns:
+        print("\nRECURSOS POR FOLD")
+        print("-" * 100)
+        print(f"{'Algoritmo':<18} {'Memoria pico':<15} {'Estimada':<15} {'CPU':<15} {'Real':<15}")
+        print("-" * 100)
+        for _, row in df_success.sort_values('Peak_RSS_MB').iterrows():
+            peak = f"{row['Peak_RSS_MB']:.0f} MB" if pd.notna(row['Peak_RSS_MB']) else "-"
+            estimated = row.get('Estimated_memory_MB')
+            estimated = f"+{estimated:.0f} MB" if pd.notna(estimated) else "-"
+            cpu_time = f"{row['CPU_time_mean']:.2f}s" if pd.notna(row.get('CPU_time_mean')) else "-"
+            wall_time = f"{row['Wall_time_mean']:.2f}s" if pd.notna(row.get('Wall_time_mean')) else "-"
+            print(f"{row['Algorithm']:<18} {peak:<15} {estimated:<15} {cpu_time:<15} {wall_time:<15}")
     
     # Resumen estadístico
     print("\n" + "="*100)
@@ -109,11 +146,57 @@ def display_detailed_results(dataset_name):
     print(f"   - MAE promedio:  {df_success['MAE_mean'].mean():.4f}")
     print(f"   - Tiempo total:  {df_success['Total_time'].sum():.2f}s ({df_success['Total_time'].sum()/60:.2f} min)")
     print(f"   - Algoritmos evaluados: {len(df_success)}")
-    print(f"   - Validación cruzada: {df_success['CV_folds'].iloc[0]} folds")
+    if 'Split' in df_success.columns and not df_success['Split'].iloc[0].startswith('kfold'):
+        print(f"   - Partición: {df_success['Split'].iloc[0]}")
+    else:
+        print(f"   - Validación cruzada: {df_success['CV_folds'].iloc[0]} folds")
     
     print("\n" + "="*100 + "\n")
 
 
+def display_tuning_results(dataset_name, top_n=10):
+    """
+    Muestra el ranking de las pruebas de la búsqueda de hiperparámetros
+    
+    Args:
+        dataset_name: '100k' o '32m'
+        top_n: Número de pruebas a mostrar por algoritmo
+    """
+    file_path = os.path.join(OUTPUT_DIR, f'tuning_{dataset_name}.csv')
+    
+    if not os.path.exists(file_path):
+        return
+    
+    df = pd.read_csv(file_path)
+    
+    print("\n" + "="*100)
+    print(f" BÚSQUEDA DE HIPERPARÁMETROS - MovieLens {dataset_name}")
+    print("="*100 + "\n")
+    
+    for algo_name, df_algo in df.groupby('Algorithm'):
+        # Primero las pruebas evaluadas en todos los folds, después por RMSE
+        df_algo = df_algo.assign(
+            _complete=df_algo['Folds_evaluated'] == df_algo['CV_folds']
+        ).sort_values(['_complete', 'RMSE_mean'], ascending=[False, True])
+        
+        n_complete = int(df_algo['_complete'].sum())
+        print(f"{algo_name}: {len(df_algo)} pruebas ({n_complete} completas, "
+              f"{len(df_algo) - n_complete} descartadas por successive halving)")
+        print("-" * 100)
+        print(f"{'Rank':<6} {'RMSE':<20} {'MAE':<10} {'Folds':<7} {'Fit (s)':<9} {'Params':<45}")
+        print("-" * 100)
+        
+        for rank, (_, row) in enumerate(df_algo.head(top_n).iterrows(), 1):
+            rmse_str = f"{row['RMSE_mean']:.4f} ±{row['RMSE_std']:.4f}"
+            folds_str = f"{row['Folds_evaluated']}/{row['CV_folds']}"
+            params = row['Parameters']
+            if len(params) > 45:
+                params = params[:42] + "..."
+            print(f"{rank:<6} {rmse_str:<20} {row['MAE_mean']:<10.4f} {folds_str:<7} "
+                  f"{row['Fit_time_mean']:<9.2f} {params:<45}")
+        print()
+
+
 def main():
     """
     Función principal para mostrar resultados
@@ -141,6 +224,10 @@ def main():
     # Mostrar resultados de cada dataset
     for dataset in available:
         display_detailed_results(dataset)
+    
+    # Mostrar las búsquedas de hiperparámetros, si las hay
+    for dataset in ['100k', '32m']:
+        display_tuning_results(dataset)
 
 
 if __name__ == "__main__":